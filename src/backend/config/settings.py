@@ -165,6 +165,16 @@ JAZZMIN_SETTINGS = {
 REDIS_HOST = 'redis'
 REDIS_PORT = 6379
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+    }
+}
+
+# Records are invalidated by data versions; the timeout only reclaims memory.
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
 RQ_QUEUES = {
     'default': {
         'HOST': REDIS_HOST,
@@ -175,6 +185,49 @@ RQ_QUEUES = {
     }
 }
 
+# Forecast runs are split into chunks of products; each chunk is an RQ job
+# that fits its models in a local pool of FORECAST_POOL_WORKERS processes.
+FORECAST_CHUNK_SIZE = int(os.environ.get('FORECAST_CHUNK_SIZE', 200))
+FORECAST_POOL_WORKERS = int(os.environ.get('FORECAST_POOL_WORKERS', os.cpu_count() or 1))
+FORECAST_CHUNK_TIMEOUT = int(os.environ.get('FORECAST_CHUNK_TIMEOUT', 3600))
+# Per-product results are committed (ADS + run checkpoint) every this many products.
+FORECAST_CHECKPOINT_BATCH = int(os.environ.get('FORECAST_CHECKPOINT_BATCH', 50))
+# Hierarchical forecasts split brand ADS by each product's share of the last N days.
+FORECAST_SHARE_WINDOW_DAYS = int(os.environ.get('FORECAST_SHARE_WINDOW_DAYS', 28))
+
+# Nightly ABC-tiered forecast schedule (replenishment/scheduler.py). Needs a worker
+# started with --with-scheduler; bootstrap it once with `manage.py schedule_forecasts`.
+FORECAST_SCHEDULE_TIME = os.environ.get('FORECAST_SCHEDULE_TIME', '02:00')
+FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', 365))
+FORECAST_ABC_WINDOW_DAYS = int(os.environ.get('FORECAST_ABC_WINDOW_DAYS', 90))
+FORECAST_B_WEEKDAY = int(os.environ.get('FORECAST_B_WEEKDAY', 6))  # Sunday
+# Wall-clock seconds each tier's run may spend before leaving the rest for the next run.
+FORECAST_TIER_BUDGETS = {
+    'A': int(os.environ.get('FORECAST_BUDGET_A', 4 * 3600)),
+    'B': int(os.environ.get('FORECAST_BUDGET_B', 2 * 3600)),
+    'C': int(os.environ.get('FORECAST_BUDGET_C', 15 * 60)),
+}
+
+# Fitted Prophet models, one gzipped JSON file per product version.
+# The directory must be shared by all RQ workers (it lives in the mounted src volume).
+FORECAST_MODEL_STORE_DIR = Path(os.environ.get('FORECAST_MODEL_STORE_DIR', BASE_DIR / 'model_store'))
+FORECAST_MODEL_STORE_MAX_MB = int(os.environ.get('FORECAST_MODEL_STORE_MAX_MB', 1024))
+FORECAST_MODEL_KEEP_VERSIONS = int(os.environ.get('FORECAST_MODEL_KEEP_VERSIONS', 2))
+
+# Per-warehouse products x days float32 sales matrices, memory-mapped by forecast workers.
+# Synced nightly before the forecast schedule; the last RESYNC_DAYS days are re-read
+# from DailySales on every sync to pick up backdated and unposted documents.
+SALES_MATRIX_DIR = Path(os.environ.get('SALES_MATRIX_DIR', BASE_DIR / 'sales_matrix'))
+SALES_MATRIX_RESYNC_DAYS = int(os.environ.get('SALES_MATRIX_RESYNC_DAYS', 7))
+
+# Real-time demand estimates (replenishment.DemandEstimate) use an exponentially
+# weighted daily average; a day's sales lose half their weight after this many days.
+REALTIME_ADS_HALFLIFE_DAYS = float(os.environ.get('REALTIME_ADS_HALFLIFE_DAYS', 14))
+
+# Bearer token for scrapers of /api/optimization-metrics/ ("Authorization: Bearer <token>").
+# Empty: only staff sessions may read the metrics.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
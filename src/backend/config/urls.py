@@ -1,9 +1,19 @@
+import hmac
+
+from django.conf import settings
 from django.contrib import admin
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.urls import path
-from erp.admin_views.sales_analytics import sales_analytics_view
+from erp.cache import get_cache_stats
+from erp.admin_views.sales_analytics import (
+    brand_autocomplete_view,
+    product_autocomplete_view,
+    sales_analytics_data_view,
+    sales_analytics_view,
+)
 
-from replenishment.models import TaskNotification
+from replenishment.models import ReplenishmentReport, TaskNotification
+from replenishment.optimization.tracing import prometheus_text
 
 
 def get_notifications_view(request):
@@ -23,8 +33,53 @@ def get_notifications_view(request):
     
     return JsonResponse({'notifications': data})
 
+def cache_stats_view(request):
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    return JsonResponse({'cache': get_cache_stats()})
+
+def _has_metrics_token(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and hmac.compare_digest(
+        token.strip().encode(), settings.METRICS_TOKEN.encode()
+    )
+
+def optimization_metrics_view(request):
+    """
+    Метрики оптимізації для скрейпера Prometheus: для кожного проходу — останній
+    звіт серед ?limit= останніх (за замовчуванням 20), без id звіту в мітках.
+    Метрики окремих звітів — у JSON (?format=json, ?report=<id>).
+    Доступ — для персоналу або за заголовком "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    if not (request.user.is_authenticated and request.user.is_staff) and not _has_metrics_token(request):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    reports = ReplenishmentReport.objects.exclude(optimization_metrics={}).order_by('-pk')
+    try:
+        if request.GET.get('report'):
+            reports = reports.filter(pk=int(request.GET['report']))
+        limit = max(int(request.GET.get('limit', 20)), 1)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
+    rows = list(reports.values_list('pk', 'optimization_metrics')[:limit])
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'reports': [{'id': pk, 'metrics': metrics} for pk, metrics in rows]})
+
+    latest = {}
+    for pk, metrics in rows:
+        for run, data in metrics.items():
+            latest.setdefault(run, (pk, data))
+    return HttpResponse(prometheus_text(latest), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 urlpatterns = [
     path('api/check-notifications/', get_notifications_view, name='global_check_notifications'),
+    path('api/cache-stats/', cache_stats_view, name='cache_stats'),
+    path('api/optimization-metrics/', optimization_metrics_view, name='optimization_metrics'),
     path("analytics/sales/", sales_analytics_view, name="sales_analytics"),
+    path("analytics/sales/data/", sales_analytics_data_view, name="sales_analytics_data"),
+    path("analytics/sales/products/", product_autocomplete_view, name="sales_analytics_products"),
+    path("analytics/sales/brands/", brand_autocomplete_view, name="sales_analytics_brands"),
     path('', admin.site.urls),
 ]
@@ -1,90 +1,253 @@
 from datetime import timedelta
 
+import numpy as np
+import pandas as pd
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import admin
+from django.http import JsonResponse
 from django.shortcuts import render
-from django.db.models import Sum
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils.dateparse import parse_date
 from django.utils import timezone
 
-from erp.models import Document, DocumentItem, Product, Warehouse
+from erp.cache import cached_response
+from erp.models import Brand, DailySales, Product, Warehouse
+
+GRANULARITIES = {
+    "day": (None, "D", lambda d: d),
+    "week": (TruncWeek, "W-MON", lambda d: d - timedelta(days=d.weekday())),
+    "month": (TruncMonth, "MS", lambda d: d.replace(day=1)),
+}
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+AUTOCOMPLETE_PAGE_SIZE = 20
+
+
+def _lttb_indices(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets: індекси точок, що зберігають форму ряду
+    (піки та провали) при зменшенні кількості точок до threshold.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    y = np.asarray(values, dtype=float)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[i + 1] = selected
+
+    return indices
+
+
+def _parse_date(value):
+    """Дата YYYY-MM-DD або None для порожнього значення; ValueError — для некоректної."""
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        # Правильний формат, але неіснуюча дата (2024-02-30).
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"Некоректна дата: {value}")
+    return parsed
+
+
+def _parse_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_sales_series(product_id=None, brand_id=None, warehouse_id=None,
+                     start_date=None, end_date=None, granularity="day", points=DEFAULT_POINTS):
+    """
+    Ряд продажів (кількість і виручка) з денного агрегату для товару, бренду,
+    складу або всієї компанії, з заповненням пропусків і обмеженням кількості точок.
+    """
+    trunc, freq, bucket_start = GRANULARITIES[granularity]
+
+    qs = DailySales.objects.all()
+
+    if product_id:
+        qs = qs.filter(product_id=product_id)
+
+    if brand_id:
+        qs = qs.filter(product__brand_id=brand_id)
+
+    if warehouse_id:
+        qs = qs.filter(warehouse_id=warehouse_id)
+
+    if start_date:
+        qs = qs.filter(day__gte=start_date)
+
+    if end_date:
+        qs = qs.filter(day__lte=end_date)
+
+    if not start_date or not end_date:
+        bounds = qs.aggregate(first=Min("day"), last=Max("day"))
+        today = timezone.now().date()
+        start_date = start_date or bounds["first"] or today
+        end_date = end_date or bounds["last"] or today
+
+    if trunc is None:
+        data_qs = qs.values("day").annotate(qty=Sum("quantity"), revenue=Sum("revenue")).order_by("day")
+        bucket_key = "day"
+    else:
+        data_qs = (
+            qs.annotate(bucket=trunc("day"))
+            .values("bucket")
+            .annotate(qty=Sum("quantity"), revenue=Sum("revenue"))
+            .order_by("bucket")
+        )
+        bucket_key = "bucket"
+
+    rows = list(data_qs.values_list(bucket_key, "qty", "revenue"))
+
+    full_range = pd.date_range(start=bucket_start(start_date), end=end_date, freq=freq)
+
+    frame = pd.DataFrame(rows, columns=["ds", "qty", "revenue"])
+    frame["ds"] = pd.to_datetime(frame["ds"])
+    frame = frame.set_index("ds").astype(float).reindex(full_range, fill_value=0.0)
+
+    qty = frame["qty"].to_numpy()
+    revenue = frame["revenue"].to_numpy()
+
+    points = min(max(points, 3), MAX_POINTS)
+    indices = _lttb_indices(qty, points)
+
+    return {
+        "granularity": granularity,
+        "date_from": str(start_date),
+        "date_to": str(end_date),
+        "total_points": len(qty),
+        "downsampled": len(indices) < len(qty),
+        "labels": [str(d.date()) for d in frame.index[indices]],
+        "values": qty[indices].round(2).tolist(),
+        "revenue": revenue[indices].round(2).tolist(),
+    }
 
 
 @staff_member_required
-def sales_analytics_view(request):
-    context = admin.site.each_context(request)
+def sales_analytics_data_view(request):
+    granularity = request.GET.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        return JsonResponse({"error": f"Невідома деталізація: {granularity}"}, status=400)
 
-    product_id = request.GET.get("product")
-    warehouse_id = request.GET.get("warehouse")
     date_from_str = request.GET.get("date_from")
     date_to_str = request.GET.get("date_to")
 
-    qs = DocumentItem.objects.filter(
-        document__doc_type=Document.DocType.SALE
-    ).select_related("document", "product")
+    try:
+        start_date = _parse_date(date_from_str)
+        end_date = _parse_date(date_to_str)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if start_date and end_date and start_date > end_date:
+        return JsonResponse({"error": "Дата від має бути не пізніше дати до."}, status=400)
+
+    params = {
+        "product_id": _parse_int(request.GET.get("product")),
+        "brand_id": _parse_int(request.GET.get("brand")),
+        "warehouse_id": _parse_int(request.GET.get("warehouse")),
+        "start_date": start_date,
+        "end_date": end_date,
+        "granularity": granularity,
+        "points": _parse_int(request.GET.get("points"), DEFAULT_POINTS),
+    }
 
-    if product_id:
-        qs = qs.filter(product_id=product_id)
+    if params["warehouse_id"]:
+        warehouse_ids = [params["warehouse_id"]]
+    else:
+        warehouse_ids = list(Warehouse.objects.order_by("id").values_list("id", flat=True))
 
-    if warehouse_id:
-        qs = qs.filter(document__src_warehouse_id=warehouse_id)
+    series = cached_response(
+        "sales_analytics",
+        {**params, "today": timezone.now().date()},
+        [("warehouse", warehouse_id) for warehouse_id in warehouse_ids],
+        lambda: get_sales_series(**params),
+    )
 
-    start_date = parse_date(date_from_str) if date_from_str else None
-    end_date = parse_date(date_to_str) if date_to_str else None
+    return JsonResponse(series)
 
-    if start_date:
-        qs = qs.filter(document__doc_date__date__gte=start_date)
 
-    if end_date:
-        qs = qs.filter(document__doc_date__date__lte=end_date)
+def _autocomplete_response(qs, page, label):
+    page = max(page, 1)
+    offset = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    chunk = list(qs[offset:offset + AUTOCOMPLETE_PAGE_SIZE + 1])
+
+    return JsonResponse({
+        "results": [{"id": obj.id, "text": label(obj)} for obj in chunk[:AUTOCOMPLETE_PAGE_SIZE]],
+        "pagination": {"more": len(chunk) > AUTOCOMPLETE_PAGE_SIZE},
+    })
+
+
+@staff_member_required
+def product_autocomplete_view(request):
+    term = request.GET.get("q", "").strip()
+
+    qs = Product.objects.select_related("brand").only("id", "name", "sku", "brand__name").order_by("name", "id")
+    if term:
+        qs = qs.filter(Q(name__icontains=term) | Q(sku__icontains=term))
 
-    data_qs = (
-        qs.values("document__doc_date__date")
-        .annotate(total=Sum("quantity"))
-        .order_by("document__doc_date__date")
+    return _autocomplete_response(
+        qs, _parse_int(request.GET.get("page"), 1),
+        lambda p: f"{p.name} ({p.brand.name}, {p.sku})",
     )
 
-    sales_dict = {
-        item["document__doc_date__date"]: float(item["total"]) 
-        for item in data_qs
-    }
-    
-    if not start_date or not end_date:
-        if not sales_dict:
-            current_date = timezone.now().date()
-            if not start_date:
-                start_date = current_date
-            if not end_date:
-                end_date = current_date
-        else:
-            dates = list(sales_dict.keys())
-            if not start_date:
-                start_date = min(dates)
-            if not end_date:
-                end_date = max(dates)
-
-    labels = []
-    values = []
-    
-    current_date = start_date
-    while current_date <= end_date:
-        labels.append(str(current_date))
-        
-        val = sales_dict.get(current_date, 0)
-        values.append(val)
-        
-        current_date += timedelta(days=1)
+
+@staff_member_required
+def brand_autocomplete_view(request):
+    term = request.GET.get("q", "").strip()
+
+    qs = Brand.objects.only("id", "name").order_by("name")
+    if term:
+        qs = qs.filter(name__icontains=term)
+
+    return _autocomplete_response(qs, _parse_int(request.GET.get("page"), 1), lambda b: b.name)
+
+
+@staff_member_required
+def sales_analytics_view(request):
+    context = admin.site.each_context(request)
+
+    product_id = _parse_int(request.GET.get("product"))
+    brand_id = _parse_int(request.GET.get("brand"))
+
+    selected_product = Product.objects.select_related("brand").filter(pk=product_id).first() if product_id else None
+    selected_brand = Brand.objects.filter(pk=brand_id).first() if brand_id else None
 
     context.update({
         "title": "Аналітика продажів",
-        "labels": labels,
-        "values": values,
-        "products": Product.objects.all(),
         "warehouses": Warehouse.objects.all(),
-        "selected_product": product_id,
-        "selected_warehouse": warehouse_id,
-        "date_from": date_from_str or "",
-        "date_to": date_to_str or "",
+        "selected_product": selected_product,
+        "selected_brand": selected_brand,
+        "selected_warehouse": request.GET.get("warehouse", ""),
+        "granularity": request.GET.get("granularity", "day"),
+        "date_from": request.GET.get("date_from", ""),
+        "date_to": request.GET.get("date_to", ""),
     })
 
-    return render(request, "admin/sales_analytics.html", context)
\ No newline at end of file
+    return render(request, "admin/sales_analytics.html", context)
@@ -0,0 +1,115 @@
+"""
+Версійований кеш відповідей.
+
+Ключ запису складається з простору імен, параметрів запиту та поточних версій
+даних, від яких залежить результат (наприклад, склад). Зміна даних
+лише збільшує версію, тому старі записи більше ніколи не читаються і не
+потребують підбору TTL.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "data-version:{scope}:{obj_id}"
+ENTRY_KEY = "response-cache:{namespace}:{digest}"
+STATS_KEY = "response-cache-stats:{namespace}:{outcome}"
+STATS_NAMESPACES_KEY = "response-cache-stats:namespaces"
+
+
+def _version_key(scope, obj_id):
+    return VERSION_KEY.format(scope=scope, obj_id=obj_id)
+
+
+def get_versions(scopes):
+    """
+    Повертає версії для списку пар (scope, id). Відсутня версія ініціалізується
+    поточним часом, щоб після витіснення ключа не повернутись до старої версії.
+    """
+    keys = [_version_key(scope, obj_id) for scope, obj_id in scopes]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def _incr_version(key):
+    if not cache.add(key, time.time_ns(), timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_version(scope, obj_id):
+    """Інвалідує всі записи, що залежать від (scope, id), після коміту транзакції."""
+    key = _version_key(scope, obj_id)
+    transaction.on_commit(lambda: _incr_version(key))
+
+
+def _count(namespace, outcome):
+    key = STATS_KEY.format(namespace=namespace, outcome=outcome)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def cached_response(namespace, params, scopes, compute):
+    """
+    Повертає результат compute() з кешу або обчислює та зберігає його.
+    params — параметри запиту, scopes — пари (scope, id), від яких залежать дані.
+    """
+    versions = get_versions(scopes)
+    payload = json.dumps(
+        {"params": params, "versions": list(zip([f"{s}:{i}" for s, i in scopes], versions))},
+        sort_keys=True,
+        default=str,
+    )
+    key = ENTRY_KEY.format(namespace=namespace, digest=hashlib.sha1(payload.encode()).hexdigest())
+
+    value = cache.get(key)
+    if value is not None:
+        _count(namespace, "hit")
+        return value
+
+    _count(namespace, "miss")
+    value = compute()
+    cache.set(key, value, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+    namespaces = cache.get(STATS_NAMESPACES_KEY) or set()
+    if namespace not in namespaces:
+        cache.set(STATS_NAMESPACES_KEY, namespaces | {namespace}, timeout=None)
+
+    return value
+
+
+def get_cache_stats():
+    """Лічильники влучань/промахів кешу по просторах імен."""
+    namespaces = sorted(cache.get(STATS_NAMESPACES_KEY) or set())
+    keys = [
+        STATS_KEY.format(namespace=namespace, outcome=outcome)
+        for namespace in namespaces
+        for outcome in ("hit", "miss")
+    ]
+    counters = cache.get_many(keys)
+
+    stats = {}
+    for namespace in namespaces:
+        hits = counters.get(STATS_KEY.format(namespace=namespace, outcome="hit"), 0)
+        misses = counters.get(STATS_KEY.format(namespace=namespace, outcome="miss"), 0)
+        total = hits + misses
+        stats[namespace] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    return stats
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from erp.models import DailySales
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily sales rollup from posted SALE documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date-from", type=str, default="", help="Date in YYYY-MM-DD format")
+        parser.add_argument("--date-to", type=str, default="", help="Date in YYYY-MM-DD format")
+
+    def handle(self, *args, **options):
+        date_from = self._parse(options["date_from"])
+        date_to = self._parse(options["date_to"])
+
+        if date_from and date_to and date_from > date_to:
+            raise CommandError("--date-from must not be later than --date-to.")
+
+        self.stdout.write(self.style.WARNING("Rebuilding daily sales rollup..."))
+
+        rows = DailySales.objects.rebuild(date_from=date_from, date_to=date_to)
+
+        self.stdout.write(self.style.SUCCESS(f"Done! Written {rows} rollup rows."))
+
+    @staticmethod
+    def _parse(value):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"Wrong date format: {value}")
+        return parsed
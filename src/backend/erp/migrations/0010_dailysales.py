@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:16
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_daily_sales(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO erp_dailysales (product_id, warehouse_id, day, quantity, revenue)
+            SELECT i.product_id, d.src_warehouse_id, (d.doc_date AT TIME ZONE %s)::date,
+                   SUM(i.quantity), SUM(COALESCE(i.price, 0))
+            FROM erp_documentitem i
+            JOIN erp_document d ON d.id = i.document_id
+            WHERE d.doc_type = 'SALE' AND d.status = 'POSTED'
+            GROUP BY 1, 2, 3
+        """, [settings.TIME_ZONE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0009_rename_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=16)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='erp.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='erp.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='erp_dailysa_day_4f429f_idx'), models.Index(fields=['warehouse', 'day'], name='erp_dailysa_warehou_470625_idx')],
+                'unique_together': {('product', 'warehouse', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:27
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0010_dailysales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysales',
+            name='updated_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddIndex(
+            model_name='dailysales',
+            index=models.Index(fields=['warehouse', 'updated_at'], name='erp_dailysa_warehou_863ddd_idx'),
+        ),
+    ]
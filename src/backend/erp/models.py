@@ -2,9 +2,13 @@ from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Now
 from django.utils import timezone
 
+from .cache import bump_version
+from .signals import document_posted, document_unposted
+
 
 class Brand(models.Model):
     name = models.CharField(max_length=128, unique=True)
@@ -73,11 +77,48 @@ class Warehouse(models.Model):
         return f"{self.name} ({self.location})"
 
 
+class InventoryManager(models.Manager):
+    def apply_deltas(self, warehouse_id, deltas, error_message="Недостатньо товару '{name}' на складі.",
+                     batch_size=5000):
+        """
+        Змінює залишки складу на {product_id: delta} — по одній дельті на товар,
+        пакетами замість запиту на кожен рядок. Відсутні рядки створюються.
+        Якщо залишок став би від'ємним, кидає ValidationError(error_message).
+        Викликати всередині транзакції.
+        """
+        product_ids = [pid for pid, delta in deltas.items() if delta]
+
+        for start in range(0, len(product_ids), batch_size):
+            chunk = product_ids[start:start + batch_size]
+            existing = {
+                inv.product_id: inv  # type: ignore
+                for inv in self.select_for_update().filter(warehouse_id=warehouse_id, product_id__in=chunk)
+            }
+
+            to_update, to_create = [], []
+            for pid in chunk:
+                inv = existing.get(pid)
+                quantity = (inv.quantity if inv else Decimal(0)) + deltas[pid]
+                if quantity < 0:
+                    name = Product.objects.filter(pk=pid).values_list("name", flat=True).first()
+                    raise ValidationError(error_message.format(name=name))
+                if inv:
+                    inv.quantity = quantity
+                    to_update.append(inv)
+                else:
+                    to_create.append(self.model(product_id=pid, warehouse_id=warehouse_id, quantity=quantity))
+
+            self.bulk_update(to_update, ["quantity"], batch_size=batch_size)
+            self.bulk_create(to_create, batch_size=batch_size)
+
+
 class Inventory(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
 
+    objects = InventoryManager()
+
     class Meta:
         unique_together = ("product", "warehouse")
 
@@ -85,6 +126,17 @@ class Inventory(models.Model):
         return f"{self.product.name} in {self.warehouse.name}: {self.quantity} pcs"
 
 
+def select_price_level(levels, total_qty):
+    """
+    Рівень ціни для закупівлі total_qty одиниць бренду: найбільший рівень, що не
+    перевищує кількість, інакше — найбільший взагалі. levels — за зростанням minimal_quantity.
+    """
+    return next(
+        (level for level in reversed(levels) if level.minimal_quantity <= total_qty),
+        levels[-1],
+    )
+
+
 class Document(models.Model):
     class DocType(models.TextChoices):
         PURCHASE = "PURCHASE", "Прихід"
@@ -119,8 +171,18 @@ class Document(models.Model):
         return f"{self.doc_type} #{self.id}"  # type: ignore
     
     def recalc_prices(self):
-        items = list(self.items.select_related("product", "product__brand"))  # type: ignore
-
+        items = list(self.items.select_related("product"))  # type: ignore
+
+        # Усі рівні цін товарів документа одним запитом, за зростанням мінімальної кількості.
+        levels = {}
+        for level in (
+            ProductPriceLevel.objects
+            .filter(product_id__in={item.product_id for item in items})
+            .order_by("product_id", "minimal_quantity")
+        ):
+            levels.setdefault(level.product_id, []).append(level)  # type: ignore
+
+        changed = []
         brand_groups = {}
         for item in items:
             brand = item.product.brand_id
@@ -129,36 +191,14 @@ class Document(models.Model):
         for brand_id, brand_items in brand_groups.items():
             total_qty = sum(item.quantity for item in brand_items)
 
-            levels_by_product = {}
-
             for item in brand_items:
-                product = item.product
-
-                if product.id not in levels_by_product:
-                    price_level = (
-                        ProductPriceLevel.objects
-                        .filter(
-                            product=product,
-                            minimal_quantity__lte=total_qty
-                        )
-                        .order_by("-minimal_quantity")
-                        .first()
-                    )
-
-                    if not price_level:
-                        price_level = (
-                            ProductPriceLevel.objects
-                            .filter(product=product)
-                            .order_by("-minimal_quantity")
-                            .first()
-                        )
-
-                    levels_by_product[product.id] = price_level
-
-                level = levels_by_product[product.id]
-                item.price = level.price * item.quantity
-
-        DocumentItem.objects.bulk_update(items, ["price"])
+                level = select_price_level(levels[item.product_id], total_qty)
+                price = level.price * item.quantity
+                if item.price != price:
+                    item.price = price
+                    changed.append(item)
+
+        DocumentItem.objects.bulk_update(changed, ["price"], batch_size=5000)
     
     def clean(self):
         if self.doc_type == self.DocType.PURCHASE:
@@ -181,6 +221,7 @@ class Document(models.Model):
             if self.src_warehouse == self.dst_warehouse:
                 raise ValidationError("Неможливо перемістити товар у той самий склад.")
 
+    @transaction.atomic
     def post(self):
         """Провести документ: обновить остатки."""
         if self.status == self.Status.POSTED:
@@ -239,11 +280,58 @@ class Document(models.Model):
                 inv_dst.quantity += qty
                 inv_dst.save()
 
+        self._finish_posting()
+
+    @transaction.atomic
+    def post_bulk(self):
+        """
+        Провести великий документ (початкове завантаження, згенеровані дані):
+        залишки змінюються однією дельтою на товар пакетними запитами.
+        Результат такий самий, як у post().
+        """
+        if self.status == self.Status.POSTED:
+            raise ValidationError("Документ вже проведено.")
+
+        self.clean()
+
+        deltas = {
+            product_id: quantity
+            for product_id, quantity in self.items.values("product_id")  # type: ignore
+            .annotate(total=models.Sum("quantity")).values_list("product_id", "total").order_by()
+        }
+
+        if self.doc_type == self.DocType.PURCHASE:
+            Inventory.objects.apply_deltas(self.dst_warehouse_id, deltas)  # type: ignore
+        elif self.doc_type == self.DocType.SALE:
+            Inventory.objects.apply_deltas(self.src_warehouse_id, {k: -v for k, v in deltas.items()})  # type: ignore
+        elif self.doc_type == self.DocType.WRITE_OFF:
+            Inventory.objects.apply_deltas(
+                self.src_warehouse_id, {k: -v for k, v in deltas.items()},  # type: ignore
+                error_message="Недостатньо товару '{name}' для списання.",
+            )
+        elif self.doc_type == self.DocType.TRANSFER:
+            Inventory.objects.apply_deltas(
+                self.src_warehouse_id, {k: -v for k, v in deltas.items()},  # type: ignore
+                error_message="Недостатньо товару '{name}' для переміщення.",
+            )
+            Inventory.objects.apply_deltas(self.dst_warehouse_id, deltas)  # type: ignore
+
+        self._finish_posting()
+
+    def _finish_posting(self):
         self.recalc_prices()
 
+        if self.doc_type == self.DocType.SALE:
+            DailySales.objects.apply_document(self)
+
         self.status = self.Status.POSTED
         self.save()
 
+        document_posted.send(sender=Document, document=self)
+
+        self.bump_data_versions()
+
+    @transaction.atomic
     def unpost(self):
         """Скасувати проведення (повний відкат змін)"""
         if self.status != self.Status.POSTED:
@@ -291,8 +379,21 @@ class Document(models.Model):
                 inv_dst.quantity -= qty
                 inv_dst.save()
 
+        if self.doc_type == self.DocType.SALE:
+            DailySales.objects.apply_document(self, sign=-1)
+
         self.status = self.Status.CANCELED
         self.save()
+
+        document_unposted.send(sender=Document, document=self)
+
+        self.bump_data_versions()
+
+    def bump_data_versions(self):
+        """Інвалідує кешовані дані складів, яких стосується документ."""
+        for warehouse_id in {self.src_warehouse_id, self.dst_warehouse_id}:  # type: ignore
+            if warehouse_id:
+                bump_version("warehouse", warehouse_id)
     
     def save(self, *args, **kwargs):
         if self.pk is None:
@@ -340,3 +441,120 @@ class DocumentItem(models.Model):
             self.price = Decimal(0)
 
         super().save(*args, **kwargs)
+
+
+
+class DailySalesManager(models.Manager):
+    def apply_document(self, document, sign=1):
+        """
+        Додає (sign=1) або віднімає (sign=-1) рядки проведеного продажу
+        в денному агрегаті одним upsert-запитом. Рядки не видаляються: після
+        скасування лишається нуль зі свіжим updated_at.
+        """
+        rows = list(document.items.values_list("product_id", "quantity", "price"))
+        if not rows:
+            return
+
+        day = timezone.localdate(document.doc_date)
+        warehouse_id = document.src_warehouse_id
+
+        table = self.model._meta.db_table
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+        params = []
+        for product_id, quantity, price in rows:
+            params += [product_id, warehouse_id, day, sign * quantity, sign * (price or Decimal(0))]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (product_id, warehouse_id, day, quantity, revenue)
+                VALUES {placeholders}
+                ON CONFLICT (product_id, warehouse_id, day) DO UPDATE SET
+                    quantity = {table}.quantity + EXCLUDED.quantity,
+                    revenue = {table}.revenue + EXCLUDED.revenue,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                params,
+            )
+
+    @transaction.atomic
+    def rebuild(self, date_from=None, date_to=None):
+        """
+        Перебудовує агрегат з проведених продажів (повністю або за діапазон днів).
+        Наявні рядки обнуляються, а не видаляються, щоб зміну бачили за updated_at.
+        Повертає кількість записаних рядків.
+        """
+        table = self.model._meta.db_table
+        items_table = DocumentItem._meta.db_table
+        docs_table = Document._meta.db_table
+
+        day_expr = "(d.doc_date AT TIME ZONE %s)::date"
+        tz_name = timezone.get_current_timezone_name()
+
+        existing = self.all()
+        conditions = ["d.doc_type = %s", "d.status = %s"]
+        params = [tz_name, Document.DocType.SALE, Document.Status.POSTED]
+
+        if date_from:
+            existing = existing.filter(day__gte=date_from)
+            conditions.append(f"{day_expr} >= %s")
+            params += [tz_name, date_from]
+        if date_to:
+            existing = existing.filter(day__lte=date_to)
+            conditions.append(f"{day_expr} <= %s")
+            params += [tz_name, date_to]
+
+        existing.update(quantity=0, revenue=0, updated_at=Now())
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (product_id, warehouse_id, day, quantity, revenue)
+                SELECT i.product_id, d.src_warehouse_id, {day_expr},
+                       SUM(i.quantity), SUM(COALESCE(i.price, 0))
+                FROM {items_table} i
+                JOIN {docs_table} d ON d.id = i.document_id
+                WHERE {" AND ".join(conditions)}
+                GROUP BY 1, 2, 3
+                ON CONFLICT (product_id, warehouse_id, day) DO UPDATE SET
+                    quantity = EXCLUDED.quantity,
+                    revenue = EXCLUDED.revenue,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                params,
+            )
+            rows = cursor.rowcount
+
+        for warehouse_id in Warehouse.objects.values_list("id", flat=True):
+            bump_version("warehouse", warehouse_id)
+
+        return rows
+
+
+class DailySales(models.Model):
+    """
+    Денний агрегат проведених продажів (товар, склад, день).
+    Оновлюється транзакційно в Document.post / Document.unpost.
+    updated_at — час останньої зміни рядка (початок транзакції), за ним
+    дискове сховище продажів перевіряє, чи не відстало від БД.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
+    day = models.DateField()
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal(0))
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal(0))
+    updated_at = models.DateTimeField(db_default=Now())
+
+    objects = DailySalesManager()
+
+    class Meta:
+        unique_together = ("product", "warehouse", "day")
+        indexes = [
+            models.Index(fields=["day"]),
+            models.Index(fields=["warehouse", "day"]),
+            models.Index(fields=["warehouse", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.warehouse_id} {self.day}: {self.quantity}"  # type: ignore
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Надсилаються всередині транзакції Document.post() / Document.unpost()
+# після оновлення залишків і денного агрегату продажів.
+# Аргументи: sender=Document, document=<Document>.
+document_posted = Signal()
+document_unposted = Signal()
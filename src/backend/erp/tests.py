@@ -1,3 +1,95 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Brand, DailySales, Document, DocumentItem, Inventory, Product, ProductPriceLevel, Warehouse
+
+
+class DailySalesTest(TestCase):
+    """Денний агрегат продажів при проведенні, скасуванні та перебудові."""
+
+    day = datetime.date(2024, 3, 5)
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Brand", country="UA")
+        self.warehouse = Warehouse.objects.create(name="Склад", location="Адреса")
+        self.products = [
+            Product.objects.create(name=f"Товар {i}", sku=f"SKU{i}", brand=brand, sale_price=10)
+            for i in range(2)
+        ]
+        for product in self.products:
+            ProductPriceLevel.objects.create(product=product, minimal_quantity=1, price=5)
+            ProductPriceLevel.objects.create(product=product, minimal_quantity=10, price=4)
+            Inventory.objects.create(product=product, warehouse=self.warehouse, quantity=1000)
+
+    def sell(self, day, quantities, hour=12):
+        document = Document.objects.create(
+            doc_type=Document.DocType.SALE,
+            src_warehouse=self.warehouse,
+            doc_date=timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour))),
+        )
+        for product, quantity in quantities.items():
+            DocumentItem.objects.create(document=document, product=product, quantity=quantity)
+        document.post()
+        return document
+
+    def rollup(self):
+        return {
+            (product_id, day): (quantity, revenue)
+            for product_id, day, quantity, revenue in DailySales.objects.filter(
+                warehouse=self.warehouse
+            ).values_list("product_id", "day", "quantity", "revenue")
+        }
+
+    def test_post_and_unpost_upsert_rows(self):
+        p0, p1 = self.products
+
+        # Ціна за рівнем від загальної кількості бренду в документі: 5 шт. — по 5, 12 шт. — по 4.
+        first = self.sell(self.day, {p0: 2, p1: 3}, hour=9)
+        second = self.sell(self.day, {p0: 12}, hour=18)
+        self.assertEqual(self.rollup(), {
+            (p0.id, self.day): (Decimal(14), Decimal(58)),
+            (p1.id, self.day): (Decimal(3), Decimal(15)),
+        })
+
+        second.unpost()
+        self.assertEqual(self.rollup()[(p0.id, self.day)], (Decimal(2), Decimal(10)))
+
+        # Після скасування рядки лишаються з нулями.
+        first.unpost()
+        self.assertEqual(self.rollup(), {
+            (p0.id, self.day): (Decimal(0), Decimal(0)),
+            (p1.id, self.day): (Decimal(0), Decimal(0)),
+        })
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "перебудова агрегату використовує SQL PostgreSQL")
+    def test_rebuild_matches_apply_document(self):
+        p0, p1 = self.products
+        next_day = self.day + datetime.timedelta(days=1)
+
+        self.sell(self.day, {p0: 2, p1: 3})
+        self.sell(self.day, {p0: 12})
+        self.sell(next_day, {p1: 1}).unpost()
+        self.sell(next_day, {p0: 4, p1: 7})
+        self.sell(next_day + datetime.timedelta(days=1), {p1: 2}).unpost()
+        incremental = self.rollup()
+
+        DailySales.objects.rebuild()
+        self.assertEqual(self.rollup(), incremental)
+
+        DailySales.objects.all().delete()
+        DailySales.objects.rebuild()
+        self.assertEqual(
+            self.rollup(),
+            {key: value for key, value in incremental.items() if value[0]},
+        )
 
-# Create your tests here.
+        DailySales.objects.rebuild(date_from=next_day, date_to=next_day)
+        self.assertEqual(
+            self.rollup(),
+            {key: value for key, value in incremental.items() if value[0]},
+        )
@@ -0,0 +1,32 @@
+import io
+
+from django.db import connection
+
+
+def insert_frame(model, frame, batch_size=100_000):
+    """
+    Inserts DataFrame rows into the model table; columns are the table column
+    names (e.g. "product_id"). Uses COPY on PostgreSQL and bulk_create
+    elsewhere. Values must not contain tabs or newlines.
+    Returns the number of inserted rows.
+    """
+    if frame.empty:
+        return 0
+
+    if connection.vendor == "postgresql":
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ", ".join(connection.ops.quote_name(column) for column in frame.columns)
+        with connection.cursor() as cursor:
+            for start in range(0, len(frame), batch_size):
+                buffer = io.StringIO()
+                frame.iloc[start:start + batch_size].to_csv(
+                    buffer, sep="\t", header=False, index=False, na_rep="\\N"
+                )
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+    else:
+        for start in range(0, len(frame), batch_size):
+            records = frame.iloc[start:start + batch_size].to_dict("records")
+            model.objects.bulk_create([model(**record) for record in records], batch_size=5000)
+
+    return len(frame)
@@ -0,0 +1,343 @@
+"""
+Deterministic large-scale ERP dataset for benchmarks.
+
+The catalog is split into shards of consecutive brands. Each shard draws from
+its own np.random.Generator seeded with (seed, shard index) and writes its
+brands, products, price levels, document items, inventory and daily sales
+rollup in one transaction, so shards can run in any order on any number of
+processes and the same seed always yields the same rows.
+
+Identifiers are derived from positions instead of sequences (products and
+brands by shard offset, documents by warehouse and day, items by document and
+product), which is what lets shards write with COPY independently. The dataset
+is written into empty ERP tables; sequences are moved past the generated ids
+at the end, and demand estimates are rebuilt from the daily sales rollup.
+Dates are anchored to end_date.
+"""
+import datetime
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import django
+import numpy as np
+import pandas as pd
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from erp.cache import bump_version
+from erp.models import (
+    Brand,
+    DailySales,
+    Document,
+    DocumentItem,
+    Inventory,
+    Product,
+    ProductPriceLevel,
+    Warehouse,
+)
+from replenishment.models import DemandEstimate
+
+from .bulk import insert_frame
+from .utils import (
+    NAME_PARTS,
+    NAME_SUFFIXES,
+    generate_sales_matrix,
+    get_payday_factors,
+    get_random_product_profiles,
+    level_prices,
+)
+
+ERP_MODELS = (Brand, Product, ProductPriceLevel, Warehouse, Inventory, Document, DocumentItem, DailySales)
+
+SHARD_PRODUCTS = 5000
+PRODUCTS_PER_BRAND = 8
+MAX_PRICE_LEVELS = 5
+COVERAGE_DAYS = 14
+COUNTRIES = ["USA", "Germany", "China", "Japan", "France"]
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    seed: int
+    products: int
+    warehouses: int
+    days: int
+    end_date: datetime.date
+
+    @property
+    def start_date(self):
+        return self.end_date - datetime.timedelta(days=self.days - 1)
+
+    def purchase_doc_id(self, warehouse_idx):
+        return warehouse_idx + 1
+
+    def sale_doc_id(self, warehouse_idx, day_idx):
+        return self.warehouses + 1 + warehouse_idx * self.days + day_idx
+
+    def item_id(self, doc_id, product_id):
+        return doc_id * (self.products + 1) + product_id
+
+    def doc_datetime(self, day):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time(8, 0)))
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int
+    product_offset: int
+    products: int
+    brand_offset: int
+    brands: int
+
+
+def plan_shards(total_products, shard_size=SHARD_PRODUCTS):
+    """Splits the catalog into shards; the split depends only on the sizes."""
+    shards = []
+    product_offset = brand_offset = 0
+    for index in range(math.ceil(total_products / shard_size)):
+        products = min(shard_size, total_products - product_offset)
+        brands = max(1, round(products / PRODUCTS_PER_BRAND))
+        shards.append(Shard(index, product_offset, products, brand_offset, brands))
+        product_offset += products
+        brand_offset += brands
+    return shards
+
+
+def entity_names(ids):
+    """Unique names from the generator's name parts, suffixed with the id."""
+    return [
+        f"{NAME_PARTS[i % len(NAME_PARTS)]}{NAME_SUFFIXES[(i // len(NAME_PARTS)) % len(NAME_SUFFIXES)]}{i}"
+        for i in ids.tolist()
+    ]
+
+
+def reset_erp_tables():
+    """Empties all ERP tables (and everything that depends on them)."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            tables = ", ".join(model._meta.db_table for model in ERP_MODELS)
+            cursor.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+        else:
+            for model in reversed(ERP_MODELS):
+                model.objects.all().delete()
+
+
+def write_header(spec):
+    """Warehouses and all documents (one purchase per warehouse, one sale per warehouse and day)."""
+    warehouse_ids = np.arange(1, spec.warehouses + 1)
+    insert_frame(Warehouse, pd.DataFrame({
+        "id": warehouse_ids,
+        "name": [f"Warehouse {i}" for i in warehouse_ids.tolist()],
+        "location": [f"Location {i}" for i in warehouse_ids.tolist()],
+    }))
+
+    opening = spec.doc_datetime(spec.start_date - datetime.timedelta(days=1))
+    days = [spec.doc_datetime(spec.start_date + datetime.timedelta(days=d)) for d in range(spec.days)]
+
+    purchases = pd.DataFrame({
+        "id": [spec.purchase_doc_id(w) for w in range(spec.warehouses)],
+        "doc_type": Document.DocType.PURCHASE,
+        "status": Document.Status.POSTED,
+        "doc_date": opening,
+        "src_warehouse_id": None,
+        "dst_warehouse_id": warehouse_ids,
+        "note": "Початкове завантаження складу",
+    })
+    sales = pd.DataFrame({
+        "id": [spec.sale_doc_id(w, d) for w in range(spec.warehouses) for d in range(spec.days)],
+        "doc_type": Document.DocType.SALE,
+        "status": Document.Status.POSTED,
+        "doc_date": days * spec.warehouses,
+        "src_warehouse_id": np.repeat(warehouse_ids, spec.days),
+        "dst_warehouse_id": None,
+        "note": [f"Simulated sales for {day.date()}" for day in days] * spec.warehouses,
+    })
+    insert_frame(Document, pd.concat([purchases, sales], ignore_index=True))
+
+
+def build_shard(spec, shard):
+    """Generates all rows of a shard: {model: DataFrame}. Pure NumPy, no database access."""
+    rng = np.random.default_rng(np.random.SeedSequence([spec.seed, shard.index]))
+    n = shard.products
+
+    brand_ids = np.arange(shard.brand_offset + 1, shard.brand_offset + shard.brands + 1)
+    product_ids = np.arange(shard.product_offset + 1, shard.product_offset + n + 1)
+
+    # Every brand gets at least one product, the rest are spread at random.
+    local_brand = np.sort(np.concatenate([
+        np.arange(min(shard.brands, n)),
+        rng.integers(0, shard.brands, max(n - shard.brands, 0)),
+    ]))
+    product_brand = brand_ids[local_brand]
+
+    ads = rng.uniform(0.01, 2.0, n)
+
+    # Price levels: minimal quantity 1 plus 1..MAX-1 larger ones, each cheaper than the last.
+    n_levels = rng.integers(2, MAX_PRICE_LEVELS + 1, n)
+    steps = np.maximum(1, np.rint(rng.uniform(0.2, 1.0, (n, MAX_PRICE_LEVELS)) * ads[:, None] * 30))
+    steps[:, 0] = 0
+    quantities = 1 + np.cumsum(steps, axis=1).astype(np.int64)
+    discounts = rng.uniform(0.5, 1.5, (n, MAX_PRICE_LEVELS))
+    discounts[:, 0] = 0
+    prices = np.round(np.maximum(rng.uniform(5, 100, n)[:, None] - np.cumsum(discounts, axis=1), 1.0), 2)
+
+    mask = np.arange(MAX_PRICE_LEVELS)[None, :] < n_levels[:, None]
+    level_rows, level_cols = np.nonzero(mask)
+    levels = np.column_stack([
+        product_ids[level_rows], quantities[level_rows, level_cols], prices[level_rows, level_cols],
+    ]).astype(np.float64)
+    min_price = prices[np.arange(n), n_levels - 1]
+    sale_price = np.round(min_price * rng.uniform(1.05, 1.3, n), 2)
+
+    days = [spec.start_date + datetime.timedelta(days=d) for d in range(spec.days)]
+    payday = get_payday_factors(days)
+
+    items, inventory, rollup = [], [], []
+    for w in range(spec.warehouses):
+        warehouse_id = w + 1
+        demand = ads * rng.uniform(0.5, 1.5, n)
+
+        sales = generate_sales_matrix(
+            spec.days,
+            np.rint(demand * spec.days),
+            spec.start_date.weekday(),
+            rng=rng,
+            weekly_profiles=get_random_product_profiles(n, rng),
+            trend_volatility=rng.uniform(0.05, 0.2, n),
+            spike_prob=rng.uniform(0.01, 0.05, n),
+            payday_factors=payday,
+        )
+        sold = sales.sum(axis=1)
+        opening = sold + np.rint(demand * COVERAGE_DAYS * rng.uniform(0, 1.2, n)).astype(np.int64) + 1
+
+        purchase_id = spec.purchase_doc_id(w)
+        items.append(pd.DataFrame({
+            "id": spec.item_id(purchase_id, product_ids),
+            "document_id": purchase_id,
+            "product_id": product_ids,
+            "quantity": opening,
+            "price": level_prices(levels, product_ids, product_brand, np.zeros(n, dtype=np.int64), opening.astype(np.float64)),
+        }))
+
+        rows, day_idx = np.nonzero(sales)
+        quantity = sales[rows, day_idx].astype(np.float64)
+        doc_ids = spec.sale_doc_id(w, day_idx)
+        price = level_prices(levels, product_ids[rows], product_brand[rows], day_idx, quantity)
+        ids = spec.item_id(doc_ids, product_ids[rows])
+
+        items.append(pd.DataFrame({
+            "id": ids,
+            "document_id": doc_ids,
+            "product_id": product_ids[rows],
+            "quantity": quantity,
+            "price": price,
+        }))
+        rollup.append(pd.DataFrame({
+            "id": ids,
+            "product_id": product_ids[rows],
+            "warehouse_id": warehouse_id,
+            "day": np.array(days, dtype="datetime64[D]")[day_idx],
+            "quantity": quantity,
+            "revenue": price,
+        }))
+        inventory.append(pd.DataFrame({
+            "id": w * spec.products + product_ids,
+            "product_id": product_ids,
+            "warehouse_id": warehouse_id,
+            "quantity": opening - sold,
+        }))
+
+    return {
+        Brand: pd.DataFrame({
+            "id": brand_ids,
+            "name": entity_names(brand_ids),
+            "country": np.array(COUNTRIES)[rng.integers(0, len(COUNTRIES), shard.brands)],
+        }),
+        Product: pd.DataFrame({
+            "id": product_ids,
+            "name": entity_names(product_ids),
+            "sku": [f"SKU{pid:09d}" for pid in product_ids.tolist()],
+            "brand_id": product_brand,
+            "sale_price": sale_price,
+        }),
+        ProductPriceLevel: pd.DataFrame({
+            "id": (product_ids[level_rows] - 1) * MAX_PRICE_LEVELS + level_cols + 1,
+            "product_id": product_ids[level_rows],
+            "minimal_quantity": quantities[level_rows, level_cols],
+            "price": prices[level_rows, level_cols],
+        }),
+        DocumentItem: pd.concat(items, ignore_index=True),
+        Inventory: pd.concat(inventory, ignore_index=True),
+        DailySales: pd.concat(rollup, ignore_index=True),
+    }
+
+
+def write_shard(spec, shard):
+    """Generates and writes one shard in its own transaction. Returns {table: rows}."""
+    frames = build_shard(spec, shard)
+    with transaction.atomic():
+        return {model._meta.db_table: insert_frame(model, frames[model]) for model in frames}
+
+
+def _write_shard_task(args):
+    return write_shard(*args)
+
+
+def generate_dataset(seed, products, warehouses, days, end_date=None, workers=1,
+                     shard_size=SHARD_PRODUCTS, func_to_show=None):
+    """
+    Writes the dataset into empty ERP tables using a pool of workers processes
+    (one shard per task). Returns {table: rows written}.
+    """
+    if Product.objects.exists() or Document.objects.exists() or Warehouse.objects.exists():
+        raise ValueError("ERP tables are not empty.")
+
+    spec = DatasetSpec(
+        seed=seed, products=products, warehouses=warehouses, days=days,
+        end_date=end_date or timezone.localdate() - datetime.timedelta(days=1),
+    )
+    shards = plan_shards(products, shard_size)
+
+    if func_to_show:
+        func_to_show(f"Writing {len(shards)} shards from {spec.start_date} to {spec.end_date}...")
+
+    with transaction.atomic():
+        write_header(spec)
+
+    totals = {}
+
+    def collect(counts, done):
+        for table, rows in counts.items():
+            totals[table] = totals.get(table, 0) + rows
+        if func_to_show:
+            func_to_show(f"Shard {done}/{len(shards)} written.", end="\r")
+
+    if workers <= 1:
+        for done, shard in enumerate(shards, start=1):
+            collect(write_shard(spec, shard), done)
+    else:
+        # Connections must not be shared with the spawned workers.
+        connection.close()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+            tasks = [(spec, shard) for shard in shards]
+            for done, counts in enumerate(pool.map(_write_shard_task, tasks), start=1):
+                collect(counts, done)
+
+    if func_to_show:
+        func_to_show("")
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), ERP_MODELS):
+            cursor.execute(sql)
+
+    if func_to_show:
+        func_to_show("Rebuilding demand estimates...")
+    totals[DemandEstimate._meta.db_table] = DemandEstimate.objects.rebuild()
+
+    for warehouse_id in range(1, warehouses + 1):
+        bump_version("warehouse", warehouse_id)
+
+    return totals
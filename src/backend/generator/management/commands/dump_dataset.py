@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from generator.snapshot import dump_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Dump the ERP tables, daily sales rollup, demand estimates and forecasts "
+        "to compressed CSV files with a manifest"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", type=str)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(f"Dumping dataset to {options['directory']}..."))
+
+        def func_to_show(msg, end="\n"):
+            return self.stdout.write(msg, ending=end)
+
+        manifest = dump_dataset(options["directory"], func_to_show=func_to_show)
+
+        total = sum(entry["rows"] for entry in manifest["tables"])
+        self.stdout.write(self.style.SUCCESS(f"Done! Dumped {total} rows from {len(manifest['tables'])} tables."))
@@ -0,0 +1,63 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from generator.dataset import SHARD_PRODUCTS, generate_dataset, reset_erp_tables
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic benchmark dataset (catalog, warehouses, sales history) in parallel shards"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--warehouses", type=int, default=1)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--end-date", type=str, default="", help="Last sales day in YYYY-MM-DD format (default: yesterday)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--shard-size", type=int, default=SHARD_PRODUCTS, help="Products per shard (changes the data)")
+        parser.add_argument("--from-scratch", action="store_true", help="Empty all ERP tables first")
+
+    def handle(self, *args, **options):
+        end_date = None
+        if options["end_date"]:
+            end_date = parse_date(options["end_date"])
+            if end_date is None:
+                raise CommandError(f"Wrong date format: {options['end_date']}")
+
+        for name in ("products", "warehouses", "days", "workers", "shard_size"):
+            if options[name] <= 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+
+        if options["from_scratch"]:
+            self.stdout.write(self.style.WARNING("Emptying ERP tables..."))
+            reset_erp_tables()
+
+        self.stdout.write(
+            self.style.WARNING(
+                f"Generating {options['products']} products x {options['warehouses']} warehouses x "
+                f"{options['days']} days (seed {options['seed']}, {options['workers']} workers)..."
+            )
+        )
+
+        def func_to_show(msg, end="\n"):
+            return self.stdout.write(msg, ending=end)
+
+        try:
+            totals = generate_dataset(
+                options["seed"],
+                options["products"],
+                options["warehouses"],
+                options["days"],
+                end_date=end_date,
+                workers=options["workers"],
+                shard_size=options["shard_size"],
+                func_to_show=func_to_show,
+            )
+        except ValueError as e:
+            raise CommandError(f"{e} Use --from-scratch to replace the existing data.")
+
+        for table, rows in totals.items():
+            self.stdout.write(f"{table}: {rows} rows")
+
+        self.stdout.write(self.style.SUCCESS("Dataset generation complete"))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from generator.snapshot import cascaded_models, load_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace the ERP tables, daily sales rollup, demand estimates and forecasts with a snapshot "
+        "made by dump_dataset. Tables that reference them are emptied too: "
+        + ", ".join(model._meta.db_table for model in cascaded_models())
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", type=str)
+
+    def handle(self, *args, **options):
+        emptied = [model._meta.db_table for model in cascaded_models()]
+        self.stdout.write(self.style.WARNING(f"Loading dataset from {options['directory']}..."))
+        self.stdout.write(self.style.WARNING(f"These tables will be emptied as well: {', '.join(emptied)}"))
+
+        def func_to_show(msg, end="\n"):
+            return self.stdout.write(msg, ending=end)
+
+        started = time.perf_counter()
+        try:
+            counts = load_dataset(options["directory"], func_to_show=func_to_show)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done! Loaded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -10,6 +10,8 @@ class Command(BaseCommand):
         parser.add_argument("--days", type=int, default=0)
         parser.add_argument("--min-remain", type=float, default=0.0)
         parser.add_argument("--max-remain", type=float, default=0.1)
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible sales")
+        parser.add_argument("--rollup", action="store_true", help="Also rebuild the daily sales rollup for the period and the demand estimates")
 
     def handle(self, *args, **opts):
         total_days = opts["months"] * 30 + opts["days"]
@@ -21,11 +23,24 @@ class Command(BaseCommand):
         def func_to_show(message, end="\n"):
             self.stdout.write(message, ending=end)
         
-        simulate_sales(
+        period = simulate_sales(
             total_days,
             min_remain=opts["min_remain"],
             max_remain=opts["max_remain"],
-            func_to_show=func_to_show
+            func_to_show=func_to_show,
+            seed=opts["seed"],
+            populate_rollup=opts["rollup"]
         )
 
+        if period and not opts["rollup"]:
+            date_from, date_to = period
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Daily sales rollup was not updated: forecasts, sales analytics and demand estimates "
+                    f"will not see these sales until you run "
+                    f"`rebuild_sales_rollup --date-from {date_from} --date-to {date_to}` "
+                    f"and then `rebuild_demand_estimates`."
+                )
+            )
+
         self.stdout.write(self.style.SUCCESS("Done!"))
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from erp.models import Warehouse
+from generator.stream import StreamSpec, stream_sales
+
+
+class Command(BaseCommand):
+    help = "Continuously post live sale and purchase documents at a target rate and report posting latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", type=float, default=10.0, help="Documents per second, all workers together")
+        parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--warehouse", action="append", default=[], help="Warehouse name (repeatable, default: all)")
+        parser.add_argument("--purchase-share", type=float, default=0.1, help="Share of purchase documents")
+        parser.add_argument("--lines", type=int, default=5, help="Average lines per document")
+        parser.add_argument("--day-seconds", type=float, default=60.0, help="Wall seconds per simulated demand day")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        for name in ("rate", "duration", "workers", "lines", "day_seconds"):
+            if options[name] <= 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+        if not 0 <= options["purchase_share"] <= 1:
+            raise CommandError("--purchase-share must be between 0 and 1.")
+
+        warehouses = Warehouse.objects.all()
+        if options["warehouse"]:
+            warehouses = warehouses.filter(name__in=options["warehouse"])
+        warehouse_ids = list(warehouses.values_list("id", flat=True))
+        if not warehouse_ids or len(warehouse_ids) < len(set(options["warehouse"])):
+            raise CommandError("Warehouse not found.")
+
+        spec = StreamSpec(
+            seed=options["seed"],
+            rate=options["rate"],
+            duration=options["duration"],
+            workers=options["workers"],
+            warehouse_ids=warehouse_ids,
+            purchase_share=options["purchase_share"],
+            lines=options["lines"],
+            day_seconds=options["day_seconds"],
+        )
+
+        self.stdout.write(
+            self.style.WARNING(
+                f"Streaming {spec.rate:g} documents/s for {spec.duration:g}s "
+                f"on {spec.workers} workers into {len(warehouse_ids)} warehouses..."
+            )
+        )
+
+        def func_to_show(msg, end="\n"):
+            return self.stdout.write(msg, ending=end)
+
+        try:
+            report = stream_sales(spec, func_to_show=func_to_show)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for doc_type, count in sorted(report["posted"].items()):
+            self.stdout.write(f"Posted {doc_type}: {count}")
+        for reason, count in sorted(report["failed"].items()):
+            self.stdout.write(f"Failed ({reason}): {count}")
+
+        self.stdout.write(
+            f"Throughput: {report['throughput']:.1f} posted documents/s (target {report['target_rate']:g}) "
+            f"over {report['elapsed']:.1f}s, max lag behind schedule {report['max_lag']:.2f}s"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Posting latency: p50 {report['p50_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms, "
+                f"max {report['max_ms']:.1f} ms"
+            )
+        )
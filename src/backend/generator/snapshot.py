@@ -0,0 +1,272 @@
+"""
+Dataset snapshots: the ERP tables (plus the daily sales rollup, the real-time
+demand estimates and the stored forecasts) dumped to gzip-compressed CSV files with a manifest, and loaded
+back into an emptied database.
+
+On PostgreSQL both directions use COPY. Loading runs in one transaction: the
+tables are truncated, their secondary indexes and foreign key / unique /
+check constraints are dropped, the files are copied in, and the indexes and
+constraints are recreated from their saved definitions (which also validates
+the data). Primary keys stay in place. Other databases fall back to chunked
+CSV reading and bulk_create (auto_now timestamps are refreshed there).
+Columns with a database default are not dumped: the database stamps them on
+load, so the sales matrix store sees the loaded DailySales rows as changed.
+
+Demand estimates are part of the snapshot rather than rebuilt on load:
+DemandEstimate.objects.rebuild() replays every DailySales row in Python.
+
+Emptying the snapshot tables also empties every table that references them
+(see cascaded_models): replenishment reports and forecast run items are lost.
+"""
+import csv
+import datetime
+import gzip
+import json
+from pathlib import Path
+
+import pandas as pd
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import NOT_PROVIDED
+from erp.cache import bump_version
+from erp.models import (
+    Brand,
+    DailySales,
+    Document,
+    DocumentItem,
+    Inventory,
+    Product,
+    ProductPriceLevel,
+    Warehouse,
+)
+from replenishment.models import DemandEstimate, ForecastData
+
+from .bulk import insert_frame
+
+# In dependency order: every table only references tables listed before it.
+SNAPSHOT_MODELS = (
+    Brand, Product, ProductPriceLevel, Warehouse, Inventory,
+    Document, DocumentItem, DailySales, DemandEstimate, ForecastData,
+)
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def cascaded_models():
+    """Models outside the snapshot whose tables reference snapshot tables, directly or through each other."""
+    found = []
+    pending = list(SNAPSHOT_MODELS)
+    while pending:
+        model = pending.pop()
+        for relation in model._meta.related_objects:
+            related = relation.related_model
+            if related not in SNAPSHOT_MODELS and related not in found:
+                found.append(related)
+                pending.append(related)
+    return sorted(found, key=lambda model: model._meta.db_table)
+
+
+def _fields(model):
+    # Columns with a database default (DailySales.updated_at) are stamped anew on load.
+    return [field for field in model._meta.concrete_fields if field.db_default is NOT_PROVIDED]
+
+
+def _columns(model):
+    return [field.column for field in _fields(model)]
+
+
+def _file_name(model):
+    return f"{model._meta.db_table}.csv.gz"
+
+
+def dump_dataset(directory, func_to_show=None):
+    """Writes every snapshot table to <directory>/<table>.csv.gz and the manifest. Returns the manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tables = []
+    # One snapshot of all tables, not a mix of moments.
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+        for model in SNAPSHOT_MODELS:
+            table = model._meta.db_table
+            columns = _columns(model)
+            path = directory / _file_name(model)
+
+            with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=3) as fh:
+                if connection.vendor == "postgresql":
+                    column_list = ", ".join(connection.ops.quote_name(column) for column in columns)
+                    with connection.cursor() as cursor:
+                        cursor.copy_expert(
+                            f"COPY (SELECT {column_list} FROM {table} ORDER BY {model._meta.pk.column}) "
+                            "TO STDOUT WITH (FORMAT csv, HEADER true)",
+                            fh,
+                        )
+                else:
+                    writer = csv.writer(fh)
+                    writer.writerow(columns)
+                    writer.writerows(
+                        model.objects.order_by("pk").values_list(*[f.attname for f in _fields(model)])
+                        .iterator(chunk_size=10000)
+                    )
+
+            rows = model.objects.count()
+            tables.append({
+                "model": model._meta.label,
+                "table": table,
+                "file": path.name,
+                "columns": columns,
+                "rows": rows,
+            })
+            if func_to_show:
+                func_to_show(f"{table}: {rows} rows")
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "vendor": connection.vendor,
+        "tables": tables,
+    }
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def read_manifest(directory):
+    """Reads and checks the manifest against the current models. Raises ValueError on mismatch."""
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        raise ValueError(f"No {MANIFEST} in {directory}.")
+
+    manifest = json.loads(path.read_text())
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}.")
+
+    entries = {entry["table"]: entry for entry in manifest["tables"]}
+    for model in SNAPSHOT_MODELS:
+        entry = entries.get(model._meta.db_table)
+        if entry is None:
+            raise ValueError(f"Snapshot has no table {model._meta.db_table}.")
+        if entry["columns"] != _columns(model):
+            raise ValueError(f"Columns of {model._meta.db_table} do not match the current schema.")
+    return manifest
+
+
+def _table_ddl(cursor, tables):
+    """
+    Saved definitions of foreign key, unique and check constraints and of
+    secondary indexes (not backing a constraint) of the given tables.
+    Returns (constraints [(table, name, definition)], indexes [(name, definition)]).
+    """
+    cursor.execute(
+        """
+        SELECT rel.relname, con.conname, pg_get_constraintdef(con.oid)
+        FROM pg_constraint con
+        JOIN pg_class rel ON rel.oid = con.conrelid
+        WHERE rel.relname = ANY(%s) AND con.contype IN ('f', 'u', 'c')
+          AND rel.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = current_schema())
+        ORDER BY con.contype = 'f', con.conname
+        """,
+        [list(tables)],
+    )
+    constraints = cursor.fetchall()
+
+    cursor.execute(
+        """
+        SELECT idx.relname, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class idx ON idx.oid = i.indexrelid
+        JOIN pg_class rel ON rel.oid = i.indrelid
+        WHERE rel.relname = ANY(%s) AND NOT i.indisprimary
+          AND rel.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = current_schema())
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = i.indexrelid)
+        """,
+        [list(tables)],
+    )
+    indexes = cursor.fetchall()
+    return constraints, indexes
+
+
+def _load_postgresql(directory, manifest, func_to_show):
+    entries = {entry["table"]: entry for entry in manifest["tables"]}
+    tables = [model._meta.db_table for model in SNAPSHOT_MODELS]
+    qn = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {', '.join(tables)} CASCADE")
+
+        constraints, indexes = _table_ddl(cursor, tables)
+        # Foreign keys last in the list: drop them first, recreate them last.
+        for table, name, _ in reversed(constraints):
+            cursor.execute(f"ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(name)}")
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {qn(name)}")
+        if func_to_show:
+            func_to_show(f"Dropped {len(constraints)} constraints and {len(indexes)} indexes.")
+
+        for table in tables:
+            entry = entries[table]
+            column_list = ", ".join(qn(column) for column in entry["columns"])
+            with gzip.open(Path(directory) / entry["file"], "rt", encoding="utf-8", newline="") as fh:
+                cursor.copy_expert(f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER true)", fh)
+            if func_to_show:
+                func_to_show(f"{table}: {entry['rows']} rows")
+
+        if func_to_show:
+            func_to_show("Rebuilding indexes and constraints...")
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for table, name, definition in constraints:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+
+def _load_generic(directory, manifest, func_to_show):
+    for model in reversed(SNAPSHOT_MODELS):
+        model.objects.all().delete()
+
+    entries = {entry["table"]: entry for entry in manifest["tables"]}
+    for model in SNAPSHOT_MODELS:
+        entry = entries[model._meta.db_table]
+        # Plain CSV has no NULL marker: an empty value is NULL only where the column allows it.
+        nullable = [field.column for field in _fields(model) if field.null]
+        for chunk in pd.read_csv(
+            Path(directory) / entry["file"], chunksize=100_000, dtype=str, keep_default_na=False
+        ):
+            chunk = chunk.astype(object)
+            chunk[nullable] = chunk[nullable].where(chunk[nullable] != "", None)
+            insert_frame(model, chunk)
+        if func_to_show:
+            func_to_show(f"{model._meta.db_table}: {entry['rows']} rows")
+
+
+def load_dataset(directory, func_to_show=None):
+    """
+    Replaces the snapshot tables with the snapshot in directory (all or nothing).
+    Tables of cascaded_models() are emptied too.
+    Returns {table: rows}.
+    """
+    manifest = read_manifest(directory)
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            _load_postgresql(directory, manifest, func_to_show)
+        else:
+            _load_generic(directory, manifest, func_to_show)
+
+        counts = {model._meta.db_table: model.objects.count() for model in SNAPSHOT_MODELS}
+        for entry in manifest["tables"]:
+            if counts[entry["table"]] != entry["rows"]:
+                raise ValueError(
+                    f"{entry['table']}: loaded {counts[entry['table']]} rows, manifest says {entry['rows']}."
+                )
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), SNAPSHOT_MODELS):
+                cursor.execute(sql)
+
+    for warehouse_id in Warehouse.objects.values_list("id", flat=True):
+        bump_version("warehouse", warehouse_id)
+
+    return counts
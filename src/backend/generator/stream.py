@@ -0,0 +1,211 @@
+"""
+Live sales stream for posting load tests.
+
+Worker processes create small SALE and PURCHASE documents at a target total
+rate (open loop: a slow post does not slow the schedule down, it builds lag)
+and post every document through Document.post(), as the UI does. Latency is
+measured from the start of post() to the commit.
+
+Products are drawn by their demand curves from generate_sales_matrix(), with
+a simulated day advancing every day_seconds of wall time, so popular products
+and weekday peaks contend for the same inventory rows as they would in
+production. Lines are added in random order, like a cashier scanning them.
+"""
+import datetime
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import django
+import numpy as np
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from erp.models import Document, DocumentItem, Inventory
+
+from .utils import generate_sales_matrix, get_payday_factors, get_random_product_profiles
+
+CURVE_DAYS = 28
+
+
+@dataclass
+class StreamSpec:
+    seed: int
+    rate: float  # documents per second, all workers together
+    duration: float  # seconds
+    workers: int
+    warehouse_ids: list
+    purchase_share: float = 0.1
+    lines: int = 5  # average lines per document
+    day_seconds: float = 60.0  # wall time per simulated day
+
+
+class DemandMix:
+    """Cumulative demand of every stocked product per simulated day, for weighted draws."""
+
+    def __init__(self, seed, warehouse_ids):
+        self.product_ids = np.array(
+            Inventory.objects.filter(warehouse_id__in=warehouse_ids)
+            .order_by("product_id").values_list("product_id", flat=True).distinct(),
+            dtype=np.int64,
+        )
+        if not len(self.product_ids):
+            raise ValueError("No inventory found to stream sales from.")
+
+        # The same seed gives every worker the same curves.
+        rng = np.random.default_rng(seed)
+        n = len(self.product_ids)
+        today = timezone.localdate()
+        days_list = [today + datetime.timedelta(days=i) for i in range(CURVE_DAYS)]
+
+        curves = generate_sales_matrix(
+            CURVE_DAYS,
+            np.ceil(rng.lognormal(3.0, 1.2, n)),  # long-tailed popularity
+            today.weekday(),
+            rng=rng,
+            weekly_profiles=get_random_product_profiles(n, rng),
+            trend_volatility=rng.uniform(0.05, 0.2, n),
+            spike_prob=rng.uniform(0.01, 0.05, n),
+            payday_factors=get_payday_factors(days_list),
+        )
+        # A day without any sales would leave nothing to draw.
+        self.cumulative = np.cumsum(curves + 1e-9, axis=0, dtype=np.float64)
+
+    def draw(self, rng, day, count):
+        """Up to count distinct product ids, weighted by demand on the simulated day."""
+        column = self.cumulative[:, day % CURVE_DAYS]
+        picks = np.searchsorted(column, rng.random(count) * column[-1], side="right")
+        picks = np.unique(np.minimum(picks, len(column) - 1))
+        return self.product_ids[rng.permutation(picks)]
+
+
+def post_document(doc_type, warehouse_id, product_ids, quantities):
+    """
+    Creates a document with its items and posts it in one transaction.
+    Returns the seconds from post() to commit; a failed document is rolled back entirely.
+    """
+    with transaction.atomic():
+        document = Document.objects.create(
+            doc_type=doc_type,
+            src_warehouse_id=warehouse_id if doc_type == Document.DocType.SALE else None,
+            dst_warehouse_id=warehouse_id if doc_type == Document.DocType.PURCHASE else None,
+            note="Live stream",
+        )
+        DocumentItem.objects.bulk_create([
+            DocumentItem(document=document, product_id=int(pid), quantity=int(qty))
+            for pid, qty in zip(product_ids, quantities)
+        ])
+        started = time.perf_counter()
+        document.post()
+    return time.perf_counter() - started
+
+
+def run_stream_worker(spec, index):
+    """
+    Streams this worker's share of the rate for spec.duration seconds.
+    Returns its raw results: latencies, posted counts by type, failures by reason,
+    wall-clock start/end and the largest lag behind the schedule.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence([spec.seed, index + 1]))
+    mix = DemandMix(spec.seed, spec.warehouse_ids)
+    interval = spec.workers / spec.rate
+
+    latencies = []
+    posted = Counter()
+    failed = Counter()
+    max_lag = 0.0
+
+    started_at = time.time()
+    started = time.perf_counter()
+    sent = 0
+    while True:
+        due = sent * interval
+        if due >= spec.duration:
+            break
+        now = time.perf_counter() - started
+        if now < due:
+            time.sleep(due - now)
+        else:
+            max_lag = max(max_lag, now - due)
+        sent += 1
+
+        day = int((time.perf_counter() - started) / spec.day_seconds)
+        warehouse_id = int(rng.choice(spec.warehouse_ids))
+        product_ids = mix.draw(rng, day, max(1, rng.poisson(spec.lines)))
+
+        if rng.random() < spec.purchase_share:
+            doc_type = Document.DocType.PURCHASE
+            quantities = rng.integers(20, 200, len(product_ids))
+        else:
+            doc_type = Document.DocType.SALE
+            quantities = 1 + rng.poisson(1.0, len(product_ids))
+
+        try:
+            latencies.append(post_document(doc_type, warehouse_id, product_ids, quantities))
+            posted[doc_type] += 1
+        except (ValidationError, ObjectDoesNotExist) as e:
+            # Business rejections: not enough stock, no inventory row.
+            failed[type(e).__name__] += 1
+        except DatabaseError as e:
+            # Deadlocks, lock timeouts, serialization failures.
+            failed[type(getattr(e, "__cause__", None) or e).__name__] += 1
+
+    return {
+        "latencies": latencies,
+        "posted": dict(posted),
+        "failed": dict(failed),
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "max_lag": max_lag,
+    }
+
+
+def _run_stream_worker_task(args):
+    return run_stream_worker(*args)
+
+
+def summarize(results, spec):
+    """Merges worker results into the report: throughput and posting latency percentiles."""
+    latencies = np.array([value for result in results for value in result["latencies"]])
+    posted, failed = Counter(), Counter()
+    for result in results:
+        posted.update(result["posted"])
+        failed.update(result["failed"])
+
+    elapsed = max(r["finished_at"] for r in results) - min(r["started_at"] for r in results)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (0.0, 0.0)
+
+    return {
+        "target_rate": spec.rate,
+        "elapsed": elapsed,
+        "posted": dict(posted),
+        "failed": dict(failed),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+        "max_ms": float(latencies.max() * 1000) if len(latencies) else 0.0,
+        "max_lag": max(r["max_lag"] for r in results),
+    }
+
+
+def stream_sales(spec, func_to_show=None):
+    """Runs the stream on spec.workers processes and returns the summary report."""
+    if spec.workers <= 1:
+        results = [run_stream_worker(spec, 0)]
+    else:
+        # Connections must not be shared with the spawned workers.
+        connection.close()
+        context = multiprocessing.get_context("spawn")
+        results = []
+        with ProcessPoolExecutor(max_workers=spec.workers, mp_context=context, initializer=django.setup) as pool:
+            futures = [pool.submit(_run_stream_worker_task, (spec, index)) for index in range(spec.workers)]
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if func_to_show:
+                    func_to_show(f"Worker {done}/{spec.workers} finished.", end="\r")
+        if func_to_show:
+            func_to_show("")
+
+    return summarize(results, spec)
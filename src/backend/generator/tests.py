@@ -0,0 +1,57 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+from django.test import TestCase
+from django.utils import timezone
+from erp.models import Brand, Document, DocumentItem, Product, ProductPriceLevel
+
+from .utils import item_purchase_prices
+
+
+class LevelPricesTest(TestCase):
+    """Vectorized item prices match Document.recalc_prices()."""
+
+    def test_matches_recalc_prices(self):
+        rng = np.random.default_rng(0)
+        brands = [Brand.objects.create(name=f"Brand {i}", country="UA") for i in range(3)]
+        products = []
+        for i in range(12):
+            product = Product.objects.create(name=f"Product {i}", sku=f"SKU{i}", brand=brands[i % 3], sale_price=100)
+            # The smallest level may be above a document's brand total: the largest level applies then.
+            for minimal_quantity in sorted(rng.choice(np.arange(1, 40), size=1 + i % 4, replace=False).tolist()):
+                ProductPriceLevel.objects.create(
+                    product=product, minimal_quantity=minimal_quantity, price=Decimal(int(rng.integers(100, 1000))) / 10,
+                )
+            products.append(product)
+
+        documents = []
+        for day in range(6):
+            document = Document.objects.create(
+                doc_type=Document.DocType.SALE,
+                doc_date=timezone.make_aware(datetime.datetime(2024, 3, 1 + day, 12)),
+            )
+            for product in rng.choice(products, size=int(rng.integers(1, len(products))), replace=False):
+                DocumentItem.objects.create(document=document, product=product, quantity=int(rng.integers(1, 15)))
+            documents.append(document)
+
+        rows = list(
+            DocumentItem.objects.filter(document__in=documents)
+            .order_by("document_id", "product_id")
+            .values_list("id", "document_id", "product_id", "product__brand_id", "quantity")
+        )
+        item_ids, document_ids, product_ids, brand_ids, quantities = (np.array(column) for column in zip(*rows))
+        _, doc_index = np.unique(document_ids, return_inverse=True)
+
+        prices = item_purchase_prices(
+            product_ids.astype(np.int64), brand_ids.astype(np.int64), doc_index, quantities.astype(np.float64)
+        )
+
+        for document in documents:
+            document.recalc_prices()
+        expected = dict(DocumentItem.objects.filter(document__in=documents).values_list("id", "price"))
+
+        self.assertEqual(
+            [Decimal(str(price)).quantize(Decimal("0.01")) for price in prices.tolist()],
+            [expected[item_id] for item_id in item_ids.tolist()],
+        )
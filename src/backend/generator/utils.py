@@ -4,56 +4,92 @@ import random
 from decimal import Decimal
 
 import numpy as np
+import pandas as pd
+from erp.cache import bump_version
 from erp.models import (
     Brand,
+    DailySales,
     Document,
     DocumentItem,
     Inventory,
     Product,
     ProductPriceLevel,
     Warehouse,
+    select_price_level,
 )
 from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.utils import timezone
 from django.utils.timezone import now
+from replenishment.models import DemandEstimate
+
+from .bulk import insert_frame
+
+NAME_PARTS = [
+    'Pro', 'Max', 'Tech', 'Data', 'Net', 'Core', 'Flex', 'Ultra', 'Nano', 'Smart',
+    'Alpha', 'Mega', 'Mini', 'Hyper', 'Super', 'Micro', 'Eco', 'Power', 'Speed',
+    'Multi', 'True', 'Fast', 'Quick', 'Easy', 'Gold', 'Silver', 'Platinum',
+    'Diamond', 'Titan', 'Titanium', 'Quantum', 'Solar', 'Lunar', 'Aero', 'Cyber',
+    'Neo', 'Opti', 'Velo', 'Zen', 'Pulse', 'Nexus', 'Vertex', 'Fusion', 'Matrix',
+    'Vector', 'Prime', 'Evo', 'Nova', 'Spectra', 'Vortex', 'Strato', 'Aqua',
+    'Terra', 'Luxe', 'Elite', 'Penta', 'Hexa', 'Octa', 'Alpha', 'Beta', 'Gamma'
+]
+NAME_SUFFIXES = [
+    'drive', 'wave', 'ware', 'link', 'byte', 'deck', 'box', 'sphere', 'grid',
+    'works', 'port', 'scan', 'motion', 'frame', 'track', 'line', 'point', 'hub',
+    'zone', 'core', 'net', 'tech', 'soft', 'data', 'cloud', 'logic', 'pulse',
+    'flux', 'shift', 'spark', 'glide', 'rise', 'flow', 'boost', 'quest',
+    'forge', 'craft', 'blend', 'sync', 'wave', 'beam', 'flare', 'storm', 'trail'
+]
 
 
 def name_generator():
-    parts = [
-        'Pro', 'Max', 'Tech', 'Data', 'Net', 'Core', 'Flex', 'Ultra', 'Nano', 'Smart',
-        'Alpha', 'Mega', 'Mini', 'Hyper', 'Super', 'Micro', 'Eco', 'Power', 'Speed',
-        'Multi', 'True', 'Fast', 'Quick', 'Easy', 'Gold', 'Silver', 'Platinum',
-        'Diamond', 'Titan', 'Titanium', 'Quantum', 'Solar', 'Lunar', 'Aero', 'Cyber',
-        'Neo', 'Opti', 'Velo', 'Zen', 'Pulse', 'Nexus', 'Vertex', 'Fusion', 'Matrix',
-        'Vector', 'Prime', 'Evo', 'Nova', 'Spectra', 'Vortex', 'Strato', 'Aqua',
-        'Terra', 'Luxe', 'Elite', 'Penta', 'Hexa', 'Octa', 'Alpha', 'Beta', 'Gamma'
-    ]
-    suffix = [
-        'drive', 'wave', 'ware', 'link', 'byte', 'deck', 'box', 'sphere', 'grid',
-        'works', 'port', 'scan', 'motion', 'frame', 'track', 'line', 'point', 'hub',
-        'zone', 'core', 'net', 'tech', 'soft', 'data', 'cloud', 'logic', 'pulse',
-        'flux', 'shift', 'spark', 'glide', 'rise', 'flow', 'boost', 'quest',
-        'forge', 'craft', 'blend', 'sync', 'wave', 'beam', 'flare', 'storm', 'trail'
-    ]
-    
-    all_combinations = list(itertools.product(parts, suffix))
+    """
+    Endless generator of unique names: every part/suffix combination in random
+    order, then the same combinations with a round number appended.
+    One generator should be shared by all rows of a table.
+    """
+    all_combinations = list(dict.fromkeys(p + s for p, s in itertools.product(NAME_PARTS, NAME_SUFFIXES)))
     random.shuffle(all_combinations)
-    for p, s in all_combinations:
-        yield p + s
+    yield from all_combinations
 
+    for round_number in itertools.count(2):
+        for name in all_combinations:
+            yield f"{name}{round_number}"
 
-def generate_brands(count):
-    brands = []
-    name_gen = name_generator()
-    for _ in range(count):
-        b = Brand.objects.create(
+
+def generate_brands(count, batch_size=5000):
+    existing = set(Brand.objects.values_list("name", flat=True))
+    name_gen = (name for name in name_generator() if name not in existing)
+
+    brands = [
+        Brand(
             name=next(name_gen),
             country=random.choice(["USA", "Germany", "China", "Japan", "France"])
         )
-        brands.append(b)
-    return brands
+        for _ in range(count)
+    ]
+    return Brand.objects.bulk_create(brands, batch_size=batch_size)
+
+
+def unique_sku(name, used_skus):
+    """SKU in the NAME123 form that is not in used_skus (the set is updated)."""
+    prefix = name.upper()[:10]
+    sku = prefix + str(random.randint(100, 999))
+    while sku in used_skus:
+        sku = prefix + str(random.randint(1000, 999999))
+    used_skus.add(sku)
+    return sku
 
 
 def empty_warehouse(warehouse_name, func_to_show=None):
+    """
+    Deletes the warehouse documents and inventory and the whole catalog
+    (brands, products, price levels and every row that depends on them)
+    with a few set-based statements instead of unposting document by document.
+    Unposting first is unnecessary: all inventory and sales rows of the
+    deleted products go away with the catalog.
+    """
     try:
         warehouse = Warehouse.objects.get(name=warehouse_name)
     except Warehouse.DoesNotExist:
@@ -61,42 +97,43 @@ def empty_warehouse(warehouse_name, func_to_show=None):
     
     if func_to_show:
         func_to_show(f"Using warehouse: {warehouse.name}")
-        func_to_show("Deleting all documents...")
-    
-    src_docs = Document.objects.filter(src_warehouse=warehouse)
-    for idx, doc in enumerate(src_docs, start=1):
+
+    items_table = DocumentItem._meta.db_table
+    docs_table = Document._meta.db_table
+    inventory_table = Inventory._meta.db_table
+    docs_filter = "src_warehouse_id = %s OR dst_warehouse_id = %s"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {items_table} WHERE document_id IN (SELECT id FROM {docs_table} WHERE {docs_filter})",
+            [warehouse.id, warehouse.id],  # type: ignore
+        )
         if func_to_show:
-            func_to_show(f"Deleting document {idx} of {src_docs.count()}...", end="\r")
-        if doc.status == Document.Status.POSTED:
-            doc.unpost()
-        doc.delete()
-        
-        if func_to_show and idx == src_docs.count():
-            func_to_show("")
-    
-    if func_to_show:
-        func_to_show("Deleted all source documents.")
-    
-    dst_docs = Document.objects.filter(dst_warehouse=warehouse)
-    for idx, doc in enumerate(dst_docs, start=1):
+            func_to_show(f"Deleted {cursor.rowcount} document items.")
+
+        cursor.execute(f"DELETE FROM {docs_table} WHERE {docs_filter}", [warehouse.id, warehouse.id])  # type: ignore
         if func_to_show:
-            func_to_show(f"Deleting document {idx} of {dst_docs.count()}...", end="\r")
-        if doc.status == Document.Status.POSTED:
-            doc.unpost()
-        doc.delete()
-        
-        if func_to_show and idx == dst_docs.count():
-            func_to_show("")
-    
-    if func_to_show:
-        func_to_show("Deleted all destination documents.")
-        func_to_show("Deleting all inventory, products and brands...")
+            func_to_show(f"Deleted {cursor.rowcount} documents.")
+
+        cursor.execute(f"DELETE FROM {inventory_table} WHERE warehouse_id = %s", [warehouse.id])  # type: ignore
+        if func_to_show:
+            func_to_show(f"Deleted {cursor.rowcount} inventory rows.")
+
+        if connection.vendor == "postgresql":
+            # CASCADE empties exactly the tables Django would cascade into (all FKs to the catalog are CASCADE).
+            tables = ", ".join(model._meta.db_table for model in (ProductPriceLevel, Product, Brand))
+            cursor.execute(f"TRUNCATE {tables} CASCADE")
+            if func_to_show:
+                func_to_show("Truncated brands, products, price levels and dependent tables.")
+        else:
+            for model in (ProductPriceLevel, Product, Brand):
+                deleted, _ = model.objects.all().delete()
+                if func_to_show:
+                    func_to_show(f"Deleted {deleted} rows from {model._meta.db_table} (with dependent rows).")
+
+    for warehouse_id in Warehouse.objects.values_list("id", flat=True):
+        bump_version("warehouse", warehouse_id)
 
-    Inventory.objects.filter(warehouse=warehouse).delete()
-    ProductPriceLevel.objects.all().delete()
-    Product.objects.all().delete()
-    Brand.objects.all().delete()
-    
     if func_to_show:
         func_to_show("Emptied the warehouse completely.")
 
@@ -106,7 +143,8 @@ def generate_products(warehouse_name, brands, total_days: int,
                       max_products_per_brand=5, 
                       max_price_levels=5,
                       system_coverage_days=14,
-                      func_to_show=None):
+                      func_to_show=None,
+                      batch_size=5000):
     try:
         warehouse = Warehouse.objects.get(name=warehouse_name)
     except Warehouse.DoesNotExist:
@@ -123,77 +161,103 @@ def generate_products(warehouse_name, brands, total_days: int,
         note="Початкове завантаження складу",
     )
     
+    # All rows are built in memory first and inserted table by table.
     products = []
+    price_levels = []
+    inventories = []
+    items = []
 
-    for brand in brands:
-        if func_to_show:
-            func_to_show(f"Generating products for brand: {brand.name}.", end="\r")
-        products_count = random.randint(1, max_products_per_brand)
+    name_gen = name_generator()
+    used_skus = set(Product.objects.values_list("sku", flat=True))
 
-        for idx in range(products_count):
-            if func_to_show:
-                func_to_show(f"Generating products for brand: {brand.name}. Processing product {idx + 1}/{products_count}.", end="\r")
+    for brand_idx, brand in enumerate(brands, start=1):
+        if func_to_show and (brand_idx % 100 == 0 or brand_idx == len(brands)):
+            func_to_show(f"Generating products for brand {brand_idx}/{len(brands)}.", end="\r")
+        products_count = random.randint(1, max_products_per_brand)
+        brand_start = len(products)
 
-            name_gen = name_generator()
+        for _ in range(products_count):
             name = next(name_gen)
 
-            product = Product.objects.create(
-                name=name,
-                sku=name.upper()[:10] + str(random.randint(100, 999)),
-                brand=brand,
-                sale_price=0
-            )
-            
             ads = random.uniform(0.01, 2.0)
             needed_qty = system_coverage_days * ads
 
             inventory_raw = random.uniform(0, needed_qty * 1.2)
             inventory = int(max(1, round(ads * total_days + inventory_raw)))
 
-            DocumentItem.objects.create(
-                document=doc,
-                product=product,
-                quantity=Decimal(inventory),
-                price=Decimal("0")
-            )
-            
             system_suggested_quantity = max(0, math.ceil(needed_qty - inventory_raw))
 
-            min_purchase_price = generate_price_levels(
-                product, system_suggested_quantity, inventory_raw, max_products_per_brand, max_price_levels
+            levels = generate_price_levels(
+                system_suggested_quantity, inventory_raw, max_products_per_brand, max_price_levels
             )
+            min_purchase_price = float(levels[-1].price)
 
             sale_price = round(random.uniform(
                 min_purchase_price * 1.05,
                 min_purchase_price * 1.3
             ), 2)
 
-            product.sale_price = sale_price  # type: ignore
-            product.save()
+            products.append(Product(
+                name=name,
+                sku=unique_sku(name, used_skus),
+                brand=brand,
+                sale_price=sale_price
+            ))
+            price_levels.append(levels)
+            inventories.append(inventory)
+
+        # Item prices as Document.recalc_prices() sets them, so posting leaves them as is.
+        brand_qty = sum(inventories[brand_start:])
+        for idx in range(brand_start, len(products)):
+            level = select_price_level(price_levels[idx], brand_qty)
+            items.append(DocumentItem(
+                document=doc,
+                product=products[idx],
+                quantity=Decimal(inventories[idx]),
+                price=level.price * inventories[idx]
+            ))
 
-            products.append(product)
-        
-        if func_to_show:
-            func_to_show("")
-            
-    doc.post()
+    if func_to_show:
+        func_to_show("")
+        func_to_show(f"Inserting {len(products)} products...")
+
+    Product.objects.bulk_create(products, batch_size=batch_size)
+
+    level_rows = []
+    for product, levels in zip(products, price_levels):
+        for level in levels:
+            level.product = product
+            level_rows.append(level)
+    if func_to_show:
+        func_to_show(f"Inserting {len(level_rows)} price levels...")
+    ProductPriceLevel.objects.bulk_create(level_rows, batch_size=batch_size)
+
+    if func_to_show:
+        func_to_show(f"Inserting {len(items)} document items...")
+    DocumentItem.objects.bulk_create(items, batch_size=batch_size)
+
+    if func_to_show:
+        func_to_show("Posting the opening document...")
+    doc.post_bulk()
 
     return products
 
 
-def generate_price_levels(product, system_suggested_quantity, inventory_raw, max_products_per_brand, max_levels):
+def generate_price_levels(system_suggested_quantity, inventory_raw, max_products_per_brand, max_levels):
     """
     Generates random price levels for a product.
-    Returns the minimum purchase price.
+    Returns unsaved ProductPriceLevel objects (without product) sorted by
+    quantity; the last one has the minimum purchase price.
     """
     moq = {1: round(random.uniform(5, 100), 2)}
     extra_levels = random.randint(1, max_levels - 1)
+    # Very slow sellers can have a range smaller than the number of levels.
+    max_quantity = max(int((system_suggested_quantity + inventory_raw) * max_products_per_brand), extra_levels + 2)
     additional_quantities = sorted(
-        random.sample(range(2, int((system_suggested_quantity + inventory_raw) * max_products_per_brand)), k=extra_levels)
+        random.sample(range(2, max_quantity), k=extra_levels)
     )
 
     last_price = moq[1]
-    min_purchase_price = last_price
 
     for idx, q in enumerate(additional_quantities):
         new_price = round(last_price - random.uniform(0.5, 1.5), 2)
@@ -203,16 +267,16 @@ def generate_price_levels(product, system_suggested_quantity, inventory_raw, max
 
         moq[q] = new_price
         last_price = new_price
-        min_purchase_price = new_price
 
-    for q, price in sorted(moq.items()):
-        ProductPriceLevel.objects.create(
-            product=product,
-            minimal_quantity=q,
-            price=price
-        )
+    return [
+        ProductPriceLevel(minimal_quantity=q, price=Decimal(str(price)))
+        for q, price in sorted(moq.items())
+    ]
+
 
-    return min_purchase_price
+def _global_rng():
+    """Generator seeded from the global NumPy state, so np.random.seed() still applies."""
+    return np.random.default_rng(np.random.randint(0, 2**63 - 1, dtype=np.int64))
 
 
 def generate_sales_distribution(
@@ -225,155 +289,162 @@ def generate_sales_distribution(
     spike_prob=0.05,          # Probability of a sales spike (promo/shortage) on a given day
     spike_magnitude=0.6,      # Strength of the spike (0.6 = +/- 60%)
     base_weekly_profile=None, # Base weekly profile
-    payday_factors=None
+    payday_factors=None,
+    rng=None
 ):
+    """Daily sales of one product; a single-row generate_sales_matrix()."""
     if total_sales <= 0:
         return [0] * total_days
 
-    # 1. Generate "jittery" trend (Random Walk without strong smoothing)
-    # Use a smaller window or none at all for more realism
-    steps = np.random.normal(0, trend_volatility, total_days)
-    walk = np.cumsum(steps)
-    
-    # Normalize the trend to be a multiplier around 1.0
-    # But do it softly to preserve local trends
-    if walk.max() != walk.min():
-        walk = (walk - walk.min()) / (walk.max() - walk.min()) # 0..1
-        walk = 0.8 + (walk * 0.4) # Trend fluctuates from 0.8 to 1.2
-    else:
-        walk = np.ones(total_days)
-
-    # 2. "Live" seasonality
-    # If no profile is provided, take the standard one but add noise for this specific product
-    if base_weekly_profile is None:
-        # Example: slight randomization of the base so products are not synchronized
-        base = np.array([1.0, 1.05, 1.1, 1.15, 1.2, 0.85, 0.8])
-        perturbation = np.random.normal(0, 0.1, 7)
-        base_weekly_profile = np.maximum(base + perturbation, 0.1)
-    
-    # Generate seasonality array day by day
-    seasonality = []
-    current_weekday = start_weekday
-    for _ in range(total_days):
-        # Take the base factor for the day
-        base_factor = base_weekly_profile[current_weekday]
-        # Add "jitter" (today's Friday is not the same as last Friday)
-        daily_jitter = np.random.normal(0, season_jitter)
-        factor = max(0.1, base_factor + daily_jitter)
-        seasonality.append(factor)
-        current_weekday = (current_weekday + 1) % 7
-    
-    seasonality = np.array(seasonality)
+    rng = rng or _global_rng()
+
+    sales = generate_sales_matrix(
+        total_days,
+        np.array([total_sales]),
+        start_weekday,
+        rng=rng,
+        trend_volatility=trend_volatility,
+        season_jitter=season_jitter,
+        spike_prob=spike_prob,
+        spike_magnitude=spike_magnitude,
+        weekly_profiles=None if base_weekly_profile is None else np.asarray(base_weekly_profile)[None, :],
+        payday_factors=payday_factors
+    )
+    return sales[0].tolist()
 
-    # 3. Event-driven spikes (Spikes)
-    # Create an event mask: 1.0 is normal, 1.5 is promo, 0.5 is shortage
-    spikes = np.ones(total_days)
-    # Generate random numbers where < spike_prob an event occurs
-    events_mask = np.random.rand(total_days) < spike_prob
-    
-    # For each event decide: up or down (usually up more often if these are sales)
-    for i in np.where(events_mask)[0]:
-        direction = 1 if random.random() > 0.3 else -1  # 70% chance of increase, 30% decrease
-        magnitude = 1.0 + (direction * random.uniform(0.2, spike_magnitude))
-        spikes[i] = max(0.1, magnitude)
 
-    # 4. Noise (daily small variability)
-    noise = np.random.lognormal(mean=0.0, sigma=0.2, size=total_days)
+def generate_sales_matrix(
+    total_days,
+    total_sales,
+    start_weekday,
+    rng,
+    trend_volatility=0.15,
+    season_jitter=0.1,
+    spike_prob=0.05,
+    spike_magnitude=0.6,
+    weekly_profiles=None,
+    payday_factors=None,
+    chunk_size=10000
+):
+    """
+    Daily sales for many products at once: (products, days) int64 matrix whose
+    row sums equal total_sales exactly.
+
+    total_sales is a (products,) array; trend_volatility and spike_prob may be
+    scalars or (products,) arrays; weekly_profiles is (products, 7) or None for
+    a randomized default profile. All randomness comes from rng
+    (np.random.Generator), so a seeded generator reproduces the same sales.
+    Products are processed in chunks of chunk_size rows to bound memory.
+    """
+    total_sales = np.maximum(np.rint(np.asarray(total_sales, dtype=np.float64)), 0)
+    n_products = len(total_sales)
+    trend_volatility = np.broadcast_to(np.asarray(trend_volatility, dtype=np.float64), (n_products,))
+    spike_prob = np.broadcast_to(np.asarray(spike_prob, dtype=np.float64), (n_products,))
+
+    weekdays = (start_weekday + np.arange(total_days)) % 7
+    if payday_factors is not None and len(payday_factors) != total_days:
+        # Different lengths: do not apply (error protection)
+        payday_factors = None
+
+    sales = np.zeros((n_products, total_days), dtype=np.int64)
+
+    for start in range(0, n_products, chunk_size):
+        rows = slice(start, min(start + chunk_size, n_products))
+        n = rows.stop - rows.start
+        shape = (n, total_days)
+
+        # 1. "Jittery" trend: random walk scaled to 0.8..1.2 per product
+        walk = np.cumsum(rng.normal(0, 1, shape) * trend_volatility[rows, None], axis=1)
+        low = walk.min(axis=1, keepdims=True)
+        span = walk.max(axis=1, keepdims=True) - low
+        walk = np.where(span > 0, 0.8 + (walk - low) / np.where(span > 0, span, 1) * 0.4, 1.0)
+
+        # 2. "Live" seasonality: weekly profile plus daily jitter
+        if weekly_profiles is None:
+            base = np.array([1.0, 1.05, 1.1, 1.15, 1.2, 0.85, 0.8])
+            profiles = np.maximum(base + rng.normal(0, 0.1, (n, 7)), 0.1)
+        else:
+            profiles = weekly_profiles[rows]
+        seasonality = np.maximum(profiles[:, weekdays] + rng.normal(0, season_jitter, shape), 0.1)
+
+        # 3. Event-driven spikes: 70% up, 30% down
+        events = rng.random(shape) < spike_prob[rows, None]
+        direction = np.where(rng.random(shape) > 0.3, 1.0, -1.0)
+        magnitude = 1.0 + direction * rng.uniform(0.2, spike_magnitude, shape)
+        spikes = np.where(events, np.maximum(magnitude, 0.1), 1.0)
+
+        # 4. Noise (daily small variability)
+        noise = rng.lognormal(mean=0.0, sigma=0.2, size=shape)
+
+        # 5. Assembly
+        raw_curve = walk * seasonality * spikes * noise
+        if payday_factors is not None:
+            raw_curve *= payday_factors[None, :]
+
+        # 6. Normalization to total sales and exact integer rounding: rounding the
+        # running total (with a random offset per product) gives every day the
+        # floor or ceil of its share and keeps the row sum exact.
+        totals = total_sales[rows]
+        current_sum = raw_curve.sum(axis=1)
+        scale = np.divide(totals, current_sum, out=np.zeros(n), where=current_sum > 0)
+        running = np.cumsum(raw_curve * scale[:, None], axis=1)
+        running[:, -1] = np.where(current_sum > 0, totals, 0)
+
+        offset = rng.random((n, 1))
+        rounded = np.floor(running + offset)
+        rounded[:, -1] = running[:, -1]
+        sales[rows] = np.diff(rounded, axis=1, prepend=0).astype(np.int64)
+
+    return sales
+
+
+def get_random_product_profiles(count, rng):
+    """Weekly sales profiles (count, 7), Monday first, one per product."""
+    fixed = np.array([
+        # Type 1: "Weekend Heavy" (Alcohol, snacks, entertainment)
+        # Peak on FRI, SAT. Drop on MON-WED.
+        [0.7, 0.7, 0.8, 0.9, 1.3, 1.4, 1.2],
+        # Type 2: "Office / Weekdays" (Business lunches, paper, B2B)
+        # Peak on TUE-THU. Drop on weekends.
+        [1.1, 1.2, 1.2, 1.1, 1.0, 0.7, 0.7],
+        # Type 3: "Staples" (Bread, milk, toilet paper)
+        # Almost flat, slight rise towards weekend.
+        [0.95, 0.95, 1.0, 1.0, 1.05, 1.1, 1.0],
+    ])
+
+    # Type 4: "Random Purchases" (Impulse items)
+    # Weak day-of-week dependence.
+    random_profiles = np.maximum(rng.normal(1.0, 0.1, (count, 7)), 0.8)  # Don't let it go to zero
 
-    # 5. Assembly
-    raw_curve = walk * seasonality * spikes * noise
-    
-    if payday_factors is not None:
-        # If arrays have different lengths, trim or do not apply (error protection)
-        if len(payday_factors) == len(raw_curve):
-            raw_curve = raw_curve * payday_factors
-    
-    # 6. Normalization to Total Sales (preserving curve shape)
-    current_sum = raw_curve.sum()
-    if current_sum == 0:
-        return [0] * total_days
-        
-    scale_factor = total_sales / current_sum
-    final_float = raw_curve * scale_factor
-    
-    sales = np.floor(final_float).astype(int)
-
-    # Remainder distribution (rounding)
-    diff = int(total_sales - sales.sum())
-    if diff > 0:
-        # Add remainders proportionally to weights (where there are already many sales)
-        # This is more realistic than random
-        indices = np.random.choice(total_days, size=diff, p=raw_curve/raw_curve.sum())
-        for idx in indices:
-            sales[idx] += 1
-    elif diff < 0:
-        # If we overshoot (rare but possible with floor and float manipulations)
-        for _ in range(abs(diff)):
-             # Remove where there are more than 0
-             nonzero_indices = np.nonzero(sales)[0]
-             if len(nonzero_indices) > 0:
-                 idx = random.choice(nonzero_indices)
-                 sales[idx] -= 1
-
-    return list(sales)
+    # 40% staples, 30% weekend heavy, etc.
+    selected = rng.choice(4, size=count, p=[0.30, 0.20, 0.40, 0.10])
+    base = np.where((selected == 3)[:, None], random_profiles, fixed[np.minimum(selected, 2)])
+
+    # IMPORTANT: Add individuality to each product,
+    # so even "weekend heavy" products are not clones of each other.
+    return np.maximum(base + rng.normal(0, 0.05, (count, 7)), 0.1)
 
 
 def get_random_product_profile():
-    # Type 1: "Weekend Heavy" (Alcohol, snacks, entertainment)
-    # Peak on FRI, SAT. Drop on MON-WED.
-    weekend_heavy = np.array([0.7, 0.7, 0.8, 0.9, 1.3, 1.4, 1.2])
+    return get_random_product_profiles(1, _global_rng())[0]
 
-    # Type 2: "Office / Weekdays" (Business lunches, paper, B2B)
-    # Peak on TUE-THU. Drop on weekends.
-    weekday_heavy = np.array([1.1, 1.2, 1.2, 1.1, 1.0, 0.7, 0.7])
 
-    # Type 3: "Staples" (Bread, milk, toilet paper)
-    # Almost flat, slight rise towards weekend.
-    staples = np.array([0.95, 0.95, 1.0, 1.0, 1.05, 1.1, 1.0])
+def get_payday_factors(days_list):
+    day = np.array([current_date.day for current_date in days_list])
+    factors = np.ones(len(day))
 
-    # Type 4: "Random Purchases" (Impulse items)
-    # Weak day-of-week dependence.
-    random_profile = np.random.normal(1.0, 0.1, 7) 
-    random_profile = np.maximum(random_profile, 0.8) # Don't let it go to zero
+    # 1. Payday (beginning of the month): peak on days 1-5
+    # Gradually decreases: +15% on the 1st, +3% on the 5th
+    payday = day <= 5
+    factors[payday] += 0.15 * ((6 - day[payday]) / 5)
 
-    choices = [weekend_heavy, weekday_heavy, staples, random_profile]
-    weights = [0.30, 0.20, 0.40, 0.10]  # 40% staples, 30% weekend heavy, etc.
-    
-    # Choose one profile
-    selected_idx = np.random.choice(len(choices), p=weights)
-    base = choices[selected_idx]
-    
-    # IMPORTANT: Add individuality to each product,
-    # so even "weekend heavy" products are not clones of each other.
-    unique_twist = np.random.normal(0, 0.05, 7)
-    final_profile = np.maximum(base + unique_twist, 0.1)
-    
-    return final_profile
+    # 2. Advance (middle of the month): peak on days 15-17
+    factors[(day >= 15) & (day <= 17)] += 0.08  # Fixed boost of 8%
 
+    # 3. "End of money" (end of the month): slight decline after the 25th
+    factors[day > 25] -= 0.05
 
-def get_payday_factors(days_list):
-    factors = []
-    for current_date in days_list:
-        day = current_date.day
-        factor = 1.0
-        
-        # 1. Payday (beginning of the month): peak on days 1-5
-        if 1 <= day <= 5:
-            # Gradually decreases: +15% on the 1st, +3% on the 5th
-            boost = 0.15 * ((6 - day) / 5)
-            factor += boost
-            
-        # 2. Advance (middle of the month): peak on days 15-17
-        elif 15 <= day <= 17:
-            factor += 0.08 # Fixed boost of 8%
-            
-        # 3. "End of money" (end of the month): slight decline after the 25th
-        elif day > 25:
-            factor -= 0.05
-            
-        factors.append(factor)
-        
-    return np.array(factors)
+    return factors
 
 
 def simulate_sales(
@@ -381,7 +452,9 @@ def simulate_sales(
     min_remain=0.0,
     max_remain=0.1,
     warehouse_name="Main Warehouse",
-    func_to_show=None
+    func_to_show=None,
+    seed=None,
+    populate_rollup=False
 ):
     try:
         warehouse = Warehouse.objects.get(name=warehouse_name)
@@ -391,99 +464,178 @@ def simulate_sales(
     if func_to_show:
         func_to_show(f"Using warehouse: {warehouse.name}")
 
-    inventories = Inventory.objects.filter(warehouse=warehouse).select_related("product")
+    rows = list(
+        Inventory.objects.filter(warehouse=warehouse, quantity__gt=0)
+        .order_by("product_id")
+        .values_list("product_id", "product__brand_id", "quantity")
+    )
 
-    if not inventories:
+    if not rows:
         raise ValueError("No inventory found to simulate sales.")
 
     if func_to_show:
-        func_to_show(f"Found {inventories.count()} inventory items.")
+        func_to_show(f"Found {len(rows)} inventory items.")
+
+    product_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    brand_ids = np.array([row[1] for row in rows], dtype=np.int64)
+    initial_qty = np.array([float(row[2]) for row in rows])
 
     start_date = now().replace(hour=8, minute=0, second=0, microsecond=0) - relativedelta(days=total_days)
     days_list = [start_date + relativedelta(days=i) for i in range(total_days)]
 
     payday_mults = get_payday_factors(days_list)
 
-    plan = {}
+    rng = np.random.default_rng(seed)
 
     if func_to_show:
         func_to_show("Creating individual sellout strategies...")
 
     # -------------------------
-    # PLAN PHASE: target remainder for each product
+    # PLAN PHASE: target remainder for each product, all products at once
     # -------------------------
-    for idx, inv in enumerate(inventories, start=1):
-
-        if func_to_show:
-            func_to_show(f"Planning {idx}/{inventories.count()}", end="\r")
-
-        initial_qty = inv.quantity
-        if initial_qty <= 0:
-            continue
-
-        # main difference: use user-provided min_remain/max_remain
-        target_pct = random.uniform(min_remain, max_remain)
-        target_qty = int(float(initial_qty) * target_pct)
-
-        total_sales = initial_qty - target_qty
-        if total_sales <= 0:
-            continue
-        
-        product_weekly_profile = get_random_product_profile()
-
-        daily_sales = generate_sales_distribution(
-            total_days, 
-            float(total_sales), 
-            start_date.weekday(),
-            base_weekly_profile=product_weekly_profile,
-            trend_volatility=random.uniform(0.05, 0.2), # Some products have smooth trends, others fluctuate
-            spike_prob=random.uniform(0.01, 0.05),      # Some have frequent promotions, others rarely
-            payday_factors=payday_mults                 # Apply payday effects
-        )
-
-        plan[inv.product.id] = {  # type: ignore
-            "inv": inv,
-            "daily_sales": daily_sales
-        }
-
-    if func_to_show:
-        func_to_show("\nSimulating daily sales...")
+    # main difference: use user-provided min_remain/max_remain
+    target_pct = rng.uniform(min_remain, max_remain, len(rows))
+    target_qty = np.floor(initial_qty * target_pct)
+    total_sales = np.floor(initial_qty - target_qty)
+
+    sales_matrix = generate_sales_matrix(
+        total_days,
+        total_sales,
+        start_date.weekday(),
+        rng=rng,
+        weekly_profiles=get_random_product_profiles(len(rows), rng),
+        trend_volatility=rng.uniform(0.05, 0.2, len(rows)),  # Some products have smooth trends, others fluctuate
+        spike_prob=rng.uniform(0.01, 0.05, len(rows)),       # Some have frequent promotions, others rarely
+        payday_factors=payday_mults                          # Apply payday effects
+    )
 
     # -------------------------
     # EXECUTION PHASE
     # -------------------------
-    for day_index, current_day in enumerate(days_list, start=1):
+    return write_sales(
+        warehouse, product_ids, brand_ids, days_list, sales_matrix,
+        populate_rollup=populate_rollup, func_to_show=func_to_show
+    )
+
+
+def item_purchase_prices(product_ids, brand_ids, doc_index, quantities):
+    """
+    Item prices exactly as Document.recalc_prices() sets them, for many documents
+    at once. Arguments are per-item arrays; product_ids must have price levels.
+    """
+    levels = np.array(
+        ProductPriceLevel.objects.filter(product_id__in=np.unique(product_ids).tolist())
+        .order_by("product_id", "minimal_quantity")
+        .values_list("product_id", "minimal_quantity", "price"),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    return level_prices(levels, product_ids, brand_ids, doc_index, quantities)
+
+
+def level_prices(levels, product_ids, brand_ids, doc_index, quantities):
+    """
+    Vectorized Document.recalc_prices(): per document and brand the total
+    quantity selects each product's price level (largest minimal_quantity not
+    above it, otherwise the largest). levels is a (n, 3) array of
+    (product_id, minimal_quantity, price) sorted by product and quantity.
+    """
+    level_products = levels[:, 0].astype(np.int64)
+    level_quantities = levels[:, 1].astype(np.int64)
+
+    seg_start = np.searchsorted(level_products, product_ids, side="left")
+    seg_end = np.searchsorted(level_products, product_ids, side="right")
+    if (seg_start == seg_end).any():
+        raise ValueError("Some products have no price levels.")
+
+    _, brand_index = np.unique(brand_ids, return_inverse=True)
+    group = doc_index.astype(np.int64) * (brand_index.max() + 1) + brand_index
+    _, group_index = np.unique(group, return_inverse=True)
+    brand_totals = np.bincount(group_index, weights=quantities)[group_index].astype(np.int64)
 
-        doc_items = []
+    # Search (product, minimal_quantity) pairs as one sorted int64 key.
+    scale = int(max(level_quantities.max(), brand_totals.max())) + 1
+    keys = level_products * scale + level_quantities
+    idx = np.searchsorted(keys, product_ids * scale + brand_totals, side="right") - 1
+    idx = np.where(idx >= seg_start, idx, seg_end - 1)
 
+    return np.round(levels[idx, 2] * quantities, 2)
+
+
+def write_sales(warehouse, product_ids, brand_ids, days_list, sales_matrix,
+                populate_rollup=False, func_to_show=None):
+    """
+    Writes simulated sales (products x days matrix) as posted SALE documents,
+    one per day with sales, in bulk: documents with bulk_create, items with
+    COPY (bulk_create outside PostgreSQL), inventory with one net delta per
+    product. Documents, items and inventory match posting each document.
+    Posting side effects are not reproduced: the document_posted signal is not
+    sent, and the daily sales rollup and demand estimates are only updated with
+    populate_rollup, which rebuilds the rollup for the period and then all
+    estimates from it (rebuild_sales_rollup and rebuild_demand_estimates
+    catch up otherwise).
+    Returns the (first, last) local date with sales, or None if nothing was sold.
+    """
+    product_idx, day_idx = np.nonzero(sales_matrix)
+    if not len(product_idx):
+        return None
+
+    # Day-major order: the items of one document are contiguous.
+    order = np.lexsort((product_idx, day_idx))
+    product_idx, day_idx = product_idx[order], day_idx[order]
+    quantities = sales_matrix[product_idx, day_idx].astype(np.float64)
+
+    sale_days, doc_index = np.unique(day_idx, return_inverse=True)
+
+    with transaction.atomic():
         if func_to_show:
-            func_to_show(f"Day {day_index}/{total_days} {current_day.date()}", end="\r")
-
-        for pid, data in plan.items():
-            qty = data["daily_sales"][day_index - 1]
-            if qty > 0:
-                doc_items.append((data["inv"].product, qty))
-
-        if not doc_items:
-            continue
-
-        doc = Document.objects.create(
-            doc_type=Document.DocType.SALE,
-            status=Document.Status.DRAFT,
-            src_warehouse=warehouse,
-            doc_date=current_day,
-            note=f"Simulated sales for {current_day.date()}",
+            func_to_show(f"Inserting {len(sale_days)} documents...")
+        documents = Document.objects.bulk_create(
+            [
+                Document(
+                    doc_type=Document.DocType.SALE,
+                    status=Document.Status.POSTED,
+                    src_warehouse=warehouse,
+                    doc_date=days_list[day],
+                    note=f"Simulated sales for {days_list[day].date()}",
+                )
+                for day in sale_days.tolist()
+            ],
+            batch_size=5000
         )
+        document_ids = np.array([doc.id for doc in documents], dtype=np.int64)  # type: ignore
 
-        for product, qty in doc_items:
-            
-            DocumentItem.objects.create(
-                document=doc,
-                product=product,
-                quantity=Decimal(int(qty))
-            )
+        if func_to_show:
+            func_to_show(f"Inserting {len(quantities)} document items...")
+        items = pd.DataFrame({
+            "document_id": document_ids[doc_index],
+            "product_id": product_ids[product_idx],
+            "quantity": quantities,
+            "price": item_purchase_prices(
+                product_ids[product_idx], brand_ids[product_idx], doc_index, quantities
+            ),
+        })
+        insert_frame(DocumentItem, items)
 
-        doc.post()
+        if func_to_show:
+            func_to_show("Settling inventory...")
+        totals = sales_matrix.sum(axis=1)
+        Inventory.objects.apply_deltas(
+            warehouse.id,  # type: ignore
+            {int(pid): -Decimal(int(total)) for pid, total in zip(product_ids, totals) if total}
+        )
 
-    if func_to_show:
-        func_to_show("")
+        period = (
+            timezone.localdate(days_list[int(sale_days[0])]),
+            timezone.localdate(days_list[int(sale_days[-1])]),
+        )
+        if populate_rollup:
+            if func_to_show:
+                func_to_show("Rebuilding daily sales rollup...")
+            DailySales.objects.rebuild(date_from=period[0], date_to=period[1])
+            if func_to_show:
+                func_to_show("Rebuilding demand estimates...")
+            DemandEstimate.objects.rebuild()
+
+    bump_version("warehouse", warehouse.id)  # type: ignore
+
+    return period
@@ -1,31 +1,34 @@
-import math
-import statistics
-from collections import defaultdict
-from decimal import Decimal
-
-from django.contrib import admin
-from django.db.models import DecimalField, F, Sum
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, OuterRef, Q, Subquery
 from django.db.models.functions import Coalesce
 from django.urls import path, reverse
-from django.utils.html import format_html
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 
 from .admin_views.budget_input import budget_input_view
 from .admin_views.create_order import create_order_view
 from .admin_views.generate_report import generate_view
 from .admin_views.process_report import export_report_excel_view, process_report_view
+from .admin_views.report_items import report_items_bulk_update_view, report_items_view
 from .admin_views.run_forecast import run_forecast_view
 from .models import (
+    DemandEstimate,
     ForecastData,
+    ForecastRun,
+    ForecastRunItem,
     ReplenishmentItem,
     ReplenishmentReport
 )
-from .services import recalculate_report_pricing
+from .services import report_totals_aggregates
+from .utils import resume_forecast_run_service
 
 
 @admin.register(ForecastData)
 class ForecastDataAdmin(admin.ModelAdmin):
-    list_display = ('product', 'ads', 'last_updated')
-    list_filter = ('last_updated',)
+    list_display = ('product', 'ads', 'engine', 'abc_class', 'last_updated')
+    list_filter = ('engine', 'abc_class', 'last_updated',)
     search_fields = ('product__name', 'product__sku')
     
     change_list_template = "admin/replenishment/replenishment_changelist.html"
@@ -41,196 +44,56 @@ class ForecastDataAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
 
-class ReplenishmentItemInline(admin.TabularInline):
-    model = ReplenishmentItem
-    extra = 0
-    can_delete = False
-    
-    _variance_cache = {}
-    
-    fields = (
-        'product_info',
-        'inventory_info',
-        'pricing_matrix',
-        'system_suggested_quantity',
-        'best_quantity',
-        'days_for_sale',
-        'days_for_sale_variance',
-        'budget',
-        'total_sales',
-        'total_profit',
-        'system_params'
-    )
-    
-    readonly_fields = (
-        'product_info', 'inventory_info', 'system_params', 
-        'pricing_matrix', 'system_suggested_quantity', 
-        'days_for_sale', 'days_for_sale_variance', 'budget', 'total_sales', 'total_profit'
-    )
-
-    def calculate_and_cache_stats(self, report_id):
-        """Обчислює середнє значення та дисперсію Dfs для кожного бренду в звіті."""
-        
-        items = ReplenishmentItem.objects.filter(report_id=report_id).select_related('product__brand')
-
-        brand_dfs_map = defaultdict(list)
-        
-        for item in items:
-            ads = item.average_daily_sales or Decimal(0)
-            inventory = item.inventory or Decimal(0)
-            best_qty = item.best_quantity or 0
-
-            if ads > 0:
-                dfs = (inventory + Decimal(best_qty)) / ads
-                brand_dfs_map[item.product.brand.id].append(float(dfs))  # type: ignore
-        
-        variance_results = {}
-        for brand_id, dfs_list in brand_dfs_map.items():
-            if len(dfs_list) >= 2:
-                variance = statistics.variance(dfs_list)
-                stdev = math.sqrt(variance) 
-                
-                variance_results[brand_id] = {
-                    'avg': statistics.mean(dfs_list),
-                    'stdev': stdev,
-                    'count': len(dfs_list),
-                }
-        ReplenishmentItemInline._variance_cache = variance_results
+@admin.register(ForecastRun)
+class ForecastRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'start_date', 'end_date', 'tier', 'engine', 'mode', 'status', 'progress_display',
+                    'user', 'created_at', 'finished_at')
+    list_filter = ('status', 'tier', 'engine', 'mode')
+    actions = ('resume_runs',)
 
     def get_queryset(self, request):
-        ReplenishmentItemInline._variance_cache = {}
-        
-        qs = super().get_queryset(request)
-        return qs.prefetch_related('product__productpricelevel_set')
-
-    def product_info(self, obj):
-        return format_html(
-            "<b>{}</b><br>"
-            "<span style='color: #666;'>{}</span><br>"
-            "{}",
-            obj.brand_name, obj.product_sku, obj.product_name
-        )
-    product_info.short_description = "Товар"
-
-    def inventory_info(self, obj):
-        return format_html(
-            "Stock: <b>{}</b><br>"
-            "ADS: <b>{}</b>",
-            obj.inventory, obj.average_daily_sales
+        return super().get_queryset(request).select_related('user').annotate(
+            items_total=Count('items'),
+            items_open=Count('items', filter=Q(items__status=ForecastRunItem.Status.PENDING)),
         )
-    inventory_info.short_description = "Склад / Попит"
-
-    def pricing_matrix(self, obj):
-        levels = list(obj.product.productpricelevel_set.all().order_by('minimal_quantity'))
-        if not levels:
-            return "Без знижок"
 
-        s_price = obj.sale_price or Decimal(0)
-        p_price = obj.purchase_price or Decimal(0)
-
-        html = "<div style='margin: 0; padding: 0; line-height: 1;'>"
-        html += "<table style='width:100%; font-size: 11px; border-collapse: collapse; text-align: right; margin: 0; padding: 0;'>"
-        
-        html += "<tr style='border-bottom: 1px solid #ddd; background: #f9f9f9;'>"
-        html += "<th style='text-align: left; padding: 2px 5px;'>Qty</th>"
-        html += "<th style='padding: 2px 5px;'>Buy</th>"
-        html += "<th style='padding: 2px 5px;'>Sell</th>"
-        html += "<th style='padding: 2px 5px;'>Profit</th>"
-        html += "</tr>"
-        
-        for lvl in levels:
-            lvl_price = lvl.price or Decimal(0)
-            profit = s_price - lvl_price
-            profit_style = "color: green;" if profit > 0 else "color: red;"
-            
-            is_active = ""
-            if lvl_price == p_price and p_price > 0:
-                 is_active = "background-color: #d4edda; font-weight: bold;"
-
-            html += f"<tr style='border-bottom: 1px solid #eee; {is_active}'>"
-            html += f"<td style='text-align: left; padding: 2px 5px;'>{lvl.minimal_quantity}+</td>"
-            html += f"<td style='padding: 2px 5px;'>{lvl_price}</td>"
-            html += f"<td style='padding: 2px 5px;'>{s_price}</td>"
-            html += f"<td style='padding: 2px 5px; {profit_style}'>{profit}</td>"
-            html += "</tr>"
-        
-        html += "</table></div>"
-        
-        return format_html(html)
-    
-    pricing_matrix.short_description = "Обраний рівень знижки"
-    
-    def days_for_sale(self, obj):
-        ads = obj.average_daily_sales or Decimal(0)
-        inventory = obj.inventory or Decimal(0)
-        best_qty = obj.best_quantity or 0
-        
-        if ads > 0:
-            days = (inventory + Decimal(best_qty)) / ads
-            if not self._variance_cache:
-                self.calculate_and_cache_stats(obj.report_id)
-            return format_html(f"<span>{days:.1f} днів</span>")
-        return "N/A"
-    
-    def days_for_sale_variance(self, obj):
-        """Відображає стандартне відхилення (σ) запасів по бренду."""
-        if not self._variance_cache:
-            self.calculate_and_cache_stats(obj.report_id)
+    def has_add_permission(self, request):
+        return False
 
-        brand_id = obj.product.brand.id
-        stats = self._variance_cache.get(brand_id)
+    def has_change_permission(self, request, obj=None):
+        return False
 
-        if stats and stats['count'] >= 2:
-            return f"{stats['stdev']:.1f} дн."
-        return "N/A"
-        
-    days_for_sale_variance.short_description = "Відхилення (σ)"
-    
-    def budget(self, obj):
-        qty = obj.best_quantity or 0
-        price = obj.purchase_price or Decimal(0)
-        return f"{(qty * price):.2f}"
-    
-    budget.short_description = "Бюджет"
+    @admin.display(description="Оброблено")
+    def progress_display(self, obj):
+        return f"{obj.items_total - obj.items_open} / {obj.items_total}"
 
-    def total_sales(self, obj):
-        qty = obj.best_quantity or 0
-        price = obj.sale_price or Decimal(0)
-        return f"{(qty * price):.2f}"
-    
-    total_sales.short_description = "Продажі"
+    @admin.action(description="Відновити вибрані запуски")
+    def resume_runs(self, request, queryset):
+        for run in queryset:
+            try:
+                resume_forecast_run_service(run)
+            except ValidationError as e:
+                self.message_user(request, f"#{run.pk}: {e.message}", level=messages.ERROR)
+            else:
+                self.message_user(request, f"Запуск #{run.pk} відновлено.", level=messages.INFO)
 
-    def total_profit(self, obj):
-        sell = obj.sale_price if obj.sale_price is not None else Decimal(0)
-        buy = obj.purchase_price if obj.purchase_price is not None else Decimal(0)
-        qty = obj.best_quantity or 0
 
-        profit_per_unit = sell - buy
-        total = Decimal(qty) * profit_per_unit
-        
-        total_profit_str = f"{total:.2f}" 
+@admin.register(DemandEstimate)
+class DemandEstimateAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'ads_display', 'current_day', 'updated_at')
+    list_filter = ('warehouse',)
+    search_fields = ('product__name', 'product__sku')
+    list_select_related = ('product', 'warehouse')
 
-        if total > 0:
-            style = "color: green; font-weight: bold;"
-        elif total < 0:
-            style = "color: red; font-weight: bold;"
-        else:
-            style = "color: #999;"
+    def has_add_permission(self, request):
+        return False
 
-        return format_html(
-            "<span style='{}'>{}</span>",
-            style,
-            total_profit_str
-        )
+    def has_change_permission(self, request, obj=None):
+        return False
 
-    total_profit.short_description = "Прибуток"
-    
-    def system_params(self, obj):
-        return format_html(
-            "Cover: {} d<br>Credit: {} d",
-            obj.system_coverage_days, obj.credit_terms
-        )
-    system_params.short_description = "Умови"
+    @admin.display(description="ADS (сьогодні)")
+    def ads_display(self, obj):
+        return f"{max(obj.ads_at(timezone.localdate()), 0):.2f}"
 
 
 @admin.register(ReplenishmentReport)
@@ -238,29 +101,46 @@ class ReplenishmentReportAdmin(admin.ModelAdmin):
     list_display = ('id', 'created_at', 'user', 'warehouse', 'status', 
                     'total_budget_display', 'total_profit_display', 'view_items_link')
     list_filter = ('status', 'warehouse', 'created_at')
-    readonly_fields = ('user', 'warehouse', 'status', 'total_budget_calculation', 'total_profit_calculation', 
-                       'created_at', 'run_algorithm_button', 'create_order_button')
+    readonly_fields = ('user', 'warehouse', 'status', 'ads_source', 'total_budget_calculation', 'total_profit_calculation', 
+                       'created_at', 'items_grid_button', 'run_algorithm_button', 'create_order_button',
+                       'optimization_metrics_display')
     
     exclude = (
         'min_budget',
         'max_budget',
         'max_investment_period',
         'deals_variants_json',
+        'total_budget',
+        'total_profit',
+        'item_count',
+        'optimization_metrics',
     )
     
     change_list_template = "admin/replenishment/report_changelist.html"
-    
-    inlines = [ReplenishmentItemInline]
+
+    def get_queryset(self, request):
+        """
+        Підсумки беруться зі збережених полів звіту; для звітів без них
+        обчислюються корельованими підзапитами в тому ж запиті.
+        """
+        qs = super().get_queryset(request)
+        
+        totals = report_totals_aggregates()
+        items = ReplenishmentItem.objects.filter(report=OuterRef('pk')).order_by().values('report')
+        
+        def fallback(name):
+            return Subquery(items.annotate(value=totals[name]).values('value')[:1])
+        
+        return qs.annotate(
+            budget_value=Coalesce(F('total_budget'), fallback('total_budget')),
+            profit_value=Coalesce(F('total_profit'), fallback('total_profit')),
+            count_value=Coalesce(F('item_count'), fallback('item_count'), 0),
+        )
 
     def total_budget_calculation(self, obj):
-        """Розраховує загальний бюджет закупівлі для всього звіту."""
+        """Загальний бюджет закупівлі для всього звіту."""
         
-        total_budget = obj.items.aggregate(
-            sum_budget=Sum(
-                Coalesce(F('best_quantity'), 0) * Coalesce(F('purchase_price'), 0),
-                output_field=DecimalField() 
-            )
-        )['sum_budget']
+        total_budget = obj.budget_value
         
         if total_budget is None:
             return format_html("<b style='color: #E67E22;'>Не розраховано</b>")
@@ -273,16 +153,12 @@ class ReplenishmentReportAdmin(admin.ModelAdmin):
         """Відображає бюджет у списку звітів."""
         return self.total_budget_calculation(obj)
     total_budget_display.short_description = "Бюджет"
+    total_budget_display.admin_order_field = "budget_value"
     
     def total_profit_calculation(self, obj):
-        """Розраховує загальний прибуток для всього звіту."""
+        """Загальний прибуток для всього звіту."""
         
-        total_profit = obj.items.aggregate(
-            sum_profit=Sum(
-                (Coalesce(F('sale_price'), 0) - Coalesce(F('purchase_price'), 0)) * Coalesce(F('best_quantity'), 0),
-                output_field=DecimalField()
-            )
-        )['sum_profit']
+        total_profit = obj.profit_value
         
         if total_profit is None:
             return format_html("<b style='color: #E67E22;'>Не розраховано</b>")
@@ -299,11 +175,21 @@ class ReplenishmentReportAdmin(admin.ModelAdmin):
         """Відображає прибуток у списку звітів."""
         return self.total_profit_calculation(obj)
     total_profit_display.short_description = "Прибуток"
+    total_profit_display.admin_order_field = "profit_value"
     
     def view_items_link(self, obj):
-        count = obj.items.count()
-        return f"{count} позицій"
+        return f"{obj.count_value} позицій"
     view_items_link.short_description = "Товари"
+    view_items_link.admin_order_field = "count_value"
+    
+    def items_grid_button(self, obj):
+        url = reverse('admin:replenishment_report_items', args=[obj.pk])
+        return format_html(
+            '<a class="btn btn-outline-primary" href="{}">📋 Позиції звіту ({})</a>',
+            url,
+            obj.count_value
+        )
+    items_grid_button.short_description = "Позиції"
     
     def run_algorithm_button(self, obj):
         url = reverse('admin:replenishment_report_process', args=[obj.pk])
@@ -337,6 +223,32 @@ class ReplenishmentReportAdmin(admin.ModelAdmin):
         )
     create_order_button.short_description = "Створення замовлення"
     
+    @admin.display(description="Метрики оптимізації")
+    def optimization_metrics_display(self, obj):
+        """Таблиця етапів кожного проходу алгоритму: тривалість, пік RSS, лічильники."""
+        metrics = obj.optimization_metrics or {}
+        if not metrics:
+            return format_html("<span style='color: #999;'>Алгоритм ще не запускався</span>")
+
+        run_titles = {'initial': "Розрахунок варіантів", 'final': "Оптимізація бюджету"}
+        blocks = []
+        for run, data in metrics.items():
+            rows = [(span['name'], f"{span['seconds']:.3f} с", f"{span['peak_rss_mb']} МБ") for span in data['spans']]
+            rows += [
+                (f"{name} (×{stats['count']})", f"{stats['seconds']:.3f} с",
+                 f"сер. {stats['mean_seconds'] * 1000:.1f} мс, макс. {stats['max_seconds'] * 1000:.1f} мс")
+                for name, stats in data['aggregates'].items()
+            ]
+            counts = ", ".join(f"{name}: {value}" for name, value in data['counts'].items())
+            # Старі записи та системи без скидання піку містять пік процесу, а не запуску.
+            rss_title = "пік RSS" if data.get('peak_rss_scope') == 'run' else "пік RSS процесу"
+            blocks.append(format_html(
+                "<p><b>{}</b> — {} с, {} {} МБ ({})<br>{}</p>",
+                run_titles.get(run, run), f"{data['total_seconds']:.3f}", rss_title, data['peak_rss_mb'], counts,
+                format_html_join(mark_safe("<br>"), "{}: {} ({})", rows),
+            ))
+        return format_html_join("", "{}", ((block,) for block in blocks))
+
     def has_change_permission(self, request, obj=None):
         """
         Забороняє редагування, якщо звіт знаходиться у статусі ORDER_CREATED.
@@ -349,15 +261,11 @@ class ReplenishmentReportAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False
     
-    def save_formset(self, request, form, formset, change):
-        super().save_formset(request, form, formset, change)
-        
-        if formset.model == ReplenishmentItem:
-            recalculate_report_pricing(form.instance)
-    
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
+            path('<int:object_id>/items/', self.admin_site.admin_view(report_items_view), name='replenishment_report_items'),
+            path('<int:object_id>/items/bulk-update/', self.admin_site.admin_view(report_items_bulk_update_view), name='replenishment_report_items_bulk_update'),
             path('<int:object_id>/process/', self.admin_site.admin_view(process_report_view), name='replenishment_report_process'),
             path('<int:object_id>/excel/', self.admin_site.admin_view(export_report_excel_view), name='replenishment_report_excel'),
             path('<int:object_id>/budget-input/', self.admin_site.admin_view(budget_input_view), name='replenishment_report_budget_input'),
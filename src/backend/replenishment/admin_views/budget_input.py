@@ -6,7 +6,8 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from replenishment.forms import FinalBudgetForm
 from replenishment.models import ReplenishmentReport
-from replenishment.services import update_replenishment_items_with_optimization
+from replenishment.optimization.tracing import StageTimer
+from replenishment.services import store_optimization_metrics, update_replenishment_items_with_optimization
 from replenishment.utils import execute_final_optimization_pass
 
 
@@ -27,19 +28,26 @@ def budget_input_view(request, object_id):
                  messages.error(request, f"Бюджет {final_budget:,.0f} у.о. менший за мінімально допустимий {report.min_budget:,.0f} у.о.")
             else:
                 try:
-                    deals_variants_all = pickle.loads(report.deals_variants_json)  # type: ignore
+                    timer = StageTimer()
+
+                    with timer.span('extract'):
+                        deals_variants_all = pickle.loads(report.deals_variants_json)  # type: ignore
 
                     optimized_results = execute_final_optimization_pass(
                         deals_variants_all, 
                         final_budget, 
-                        report.max_investment_period
+                        report.max_investment_period,
+                        timer=timer
                     )
                     
                     if optimized_results is None:
+                        store_optimization_metrics(report, 'final', timer)
                         messages.error(request, "Алгоритм не зміг знайти оптимальне рішення в рамках заданого бюджету.")
                         return redirect(reverse('admin:replenishment_report_budget_input', args=[report.pk]))
 
-                    updated_count = update_replenishment_items_with_optimization(report, optimized_results)
+                    with timer.span('persist'):
+                        updated_count = update_replenishment_items_with_optimization(report, optimized_results)
+                    store_optimization_metrics(report, 'final', timer)
                     
                     messages.success(request, f"Оптимізація успішно завершена! Оновлено {updated_count} позицій. Фінальний бюджет: {final_budget:,.0f} у.о.")
 
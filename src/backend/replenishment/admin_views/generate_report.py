@@ -14,7 +14,8 @@ def generate_view(request):
                     user=request.user,
                     warehouse=form.cleaned_data['warehouse'],
                     coverage_days=form.cleaned_data['global_coverage_days'],
-                    credit_terms=form.cleaned_data['global_credit_terms']
+                    credit_terms=form.cleaned_data['global_credit_terms'],
+                    ads_source=form.cleaned_data['ads_source']
                 )
                 messages.success(request, f"Звіт №{report.id} успішно сформовано ({report.items.count()} товарів)")  # type: ignore
                 
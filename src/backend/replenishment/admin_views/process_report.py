@@ -10,6 +10,8 @@ from django.urls import reverse
 from django.utils import timezone
 from replenishment.forms import AlgorithmInputForm
 from replenishment.models import ReplenishmentReport
+from replenishment.optimization.tracing import StageTimer
+from replenishment.services import store_optimization_metrics
 from replenishment.utils import execute_initial_optimization_pass
 
 
@@ -71,16 +73,22 @@ def process_report_view(request, object_id):
         
         if form.is_valid():
             max_period = form.cleaned_data['max_investment_period']
+            timer = StageTimer()
             
-            data_list = _get_data_for_algorithm(report)
+            with timer.span('extract'):
+                data_list = _get_data_for_algorithm(report)
             
-            min_b, max_b, deals_json = execute_initial_optimization_pass(data_list, max_period)
+            min_b, max_b, deals_json = execute_initial_optimization_pass(data_list, max_period, timer=timer)
             
             report.min_budget = min_b
             report.max_budget = max_b
             report.max_investment_period = max_period
             report.deals_variants_json = deals_json
-            report.save()
+            with timer.span('persist'):
+                report.save()
+            
+            # Новий початковий прохід робить метрики попереднього фінального застарілими.
+            store_optimization_metrics(report, 'initial', timer, reset=True)
             
             messages.info(request, "Розрахунок бюджетних меж завершено. Виберіть фінальний бюджет.")
             
@@ -0,0 +1,230 @@
+import json
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, When
+from django.db.models.aggregates import Avg, StdDev
+from django.db.models.functions import Cast
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from replenishment.models import ReplenishmentItem, ReplenishmentReport
+from replenishment.services import (
+    apply_best_quantity_changes,
+    price_levels_by_product,
+    recalculate_report_pricing,
+)
+
+PER_PAGE_CHOICES = (50, 100, 200)
+
+SORT_FIELDS = {
+    'brand': ('brand_name', 'product_sku'),
+    'sku': ('product_sku',),
+    'ads': ('average_daily_sales',),
+    'best_quantity': ('best_quantity',),
+    'days_for_sale': ('days_for_sale',),
+    'budget': ('budget',),
+    'profit': ('profit',),
+}
+
+
+def _days_for_sale():
+    return Case(
+        When(
+            average_daily_sales__gt=0,
+            then=Cast(F('inventory') + F('best_quantity'), FloatField()) / Cast(F('average_daily_sales'), FloatField()),
+        ),
+        default=None,
+        output_field=FloatField(),
+    )
+
+
+def _brand_stat(report, aggregate, output_field):
+    """Показник днів на продаж по бренду рядка над усім звітом, поза фільтрами сторінки."""
+    return Subquery(
+        ReplenishmentItem.objects.filter(report=report, brand_name=OuterRef('brand_name'))
+        .annotate(dfs=_days_for_sale())
+        .order_by()
+        .values('brand_name')
+        .annotate(value=aggregate)
+        .values('value')[:1],
+        output_field=output_field,
+    )
+
+
+def annotated_report_items(report):
+    """
+    Рядки звіту з усіма похідними показниками, обчисленими в SQL:
+    днів на продаж, середнє та σ днів на продаж по бренду (підзапити над усім
+    звітом, тож пошук і фільтри сторінки їх не змінюють), бюджет, продажі та прибуток.
+    """
+    return ReplenishmentItem.objects.filter(report=report).annotate(
+        days_for_sale=_days_for_sale(),
+        brand_dfs_avg=_brand_stat(report, Avg('dfs'), FloatField()),
+        brand_dfs_stdev=_brand_stat(report, StdDev('dfs', sample=True), FloatField()),
+        brand_dfs_count=_brand_stat(report, Count('dfs'), IntegerField()),
+        budget=F('best_quantity') * F('purchase_price'),
+        total_sales=F('best_quantity') * F('sale_price'),
+        profit=F('best_quantity') * (F('sale_price') - F('purchase_price')),
+    )
+
+
+def _save_page_quantities(request, report):
+    changed = {}
+    for key, value in request.POST.items():
+        if not key.startswith('qty_'):
+            continue
+        try:
+            item_id = int(key[4:])
+        except ValueError:
+            raise ValueError(f"Некоректне поле «{key}».")
+        try:
+            qty = int(value)
+        except ValueError:
+            raise ValueError(f"Кількість має бути цілим числом (рядок {item_id}).")
+        if qty < 0:
+            raise ValueError(f"Кількість не може бути від'ємною (рядок {item_id}).")
+        changed[item_id] = qty
+
+    items = [
+        item for item in ReplenishmentItem.objects.filter(report=report, pk__in=changed.keys()).select_related('product')
+        if item.best_quantity != changed[item.pk]
+    ]
+    for item in items:
+        item.best_quantity = changed[item.pk]
+
+    if items:
+        # Ціни залежать від загальної кількості бренду: перераховуються лише зачеплені бренди.
+        with transaction.atomic():
+            ReplenishmentItem.objects.bulk_update(items, ['best_quantity'])
+            recalculate_report_pricing(report, brand_ids={item.product.brand_id for item in items})
+
+    return len(items)
+
+
+@staff_member_required
+def report_items_view(request, object_id):
+    report = get_object_or_404(ReplenishmentReport, pk=object_id)
+    editable = report.status != ReplenishmentReport.Status.ORDER_CREATED
+
+    if request.method == 'POST':
+        if not editable:
+            messages.error(request, "Звіт закрито для редагування: документ замовлення вже створено.")
+        else:
+            try:
+                updated = _save_page_quantities(request, report)
+                messages.success(request, f"Оновлено {updated} позицій.")
+            except ValueError as e:
+                messages.error(request, str(e))
+
+        query = request.GET.urlencode()
+        url = reverse('admin:replenishment_report_items', args=[report.pk])
+        return redirect(f"{url}?{query}" if query else url)
+
+    brand = request.GET.get('brand', '')
+    search = request.GET.get('q', '').strip()
+
+    sort = request.GET.get('sort', 'brand')
+    descending = sort.startswith('-')
+    sort_key = sort.lstrip('-')
+    if sort_key not in SORT_FIELDS:
+        sort_key, descending = 'brand', False
+
+    try:
+        per_page = int(request.GET.get('per_page', PER_PAGE_CHOICES[0]))
+    except ValueError:
+        per_page = PER_PAGE_CHOICES[0]
+    if per_page not in PER_PAGE_CHOICES:
+        per_page = PER_PAGE_CHOICES[0]
+
+    qs = annotated_report_items(report)
+
+    if brand:
+        qs = qs.filter(brand_name=brand)
+    if search:
+        qs = qs.filter(Q(product_sku__icontains=search) | Q(product_name__icontains=search))
+
+    ordering = [
+        F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+        for field in SORT_FIELDS[sort_key]
+    ]
+    qs = qs.order_by(*ordering, 'pk')
+
+    page = Paginator(qs, per_page).get_page(request.GET.get('page'))
+    items = list(page.object_list)
+
+    levels = price_levels_by_product([item.product_id for item in items])  # type: ignore
+    for item in items:
+        item.price_levels = levels.get(item.product_id, [])  # type: ignore
+        for level in item.price_levels:
+            level.profit = (item.sale_price or 0) - (level.price or 0)
+            level.is_active = level.price == item.purchase_price and item.purchase_price > 0
+
+    brands = (
+        ReplenishmentItem.objects.filter(report=report)
+        .order_by('brand_name').values_list('brand_name', flat=True).distinct()
+    )
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    sort_links = {}
+    for key in SORT_FIELDS:
+        sort_params = params.copy()
+        sort_params['sort'] = f"-{key}" if key == sort_key and not descending else key
+        sort_links[key] = sort_params.urlencode()
+
+    context = admin.site.each_context(request)
+    context.update({
+        'title': f"Позиції Звіту №{report.id}",  # type: ignore
+        'report': report,
+        'page': page,
+        'items': items,
+        'brands': brands,
+        'selected_brand': brand,
+        'search': search,
+        'sort': f"{'-' if descending else ''}{sort_key}",
+        'per_page': per_page,
+        'per_page_choices': PER_PAGE_CHOICES,
+        'query_without_page': params.urlencode(),
+        'sort_links': sort_links,
+        'editable': editable,
+    })
+
+    return render(request, 'admin/replenishment/report_items.html', context)
+
+
+@staff_member_required
+@require_POST
+def report_items_bulk_update_view(request, object_id):
+    """
+    Приймає {"changes": [{"id": ..., "best_quantity": ...}, ...]}, записує лише
+    ці рядки та повертає нові показники зачеплених брендів і підсумки звіту.
+    """
+    report = get_object_or_404(ReplenishmentReport, pk=object_id)
+
+    if report.status == ReplenishmentReport.Status.ORDER_CREATED:
+        return JsonResponse({'error': "Звіт закрито для редагування: документ замовлення вже створено."}, status=409)
+
+    try:
+        payload = json.loads(request.body)
+        changes = {}
+        for change in payload['changes']:
+            qty = int(change['best_quantity'])
+            if qty < 0:
+                raise ValueError("Кількість не може бути від'ємною.")
+            changes[int(change['id'])] = qty
+    except (ValueError, KeyError, TypeError) as e:
+        return JsonResponse({'error': f"Некоректний запит: {e}"}, status=400)
+
+    if not changes:
+        return JsonResponse({'error': "Немає змін для збереження."}, status=400)
+
+    try:
+        result = apply_best_quantity_changes(report, changes)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse(result)
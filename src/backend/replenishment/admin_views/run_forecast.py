@@ -1,5 +1,6 @@
 from django.contrib import admin, messages
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from replenishment.forms import ForecastDateRangeForm
@@ -14,15 +15,27 @@ def run_forecast_view(request):
             start_date = form.cleaned_data['start_date']
             end_date = form.cleaned_data['end_date']
             
-            job = run_prophet_forecast_service(start_date, end_date, request.user.id)
+            full_refit = form.cleaned_data['full_refit']
+            mode = form.cleaned_data['mode']
+            horizon = form.cleaned_data['horizon']
+            engine = form.cleaned_data['engine']
+            reconcile_top = form.cleaned_data['reconcile_top'] or 0
             
-            request.session['forecast_job_id'] = job.id  # type: ignore
-            
-            messages.info(request, "Прогнозування запущено у фоновому режимі. Очікуйте завершення.")
-            
-            return redirect(reverse('admin:replenishment_run_forecast'))
+            try:
+                job = run_prophet_forecast_service(
+                    start_date, end_date, request.user.id, full_refit, mode, horizon, engine, reconcile_top
+                )
+            except ValidationError as e:
+                messages.error(request, e.message)
+            else:
+                request.session['forecast_job_id'] = job.id  # type: ignore
+                
+                messages.info(request, "Прогнозування запущено у фоновому режимі. Очікуйте завершення.")
+                
+                return redirect(reverse('admin:replenishment_run_forecast'))
     
-    form = ForecastDateRangeForm()
+    else:
+        form = ForecastDateRangeForm()
     
     context = admin.site.each_context(request)
     context.update({
@@ -0,0 +1,142 @@
+"""
+Швидкі векторизовані методи прогнозу ADS.
+
+Кожен рушій рахує ADS одразу для набору рядків матриці товари × дні
+(SalesHistory) — без циклу по товарах. Дні до першого продажу товару
+не враховуються; дні після останнього продажу до кінця діапазону — нульовий попит.
+"""
+import numpy as np
+import pandas as pd
+
+from .prophet_model import FORECAST_HORIZON_DAYS
+
+
+class ForecastEngine:
+    """Базовий клас рушія прогнозу."""
+
+    name = None
+    label = None
+    # Входить у відбиток вхідних даних (див. SalesHistory.fingerprint).
+    version = "v1"
+
+    def forecast(self, history, rows, horizon=FORECAST_HORIZON_DAYS):
+        """Повертає масив ADS (float64) для рядків rows історії."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _window(history, rows, window=None):
+        """
+        Підматриця значень останніх window днів і маска днів, що вже входять
+        в історію товару (не раніше першого продажу).
+        """
+        n_days = history.matrix.shape[1]
+        start = 0 if window is None else max(0, n_days - window)
+        values = history.matrix[rows, start:]
+        columns = np.arange(start, n_days)
+        valid = columns[None, :] >= history.first_day[rows][:, None]
+        return values, valid, columns
+
+
+class WeekdayMovingAverageEngine(ForecastEngine):
+    """
+    Ковзне середнє з тижневим профілем: середній продаж для кожного дня тижня
+    за останні window днів, зважений кількістю відповідних днів у горизонті.
+    """
+
+    name = "weekday_ma"
+    label = "Ковзне середнє з тижневим профілем"
+
+    def __init__(self, window=28):
+        self.window = window
+
+    def forecast(self, history, rows, horizon=FORECAST_HORIZON_DAYS):
+        values, valid, columns = self._window(history, rows, self.window)
+        weekdays = history.days[columns].weekday.to_numpy()
+
+        one_hot = (weekdays[:, None] == np.arange(7)[None, :]).astype(np.float64)  # (days, 7)
+        sums = (values * valid) @ one_hot
+        counts = valid.astype(np.float64) @ one_hot
+
+        overall = sums.sum(axis=1) / np.maximum(counts.sum(axis=1), 1)
+        profile = np.divide(
+            sums, counts,
+            out=np.repeat(overall[:, None], 7, axis=1),
+            where=counts > 0,
+        )
+
+        future = pd.date_range(history.days[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+        weights = np.bincount(future.weekday, minlength=7) / horizon
+        return profile @ weights
+
+
+class ExponentialSmoothingEngine(ForecastEngine):
+    """Просте експоненційне згладжування; прогноз — останній рівень ряду."""
+
+    name = "ses"
+    label = "Експоненційне згладжування"
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+
+    def forecast(self, history, rows, horizon=FORECAST_HORIZON_DAYS):
+        values, valid, _ = self._window(history, rows)
+        level = np.full(len(rows), np.nan)
+
+        for t in range(values.shape[1]):
+            x = values[:, t]
+            smoothed = np.where(np.isnan(level), x, self.alpha * x + (1 - self.alpha) * level)
+            level = np.where(valid[:, t], smoothed, level)
+
+        return np.nan_to_num(level)
+
+
+class CrostonEngine(ForecastEngine):
+    """
+    Метод Кростона для переривчастого попиту: окремо згладжуються розмір
+    ненульового попиту і інтервал між продажами. З sba=True застосовується
+    поправка Сінтетоса-Бойлана (1 - alpha / 2).
+    """
+
+    name = "croston_sba"
+    label = "Кростон / SBA"
+
+    def __init__(self, alpha=0.1, sba=True):
+        self.alpha = alpha
+        self.sba = sba
+
+    def forecast(self, history, rows, horizon=FORECAST_HORIZON_DAYS):
+        values, valid, _ = self._window(history, rows)
+        n = len(rows)
+        size = np.full(n, np.nan)
+        interval = np.full(n, np.nan)
+        since_last = np.zeros(n)
+
+        for t in range(values.shape[1]):
+            active = valid[:, t]
+            since_last = since_last + active
+            demand = active & (values[:, t] > 0)
+
+            first = demand & np.isnan(size)
+            later = demand & ~first
+            x = values[:, t]
+
+            size = np.where(first, x, size)
+            interval = np.where(first, since_last, interval)
+            size = np.where(later, self.alpha * x + (1 - self.alpha) * size, size)
+            interval = np.where(later, self.alpha * since_last + (1 - self.alpha) * interval, interval)
+            since_last = np.where(demand, 0, since_last)
+
+        rate = np.nan_to_num(size / interval)
+        if self.sba:
+            rate *= 1 - self.alpha / 2
+        return rate
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (WeekdayMovingAverageEngine, ExponentialSmoothingEngine, CrostonEngine)
+}
+
+
+def get_engine(name, **params):
+    return ENGINES[name](**params)
@@ -0,0 +1,80 @@
+"""
+Ієрархічний прогноз: модель на рівні групи (бренду) з розподілом на товари.
+
+Усі операції векторизовані над матрицею товари × дні; group_index —
+номер групи для кожного рядка історії (np.unique(..., return_inverse=True)).
+"""
+import numpy as np
+
+from .history import SalesHistory
+
+
+def aggregate_by_group(history, group_keys, group_index):
+    """Сумарні ряди груп як SalesHistory (рядок = група, ключі — group_keys)."""
+    n_groups = len(group_keys)
+    n_days = history.matrix.shape[1]
+
+    matrix = np.zeros((n_groups, n_days), dtype=np.float64)
+    np.add.at(matrix, group_index, history.matrix)
+
+    first_day = np.full(n_groups, n_days, dtype=np.int64)
+    last_day = np.full(n_groups, -1, dtype=np.int64)
+    np.minimum.at(first_day, group_index, history.first_day)
+    np.maximum.at(last_day, group_index, history.last_day)
+
+    return SalesHistory(
+        product_ids=np.asarray(group_keys),
+        days=history.days,
+        matrix=matrix,
+        first_day=first_day,
+        last_day=last_day,
+        revenue=np.bincount(group_index, weights=history.revenue, minlength=n_groups),
+    )
+
+
+def recent_shares(history, group_index, n_groups, window=28):
+    """
+    Частка кожного товару в продажах своєї групи за останні window днів.
+    Якщо група за цей період нічого не продала — частки за всю історію.
+    """
+    recent = history.matrix[:, -window:].sum(axis=1)
+    overall = history.matrix.sum(axis=1)
+
+    recent_group = np.bincount(group_index, weights=recent, minlength=n_groups)
+    overall_group = np.bincount(group_index, weights=overall, minlength=n_groups)
+
+    use_recent = recent_group[group_index] > 0
+    numerator = np.where(use_recent, recent, overall)
+    denominator = np.where(use_recent, recent_group[group_index], overall_group[group_index])
+
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def disaggregate(group_ads, group_index, shares):
+    """ADS товарів = ADS групи × частка товару."""
+    return group_ads[group_index] * shares
+
+
+def reconcile_top(group_ads, group_index, shares, top_rows, top_ads):
+    """
+    Узгодження з окремими моделями топ-товарів: топ-товари беруть власний прогноз,
+    залишок прогнозу групи (не менше нуля) ділиться між рештою товарів
+    пропорційно їхнім часткам.
+    """
+    n_groups = len(group_ads)
+    is_top = np.zeros(len(shares), dtype=bool)
+    is_top[top_rows] = True
+
+    top_total = np.bincount(group_index[top_rows], weights=top_ads, minlength=n_groups)
+    residual = np.clip(group_ads - top_total, 0, None)
+
+    rest_shares = np.where(is_top, 0.0, shares)
+    rest_total = np.bincount(group_index, weights=rest_shares, minlength=n_groups)
+    rest_norm = np.divide(
+        rest_shares, rest_total[group_index],
+        out=np.zeros_like(rest_shares), where=rest_total[group_index] > 0,
+    )
+
+    ads = residual[group_index] * rest_norm
+    ads[top_rows] = top_ads
+    return ads
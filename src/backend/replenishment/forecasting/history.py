@@ -0,0 +1,136 @@
+"""
+Колонкове завантаження денної історії продажів для прогнозування.
+
+Історія читається одним запитом з агрегату DailySales у матрицю
+товари × дні; пропущені дні — нулі, що стоять у матриці з самого початку.
+Якщо дискове сховище (matrix_store) покриває діапазон, матриця береться з нього.
+"""
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from django.db.models import Sum
+from erp.models import DailySales
+
+
+@dataclass
+class SalesHistory:
+    product_ids: np.ndarray  # (n_products,) int64, відсортовані
+    days: pd.DatetimeIndex  # (n_days,) суцільний денний діапазон
+    matrix: np.ndarray  # (n_products, n_days) float64 з БД або float32 зі сховища
+    first_day: np.ndarray  # індекс першого дня з продажем для кожного товару
+    last_day: np.ndarray  # індекс останнього дня з продажем
+    revenue: np.ndarray  # сумарна виручка товару за діапазон
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def revenue_by_product(self):
+        return dict(zip(self.product_ids.tolist(), self.revenue.tolist()))
+
+    def index_of(self, product_id):
+        i = int(np.searchsorted(self.product_ids, product_id))
+        if i >= len(self.product_ids) or self.product_ids[i] != product_id:
+            raise KeyError(product_id)
+        return i
+
+    def series(self, i):
+        """
+        Ряд товару від першого до останнього дня з продажем.
+        Значення — зріз рядка матриці (view, без копіювання).
+        """
+        return self.matrix[i, self.first_day[i]:self.last_day[i] + 1]
+
+    def frame(self, i):
+        """DataFrame (ds, y) для Prophet; стовпець y спирається на той самий буфер."""
+        start, stop = self.first_day[i], self.last_day[i] + 1
+        return pd.DataFrame(
+            {'ds': self.days[start:stop], 'y': self.matrix[i, start:stop]},
+            copy=False,
+        )
+
+    def fingerprint(self, i, salt=""):
+        """
+        Відбиток вхідного ряду товару: діапазон днів плюс хеш значень.
+        Однаковий відбиток — однакові вхідні дані для моделі.
+        """
+        start, stop = self.first_day[i], self.last_day[i] + 1
+        digest = hashlib.sha256()
+        digest.update(f"{salt}|{self.days[start].date()}|{self.days[stop - 1].date()}|".encode())
+        # Кількості мають два знаки після коми: сховище тримає float32, БД дає float64,
+        # тож значення округлюються однаково, щоб відбиток не залежав від джерела.
+        digest.update(np.round(np.asarray(self.matrix[i, start:stop], dtype=np.float64), 2).tobytes())
+        return digest.hexdigest()
+
+    def lengths(self):
+        return self.last_day - self.first_day + 1
+
+    def totals(self):
+        return self.matrix.sum(axis=1)
+
+
+def load_sales_history(start_date, end_date, product_ids=None):
+    """Завантажує історію продажів за діапазон (проведені продажі): зі сховища або з БД."""
+    # Локальний імпорт: matrix_store сам залежить від SalesHistory.
+    from .matrix_store import load_history_from_store
+
+    history = load_history_from_store(start_date, end_date, product_ids)
+    if history is not None:
+        return history
+    return load_history_from_db(start_date, end_date, product_ids)
+
+
+def load_history_from_db(start_date, end_date, product_ids=None):
+    """
+    Історія продажів з агрегату DailySales одним запитом. Нульові рядки (день,
+    продажі якого скасовано) пропускаються, як і в сховищі.
+    """
+    qs = DailySales.objects.filter(day__range=(start_date, end_date)).exclude(quantity=0)
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=product_ids)
+
+    rows = list(
+        qs.values_list('product_id', 'day')
+        .annotate(y=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by()
+    )
+
+    if not rows:
+        return SalesHistory(
+            product_ids=np.empty(0, dtype=np.int64),
+            days=pd.DatetimeIndex([]),
+            matrix=np.zeros((0, 0)),
+            first_day=np.empty(0, dtype=np.int64),
+            last_day=np.empty(0, dtype=np.int64),
+            revenue=np.empty(0),
+        )
+
+    pids, days, values, revenues = zip(*rows)
+    pids = np.fromiter(pids, dtype=np.int64, count=len(rows))
+    day_numbers = np.array(days, dtype='datetime64[D]')
+    values = np.array(values, dtype=np.float64)
+
+    unique_ids, row_idx = np.unique(pids, return_inverse=True)
+    origin = day_numbers.min()
+    col_idx = (day_numbers - origin).astype(np.int64)
+    n_days = int(col_idx.max()) + 1
+
+    matrix = np.zeros((len(unique_ids), n_days), dtype=np.float64)
+    np.add.at(matrix, (row_idx, col_idx), values)
+
+    revenue = np.bincount(row_idx, weights=np.array(revenues, dtype=np.float64), minlength=len(unique_ids))
+
+    first_day = np.full(len(unique_ids), n_days, dtype=np.int64)
+    last_day = np.full(len(unique_ids), -1, dtype=np.int64)
+    np.minimum.at(first_day, row_idx, col_idx)
+    np.maximum.at(last_day, row_idx, col_idx)
+
+    return SalesHistory(
+        product_ids=unique_ids,
+        days=pd.date_range(start=pd.Timestamp(origin), periods=n_days, freq='D'),
+        matrix=matrix,
+        first_day=first_day,
+        last_day=last_day,
+        revenue=revenue,
+    )
@@ -0,0 +1,369 @@
+"""
+Дискове сховище історії продажів: матриці товари × дні (float32) на склад.
+
+Для кожного складу в каталозі <root>/w<warehouse_id>/ лежить поточна версія
+(її ім'я — у файлі CURRENT), а в ній:
+    matrix.npy   — float32 (2, місткість_товарів, місткість_днів): шар QUANTITY —
+                   кількості, шар REVENUE — виручка; рядок = товар;
+    products.npy — int64 ідентифікатори товарів за зростанням (індекс рядків);
+    meta.json    — origin (дата стовпця 0), n_days, n_products, synced_at.
+Матриця створюється із запасом місткості, тож щоденне дописування нових днів
+(і нових товарів із більшими id) змінює файл на місці; інакше версія
+переписується повністю й атомарно підміняється через CURRENT.
+
+Процеси прогнозу відкривають матрицю як memmap лише для читання: сторінки
+файлу спільні для всіх процесів через кеш ОС.
+
+synced_at — мітка часу перед читанням БД під час синхронізації. Перед
+використанням матриці рядки DailySales, змінені після неї (із запасом
+WATERMARK_MARGIN), звіряються з матрицею; розбіжність означає, що сховище
+відстало від БД, і історія читається з БД.
+"""
+import datetime
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+from erp.models import DailySales, Warehouse
+
+from .history import SalesHistory
+
+DAY_CAPACITY_STEP = 92
+PRODUCT_CAPACITY_STEP = 256
+# updated_at — час початку транзакції в годиннику БД: запас покриває довгі
+# транзакції, що закомітились уже після синхронізації, і розбіжність годинників.
+WATERMARK_MARGIN = datetime.timedelta(hours=1)
+# Шари матриці.
+QUANTITY, REVENUE = 0, 1
+
+
+@dataclass
+class SalesMatrix:
+    warehouse_id: int
+    origin: datetime.date  # дата стовпця 0
+    n_days: int  # кількість заповнених стовпців
+    product_ids: np.ndarray  # (n_products,) int64, за зростанням
+    data: np.memmap  # (2, місткість_товарів, місткість_днів) float32
+    synced_at: datetime.datetime | None = None  # None — версія без мітки, не перевіряється
+
+    @property
+    def last_day(self):
+        return self.origin + datetime.timedelta(days=self.n_days - 1)
+
+    def values(self, layer=QUANTITY):
+        """Заповнена частина шару матриці (view без копіювання)."""
+        return self.data[layer, :len(self.product_ids), :self.n_days]
+
+    def is_current(self, date_from, date_to):
+        """
+        Чи збігаються з матрицею всі рядки DailySales складу за [date_from, date_to],
+        змінені після синхронізації. Порівнюються лише змінені рядки, тож перевірка
+        дешева, доки після синхронізації продажів заднім числом майже немає.
+        """
+        if self.synced_at is None:
+            return False
+
+        date_from = max(date_from, self.origin)
+        date_to = min(date_to, self.last_day)
+        if date_to < date_from:
+            return True
+
+        changed = list(
+            DailySales.objects.filter(
+                warehouse_id=self.warehouse_id,
+                updated_at__gte=self.synced_at - WATERMARK_MARGIN,
+                day__range=(date_from, date_to),
+            ).values_list("product_id", "day", "quantity", "revenue")
+        )
+        if not changed:
+            return True
+
+        pids, days, quantities, revenues = zip(*changed)
+        pids = np.array(pids, dtype=np.int64)
+        offsets = (np.array(days, dtype="datetime64[D]") - np.datetime64(self.origin, "D")).astype(np.int64)
+        expected = np.array([quantities, revenues], dtype=np.float32)
+
+        # Товару, якого немає в матриці, відповідає нуль.
+        stored = np.zeros_like(expected)
+        if len(self.product_ids):
+            rows = np.minimum(np.searchsorted(self.product_ids, pids), len(self.product_ids) - 1)
+            known = self.product_ids[rows] == pids
+            stored[:, known] = self.data[:, rows[known], offsets[known]]
+        return bool(np.array_equal(stored, expected))
+
+
+class SalesMatrixStore:
+    def __init__(self, root=None):
+        self.root = Path(root or settings.SALES_MATRIX_DIR)
+
+    def _warehouse_dir(self, warehouse_id):
+        return self.root / f"w{warehouse_id}"
+
+    def _current_dir(self, warehouse_id):
+        pointer = self._warehouse_dir(warehouse_id) / "CURRENT"
+        try:
+            return self._warehouse_dir(warehouse_id) / pointer.read_text().strip()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_meta(version_dir):
+        return json.loads((version_dir / "meta.json").read_text())
+
+    @staticmethod
+    def _write_meta(version_dir, meta):
+        tmp = version_dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, version_dir / "meta.json")
+
+    def open(self, warehouse_id, writable=False):
+        """Відкриває матрицю складу як memmap (за замовчуванням лише для читання) або None."""
+        version_dir = self._current_dir(warehouse_id)
+        if version_dir is None:
+            return None
+
+        meta = self._read_meta(version_dir)
+        data = np.load(version_dir / "matrix.npy", mmap_mode="r+" if writable else "r")
+        if data.ndim != 3:
+            return None  # версія без шару виручки: лише перебудова
+        product_ids = np.load(version_dir / "products.npy")[:meta["n_products"]]
+
+        return SalesMatrix(
+            warehouse_id=warehouse_id,
+            origin=datetime.date.fromisoformat(meta["origin"]),
+            n_days=meta["n_days"],
+            product_ids=product_ids,
+            data=data,
+            synced_at=datetime.datetime.fromisoformat(meta["synced_at"]) if meta.get("synced_at") else None,
+        )
+
+    def _write_version(self, warehouse_id, origin, product_ids, values, synced_at):
+        """Записує нову версію з запасом місткості і атомарно робить її поточною."""
+        warehouse_dir = self._warehouse_dir(warehouse_id)
+        version = f"v{time.time_ns()}"
+        version_dir = warehouse_dir / version
+        version_dir.mkdir(parents=True)
+
+        _, n_products, n_days = values.shape
+        data = np.lib.format.open_memmap(
+            version_dir / "matrix.npy", mode="w+", dtype=np.float32,
+            shape=(len(values), n_products + PRODUCT_CAPACITY_STEP, n_days + DAY_CAPACITY_STEP),
+        )
+        data[:, :n_products, :n_days] = values
+        data.flush()
+        del data
+
+        np.save(version_dir / "products.npy", np.asarray(product_ids, dtype=np.int64))
+        self._write_meta(version_dir, {
+            "origin": origin.isoformat(), "n_days": n_days, "n_products": n_products,
+            "synced_at": synced_at.isoformat(),
+        })
+
+        pointer_tmp = warehouse_dir / "CURRENT.tmp"
+        pointer_tmp.write_text(version)
+        os.replace(pointer_tmp, warehouse_dir / "CURRENT")
+
+        # Старі версії можна видаляти: відкриті memmap тримають свої файли до закриття.
+        for old in warehouse_dir.iterdir():
+            if old.is_dir() and old.name != version:
+                shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def _load_block(warehouse_id, date_from, date_to):
+        """
+        Продажі складу за дні [date_from, date_to]: (product_ids, day_offsets, cells),
+        де cells — float32 (2, рядків) з кількостями і виручкою за шарами.
+        """
+        rows = list(
+            DailySales.objects.filter(warehouse_id=warehouse_id, day__range=(date_from, date_to))
+            .exclude(quantity=0)
+            .values_list("product_id", "day", "quantity", "revenue")
+        )
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((2, 0), dtype=np.float32)
+
+        pids, days, quantities, revenues = zip(*rows)
+        offsets = (np.array(days, dtype="datetime64[D]") - np.datetime64(date_from, "D")).astype(np.int64)
+        return np.array(pids, dtype=np.int64), offsets, np.array([quantities, revenues], dtype=np.float32)
+
+    def rebuild(self, warehouse_id, through_day=None):
+        """Повна перебудова матриці складу з агрегату DailySales. Повертає (товарів, днів)."""
+        through_day = through_day or timezone.localdate() - datetime.timedelta(days=1)
+        synced_at = timezone.now()
+        bounds = DailySales.objects.filter(warehouse_id=warehouse_id).aggregate(first=Min("day"), last=Max("day"))
+        origin = bounds["first"] or through_day
+        n_days = max((through_day - origin).days + 1, 1)
+
+        pids, offsets, cells = self._load_block(warehouse_id, origin, through_day)
+        product_ids, rows = np.unique(pids, return_inverse=True)
+
+        values = np.zeros((2, len(product_ids), n_days), dtype=np.float32)
+        np.add.at(values, (slice(None), rows, offsets), cells)
+
+        self._write_version(warehouse_id, origin, product_ids, values, synced_at)
+        return len(product_ids), n_days
+
+    def append(self, warehouse_id, through_day=None, resync_days=None):
+        """
+        Дописує дні до through_day (за замовчуванням — вчора) і перечитує останні
+        resync_days уже записаних днів (продажі заднім числом, скасування).
+        Повертає кількість дописаних днів.
+        """
+        through_day = through_day or timezone.localdate() - datetime.timedelta(days=1)
+        resync_days = settings.SALES_MATRIX_RESYNC_DAYS if resync_days is None else resync_days
+
+        matrix = self.open(warehouse_id, writable=True)
+        if matrix is None:
+            self.rebuild(warehouse_id, through_day)
+            return (through_day - self.open(warehouse_id).origin).days + 1
+
+        if matrix.synced_at is None:
+            # Версія без мітки синхронізації: невідомо, що змінилось, — перебудова.
+            self.rebuild(warehouse_id, through_day)
+            return max((through_day - matrix.last_day).days, 0)
+
+        date_from = max(matrix.origin, matrix.last_day - datetime.timedelta(days=resync_days - 1))
+        synced_at = timezone.now()
+        # Зміни заднім числом, старіші за вікно перечитування, теж підхоплюються.
+        touched = DailySales.objects.filter(
+            warehouse_id=warehouse_id,
+            updated_at__gte=matrix.synced_at - WATERMARK_MARGIN,
+            day__range=(matrix.origin, date_from - datetime.timedelta(days=1)),
+        ).aggregate(first=Min("day"))["first"]
+        date_from = touched or date_from
+        if through_day < date_from:
+            return 0
+
+        pids, offsets, cells = self._load_block(warehouse_id, date_from, through_day)
+        start = (date_from - matrix.origin).days
+        new_n_days = (through_day - matrix.origin).days + 1
+        added_days = max(new_n_days - matrix.n_days, 0)
+
+        new_ids = np.setdiff1d(pids, matrix.product_ids)
+        n_products = len(matrix.product_ids) + len(new_ids)
+        fits = (
+            n_products <= matrix.data.shape[1]
+            and new_n_days <= matrix.data.shape[2]
+            and (not len(new_ids) or not len(matrix.product_ids) or new_ids[0] > matrix.product_ids[-1])
+        )
+
+        if not fits:
+            # Місткості не вистачає або нові товари порушують порядок індексу — нова версія.
+            product_ids = np.union1d(matrix.product_ids, new_ids)
+            values = np.zeros((2, len(product_ids), new_n_days), dtype=np.float32)
+            keep = np.searchsorted(product_ids, matrix.product_ids)
+            values[:, keep, :start] = matrix.data[:, :len(matrix.product_ids), :start]
+            rows = np.searchsorted(product_ids, pids)
+            np.add.at(values, (slice(None), rows, start + offsets), cells)
+            self._write_version(warehouse_id, matrix.origin, product_ids, values, synced_at)
+            return added_days
+
+        product_ids = np.concatenate([matrix.product_ids, new_ids])
+        block = np.zeros((2, n_products, new_n_days - start), dtype=np.float32)
+        np.add.at(block, (slice(None), np.searchsorted(product_ids, pids), offsets), cells)
+
+        matrix.data[:, :n_products, start:new_n_days] = block
+        matrix.data.flush()
+
+        # Індекс розширюється лише в кінці, тож читачі зі старим meta бачать коректний префікс.
+        version_dir = self._current_dir(warehouse_id)
+        if len(new_ids):
+            tmp = version_dir / "products.tmp.npy"
+            np.save(tmp, product_ids)
+            os.replace(tmp, version_dir / "products.npy")
+        self._write_meta(version_dir, {
+            "origin": matrix.origin.isoformat(), "n_days": new_n_days, "n_products": n_products,
+            "synced_at": synced_at.isoformat(),
+        })
+        return added_days
+
+    def sync_all(self, through_day=None):
+        """Дописує матриці всіх складів. Повертає {warehouse_id: дописаних днів}."""
+        return {
+            warehouse_id: self.append(warehouse_id, through_day)
+            for warehouse_id in Warehouse.objects.values_list("id", flat=True)
+        }
+
+
+def load_history_from_store(start_date, end_date, product_ids=None, store=None):
+    """
+    Історія продажів з матриць складів (сума по складах) або None, якщо сховище
+    не покриває діапазон або відстало від БД і дані треба читати з БД. Для
+    одного складу і всіх товарів рядки — зрізи memmap без копіювання.
+    """
+    store = store or SalesMatrixStore()
+    matrices = []
+    for warehouse_id in Warehouse.objects.values_list("id", flat=True):
+        matrix = store.open(warehouse_id)
+        if matrix is None or matrix.last_day < end_date or not matrix.is_current(start_date, end_date):
+            return None
+        matrices.append(matrix)
+
+    if not matrices:
+        return None
+
+    start_date = max(start_date, min(m.origin for m in matrices))
+    n_days = (end_date - start_date).days + 1
+    if n_days <= 0:
+        return None
+
+    def window(matrix, layer=QUANTITY):
+        begin = (start_date - matrix.origin).days
+        values = matrix.values(layer)
+        if begin >= 0:
+            return values[:, begin:begin + n_days], 0
+        return values[:, :n_days + begin], -begin
+
+    all_ids = np.unique(np.concatenate([m.product_ids for m in matrices]))
+    if product_ids is not None:
+        all_ids = np.intersect1d(all_ids, np.asarray(product_ids, dtype=np.int64))
+
+    # Виручка за діапазон — сума шару REVENUE; у днях без продажів вона нульова.
+    revenue = np.zeros(len(all_ids))
+    if len(matrices) == 1 and product_ids is None:
+        values, shift = window(matrices[0])
+        if shift:
+            values = np.pad(values, ((0, 0), (shift, 0)))
+        revenue += window(matrices[0], REVENUE)[0].sum(axis=1, dtype=np.float64)
+    else:
+        values = np.zeros((len(all_ids), n_days), dtype=np.float32)
+        for matrix in matrices:
+            part, shift = window(matrix)
+            present = np.isin(matrix.product_ids, all_ids)
+            rows = np.searchsorted(all_ids, matrix.product_ids[present])
+            values[rows, shift:shift + part.shape[1]] += part[present]
+            revenue[rows] += window(matrix, REVENUE)[0][present].sum(axis=1, dtype=np.float64)
+
+    nonzero = values != 0
+    has_sales = nonzero.any(axis=1)
+    if not has_sales.any():
+        return None
+    if not has_sales.all():
+        values, nonzero, all_ids, revenue = values[has_sales], nonzero[has_sales], all_ids[has_sales], revenue[has_sales]
+
+    first_day = nonzero.argmax(axis=1).astype(np.int64)
+    last_day = (values.shape[1] - 1 - nonzero[:, ::-1].argmax(axis=1)).astype(np.int64)
+
+    # Як і при читанні з БД, діапазон — від першого до останнього дня з продажами.
+    begin, stop = int(first_day.min()), int(last_day.max()) + 1
+    if begin or stop < values.shape[1]:
+        values = values[:, begin:stop]
+        first_day -= begin
+        last_day -= begin
+
+    return SalesHistory(
+        product_ids=all_ids,
+        days=pd.date_range(start=pd.Timestamp(start_date) + pd.Timedelta(days=begin), periods=values.shape[1], freq="D"),
+        matrix=values,
+        first_day=first_day,
+        last_day=last_day,
+        revenue=revenue,
+    )
@@ -0,0 +1,133 @@
+"""
+Локальне сховище навчених моделей Prophet.
+
+Кожна модель зберігається окремим файлом <root>/<product_id>/<version>.json.gz
+(серіалізація prophet.serialize). Номер версії зростає з кожним збереженням,
+для товару тримається не більше keep_versions останніх версій. Загальний розмір
+обмежується evict(): спочатку видаляються старі версії, потім найдавніше
+використані моделі.
+
+Модуль не залежить від Django — ним користуються процеси пулу.
+"""
+import gzip
+import os
+import tempfile
+from pathlib import Path
+
+from prophet.serialize import model_from_json, model_to_json
+
+SUFFIX = ".json.gz"
+
+
+class ModelStore:
+    def __init__(self, root, keep_versions=2):
+        self.root = Path(root)
+        self.keep_versions = max(1, keep_versions)
+
+    def _product_dir(self, product_id):
+        return self.root / str(product_id)
+
+    def versions(self, product_id):
+        """Наявні версії моделі товару за зростанням."""
+        directory = self._product_dir(product_id)
+        if not directory.is_dir():
+            return []
+        return sorted(
+            int(path.name[:-len(SUFFIX)])
+            for path in directory.iterdir()
+            if path.name.endswith(SUFFIX) and path.name[:-len(SUFFIX)].isdigit()
+        )
+
+    def path_for(self, product_id, version):
+        return self._product_dir(product_id) / f"{version:06d}{SUFFIX}"
+
+    def save(self, product_id, model):
+        """Зберігає модель як нову версію і повертає її номер."""
+        directory = self._product_dir(product_id)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        existing = self.versions(product_id)
+        version = (existing[-1] + 1) if existing else 1
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+                fh.write(model_to_json(model).encode())
+            os.replace(tmp_path, self.path_for(product_id, version))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        for old in existing[:len(existing) + 1 - self.keep_versions]:
+            self.path_for(product_id, old).unlink(missing_ok=True)
+
+        return version
+
+    def load(self, product_id, version=None):
+        """
+        Повертає (model, version) для заданої або останньої версії,
+        або (None, None), якщо моделі немає.
+        """
+        if version is None:
+            existing = self.versions(product_id)
+            if not existing:
+                return None, None
+            version = existing[-1]
+
+        path = self.path_for(product_id, version)
+        try:
+            with gzip.open(path, "rb") as fh:
+                model = model_from_json(fh.read().decode())
+        except FileNotFoundError:
+            return None, None
+
+        # mtime — час останнього використання для витіснення.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # файл уже витіснив паралельний процес; модель прочитано
+        return model, version
+
+    def _files(self):
+        """(шлях, товар, версія, stat) усіх файлів моделей; файли, видалені паралельно, пропускаються."""
+        for path in self.root.glob(f"*/*{SUFFIX}"):
+            name = path.name[:-len(SUFFIX)]
+            if not name.isdigit():
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, path.parent.name, int(name), stat
+
+    def total_size(self):
+        return sum(stat.st_size for _, _, _, stat in self._files())
+
+    def evict(self, max_bytes):
+        """
+        Видаляє файли, доки загальний розмір не стане <= max_bytes.
+        Повертає кількість видалених файлів.
+        """
+        entries = []
+        latest = {}
+        for path, product, version, stat in self._files():
+            latest[product] = max(latest.get(product, 0), version)
+            entries.append((path, product, version, stat.st_size, stat.st_mtime))
+
+        total = sum(entry[3] for entry in entries)
+        if total <= max_bytes:
+            return 0
+
+        # Застарілі версії першими, далі — найдавніше використані.
+        entries.sort(key=lambda e: (e[2] == latest[e[1]], e[4]))
+
+        removed = 0
+        for path, product, version, size, _ in entries:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        return removed
@@ -0,0 +1,134 @@
+"""
+Побудова моделі Prophet для одного товару.
+
+Модуль не залежить від Django, тому його функції можна виконувати
+в дочірніх процесах пулу без підключення до бази даних.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+from .model_store import ModelStore
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+FORECAST_HORIZON_DAYS = 30
+
+# Входить у відбиток вхідних даних: зміна налаштувань моделі
+# повинна інвалідувати всі збережені результати.
+MODEL_VERSION = "prophet-v1"
+
+MODE_FIT = "fit"
+MODE_WARM_START = "warm"
+MODE_PREDICT = "predict"
+
+
+def build_model():
+    m = Prophet(weekly_seasonality='auto', daily_seasonality=False)  # type: ignore
+    m.add_seasonality(name='payday_monthly', period=30.5, fourier_order=10, prior_scale=15.0)
+    return m
+
+
+def ads_from_forecast(forecast, last_history_day):
+    """Середній прогнозований денний продаж (від'ємні значення обрізаються) після історії."""
+    forecast_period = forecast[forecast['ds'] > last_history_day]
+    
+    if len(forecast_period) == 0:
+        return 0.0
+    
+    return float(forecast_period['yhat'].clip(lower=0).sum() / len(forecast_period))
+
+
+def warm_start_params(model):
+    """Параметри навченої моделі як початкове наближення для Stan (рецепт з документації Prophet)."""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0][0]
+        else:
+            res[pname] = np.mean(model.params[pname])
+    for pname in ['delta', 'beta']:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0]
+        else:
+            res[pname] = np.mean(model.params[pname], axis=0)
+    return res
+
+
+def predict_ads(model, horizon=FORECAST_HORIZON_DAYS):
+    """ADS на горизонті horizon після кінця історії, на якій навчено модель."""
+    future = model.make_future_dataframe(periods=horizon, include_history=False)
+    forecast = model.predict(future)
+    
+    return ads_from_forecast(forecast, model.history['ds'].max())
+
+
+def fit_model(df: pd.DataFrame, previous=None):
+    """
+    Навчає Prophet на ряді (ds, y). Якщо передано previous, Stan стартує з його
+    параметрів; при несумісній структурі (інша кількість точок зміни тренду або
+    сезонних ознак) навчання повторюється з нуля.
+    """
+    if previous is not None:
+        m = build_model()
+        try:
+            return m.fit(df, init=warm_start_params(previous))
+        except Exception:
+            pass
+    
+    m = build_model()
+    m.fit(df)
+    return m
+
+
+def fit_ads(df: pd.DataFrame, horizon=FORECAST_HORIZON_DAYS):
+    """Навчає Prophet на ряді (ds, y) і повертає ADS на горизонті прогнозу."""
+    return predict_ads(fit_model(df), horizon)
+
+
+def forecast_product(product_id, df, mode=MODE_FIT, horizon=FORECAST_HORIZON_DAYS, store=None):
+    """
+    Прогноз для одного товару в заданому режимі:
+    fit — навчання з нуля; warm — навчання від параметрів збереженої моделі;
+    predict — лише прогноз збереженою моделлю (без неї — звичайне навчання).
+    Навчені моделі зберігаються в store, якщо його передано.
+    """
+    previous = None
+    if store is not None and mode in (MODE_WARM_START, MODE_PREDICT):
+        previous, _ = store.load(product_id)
+    
+    if mode == MODE_PREDICT and previous is not None:
+        return predict_ads(previous, horizon)
+    
+    model = fit_model(df, previous if mode == MODE_WARM_START else None)
+    
+    if store is not None:
+        store.save(product_id, model)
+    
+    return predict_ads(model, horizon)
+
+
+def fit_ads_safe(task):
+    """
+    Обгортка для пулу процесів: task = (product_id, df[, options]), де options —
+    dict з ключами mode, horizon, store_dir, keep_versions.
+    Повертає (product_id, ads, error) замість виключення.
+    """
+    product_id, df, *rest = task
+    options = rest[0] if rest else {}
+    try:
+        store = None
+        if options.get('store_dir'):
+            store = ModelStore(options['store_dir'], options.get('keep_versions', 2))
+        
+        ads = forecast_product(
+            product_id, df,
+            mode=options.get('mode', MODE_FIT),
+            horizon=options.get('horizon', FORECAST_HORIZON_DAYS),
+            store=store,
+        )
+        return product_id, ads, None
+    except Exception as e:
+        return product_id, None, str(e)
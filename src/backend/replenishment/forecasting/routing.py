@@ -0,0 +1,75 @@
+"""
+Вибір методу прогнозу для кожного товару.
+
+Prophet отримують лише товари класу "A" за виручкою (і з достатньою історією),
+решта — векторизовані рушії: Кростон/SBA для переривчастого попиту,
+ковзне середнє з тижневим профілем для інших.
+"""
+import numpy as np
+
+from ..optimization.sort_and_find_indexes import sort_and_find_indexes
+
+PROPHET = "prophet"
+AUTO = "auto"
+HIERARCHICAL = "hierarchical"
+# Лише векторизовані рушії (маршрутизація без Prophet).
+BASELINE = "baseline"
+
+MIN_PROPHET_DAYS = 15
+
+
+def abc_classes(revenue_by_product):
+    """
+    Парето-розподіл товарів за виручкою: A — до 85% сумарної виручки,
+    B — до 95%, C — решта. Повертає {product_id: "A" | "B" | "C"}.
+    """
+    if not revenue_by_product:
+        return {}
+
+    sorted_keys, index_85, index_95 = sort_and_find_indexes(revenue_by_product, float)
+    if index_95 == -1:
+        index_95 = len(sorted_keys) - 1
+
+    return {
+        key: "A" if i <= index_85 else "B" if i <= index_95 else "C"
+        for i, key in enumerate(sorted_keys)
+    }
+
+
+class RoutingPolicy:
+    def __init__(self, prophet_classes=("A",), intermittent_share=0.5,
+                 default_engine="weekday_ma", intermittent_engine="croston_sba"):
+        self.prophet_classes = set(prophet_classes)
+        self.intermittent_share = intermittent_share
+        self.default_engine = default_engine
+        self.intermittent_engine = intermittent_engine
+
+    def route(self, history, classes):
+        """
+        Розподіляє рядки історії між рушіями: {engine_name: масив індексів рядків}.
+        Товари без продажів у діапазоні не прогнозуються.
+        """
+        lengths = history.lengths()
+        totals = history.totals()
+        n_days = history.matrix.shape[1]
+
+        columns = np.arange(n_days)
+        valid = columns[None, :] >= history.first_day[:, None]
+        zero_share = ((history.matrix == 0) & valid).sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+
+        in_prophet_class = np.array(
+            [classes.get(int(pid)) in self.prophet_classes for pid in history.product_ids],
+            dtype=bool,
+        )
+        has_sales = totals != 0
+
+        prophet = has_sales & in_prophet_class & (lengths >= MIN_PROPHET_DAYS)
+        intermittent = has_sales & ~prophet & (zero_share >= self.intermittent_share)
+        regular = has_sales & ~prophet & ~intermittent
+
+        masks = {}
+        for name, mask in ((PROPHET, prophet), (self.intermittent_engine, intermittent),
+                           (self.default_engine, regular)):
+            masks[name] = masks[name] | mask if name in masks else mask
+
+        return {name: np.flatnonzero(mask) for name, mask in masks.items() if mask.any()}
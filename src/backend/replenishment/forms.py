@@ -4,6 +4,8 @@ from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from erp.models import Warehouse
 
+from .models import ReplenishmentReport
+
 
 class ForecastDateRangeForm(forms.Form):
     """Форма для вибору діапазону даних для прогнозу."""
@@ -25,6 +27,53 @@ class ForecastDateRangeForm(forms.Form):
         help_text="Дата, по яку включно беремо історичні дані."
     )
 
+    engine = forms.ChoiceField(
+        label="Метод прогнозу",
+        choices=[
+            ('auto', "Автоматично (Prophet для класу A, решта — швидкі методи)"),
+            ('prophet', "Prophet для всіх товарів"),
+            ('hierarchical', "Ієрархічний (Prophet на бренд, розподіл на товари)"),
+            ('weekday_ma', "Ковзне середнє з тижневим профілем"),
+            ('ses', "Експоненційне згладжування"),
+            ('croston_sba', "Кростон / SBA"),
+        ],
+        initial='auto',
+    )
+
+    reconcile_top = forms.IntegerField(
+        label="Топ-товарів з власними моделями",
+        initial=0,
+        min_value=0,
+        required=False,
+        help_text="Для ієрархічного прогнозу: скільки товарів з найбільшою виручкою "
+                  "прогнозувати окремо та узгодити з прогнозом бренду."
+    )
+
+    mode = forms.ChoiceField(
+        label="Режим",
+        choices=[
+            ('fit', "Навчання з нуля"),
+            ('warm', "Донавчання від збережених моделей"),
+            ('predict', "Лише прогноз збереженими моделями"),
+        ],
+        initial='fit',
+        help_text="Донавчання стартує з параметрів попередньої моделі й сходиться швидше; "
+                  "прогноз без навчання перераховує ADS на новий горизонт."
+    )
+
+    horizon = forms.IntegerField(
+        label="Горизонт прогнозу (днів)",
+        initial=30,
+        min_value=1,
+        max_value=365,
+    )
+
+    full_refit = forms.BooleanField(
+        label="Повне перенавчання",
+        required=False,
+        help_text="Перенавчити моделі для всіх товарів, навіть якщо їхня історія продажів не змінилася."
+    )
+
     def clean(self):
         cleaned_data = super().clean()
         start_date = cleaned_data.get('start_date')
@@ -52,6 +101,12 @@ class GenerateReplenishmentForm(forms.Form):
         initial=45,
         min_value=0
     )
+    ads_source = forms.ChoiceField(
+        label="Джерело ADS",
+        choices=ReplenishmentReport.AdsSource.choices,
+        initial=ReplenishmentReport.AdsSource.FORECAST,
+        help_text="Оперативна оцінка оновлюється при кожному проведенні продажу на цьому складі."
+    )
 
 class AlgorithmInputForm(forms.Form):
     """Форма для збору фінальних параметрів перед запуском алгоритму."""
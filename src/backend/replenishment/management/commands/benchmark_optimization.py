@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from replenishment.optimization.benchmark import (
+    PROFILES,
+    BenchmarkCase,
+    compare_results,
+    differential_check,
+    run_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the replenishment optimization pipeline on synthetic deal tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                            help="Preset case (repeatable, default: small and medium)")
+        parser.add_argument('--brands', type=int, help="Custom case: number of brands (deals)")
+        parser.add_argument('--items', type=int, default=10, help="Custom case: items per brand")
+        parser.add_argument('--tiers', type=int, default=3, help="Custom case: price tiers per item")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--period', type=int, default=45, help="Maximum investment period in days")
+        parser.add_argument('--budget-fraction', type=float, default=0.5,
+                            help="Budget between the minimum (0) and maximum (1)")
+        parser.add_argument('--output', type=str, help="Write JSON results to this file")
+        parser.add_argument('--baseline', type=str, help="Compare with JSON results of an earlier run")
+        parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown (0.25 = +25%%)")
+        parser.add_argument('--engine', type=str, default='',
+                            help="Dotted path of an engine callable(order, budget) to check against the reference")
+        parser.add_argument('--no-memory', action='store_true',
+                            help="Do not trace peak memory (tracing slows allocation-heavy stages)")
+        parser.add_argument('--skip-benchmark', action='store_true', help="Only run the differential check")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['budget_fraction'] <= 1:
+            raise CommandError("--budget-fraction must be between 0 and 1.")
+
+        cases = [
+            BenchmarkCase(name, *PROFILES[name], seed=options['seed'])
+            for name in options['profile'] or ([] if options['brands'] else ['small', 'medium'])
+        ]
+        if options['brands']:
+            if min(options['brands'], options['items'], options['tiers']) <= 0:
+                raise CommandError("--brands, --items and --tiers must be positive.")
+            cases.append(BenchmarkCase(
+                f"custom-{options['brands']}x{options['items']}x{options['tiers']}",
+                options['brands'], options['items'], options['tiers'], seed=options['seed'],
+            ))
+
+        failed = False
+
+        if options['engine']:
+            try:
+                engine = import_string(options['engine'])
+            except ImportError as e:
+                raise CommandError(str(e))
+
+            # Еталонний CP-SAT має доводити оптимальність, тож порівнюються лише невеликі кейси.
+            check_cases = [case for case in cases if case.skus <= 5000] or [BenchmarkCase('small', *PROFILES['small'])]
+            self.stdout.write(f"Checking {options['engine']} against the reference on {len(check_cases)} cases...")
+            mismatches = differential_check(engine, check_cases, max_investment_period=options['period'])
+            for mismatch in mismatches:
+                self.stdout.write(self.style.ERROR(mismatch))
+            if mismatches:
+                failed = True
+            else:
+                self.stdout.write(self.style.SUCCESS("Engine matches the reference."))
+
+        if not options['skip_benchmark']:
+            def func_to_show(msg, end="\n"):
+                return self.stdout.write(msg, ending=end)
+
+            results = run_benchmark(
+                cases, options['period'], options['budget_fraction'],
+                trace_memory=not options['no_memory'], func_to_show=func_to_show,
+            )
+
+            for case in results['cases']:
+                self.stdout.write(f"\n{case['name']} ({case['counts']['items']} items, "
+                                  f"{case['counts']['deals']} deals, {case['counts']['variants']} variants):")
+                for stage, stats in case['stages'].items():
+                    memory = f"{stats['peak_mb']:>10.1f} MB" if stats['peak_mb'] is not None else ""
+                    self.stdout.write(f"  {stage:<22}{stats['seconds']:>10.3f}s{memory}")
+                if not case['solved']:
+                    self.stdout.write(self.style.WARNING("  No solution found."))
+            self.stdout.write(f"\nMax RSS: {results['max_rss_mb']} MB")
+
+            if options['output']:
+                Path(options['output']).write_text(json.dumps(results, indent=2))
+                self.stdout.write(f"Results written to {options['output']}")
+
+            if options['baseline']:
+                try:
+                    baseline = json.loads(Path(options['baseline']).read_text())
+                except (OSError, ValueError) as e:
+                    raise CommandError(f"Cannot read baseline: {e}")
+
+                regressions = compare_results(results, baseline, threshold=options['threshold'])
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                if regressions:
+                    failed = True
+                else:
+                    self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+        if failed:
+            raise CommandError("Benchmark failed.")
+        self.stdout.write(self.style.SUCCESS("Done!"))
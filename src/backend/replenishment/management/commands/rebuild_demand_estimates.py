@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from replenishment.models import DemandEstimate
+
+
+class Command(BaseCommand):
+    help = "Rebuilds real-time demand estimates (EW daily sales) from the daily sales rollup"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Rebuilding demand estimates..."))
+
+        count = DemandEstimate.objects.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(f"Done! Written {count} estimates."))
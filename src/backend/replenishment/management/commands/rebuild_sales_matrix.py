@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from erp.models import Warehouse
+from replenishment.forecasting.matrix_store import SalesMatrixStore
+
+
+class Command(BaseCommand):
+    help = "Rebuilds (or appends to) the memory-mapped per-warehouse sales matrices used by forecasting"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warehouse', type=int, action='append', help="Warehouse id (repeatable, default: all)")
+        parser.add_argument('--append', action='store_true', help="Append new days instead of a full rebuild")
+
+    def handle(self, *args, **options):
+        store = SalesMatrixStore()
+        warehouse_ids = options['warehouse'] or list(Warehouse.objects.values_list('id', flat=True))
+
+        for warehouse_id in warehouse_ids:
+            if options['append']:
+                added = store.append(warehouse_id)
+                self.stdout.write(f"Warehouse {warehouse_id}: appended {added} days")
+            else:
+                n_products, n_days = store.rebuild(warehouse_id)
+                self.stdout.write(f"Warehouse {warehouse_id}: {n_products} products x {n_days} days")
+
+        self.stdout.write(self.style.SUCCESS(f"Done! Processed {len(warehouse_ids)} warehouses."))
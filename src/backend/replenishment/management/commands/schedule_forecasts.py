@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from replenishment.scheduler import run_nightly_forecast_schedule, schedule_next_run
+
+
+class Command(BaseCommand):
+    help = "Schedules the nightly ABC-tiered forecast (RQ scheduler) or runs it right away"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--now", action="store_true", help="Run the nightly schedule immediately")
+
+    def handle(self, *args, **options):
+        if options["now"]:
+            run_nightly_forecast_schedule.delay(reschedule=False)
+            self.stdout.write(self.style.SUCCESS("Nightly forecast enqueued."))
+
+        job = schedule_next_run()
+        self.stdout.write(self.style.SUCCESS(f"Next nightly forecast scheduled: {job.id}"))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+def backfill_report_totals(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE replenishment_replenishmentreport r
+            SET total_budget = t.total_budget,
+                total_profit = t.total_profit,
+                item_count = t.item_count
+            FROM (
+                SELECT report_id,
+                       SUM(COALESCE(best_quantity, 0) * COALESCE(purchase_price, 0)) AS total_budget,
+                       SUM((COALESCE(sale_price, 0) - COALESCE(purchase_price, 0)) * COALESCE(best_quantity, 0)) AS total_profit,
+                       COUNT(*) AS item_count
+                FROM replenishment_replenishmentitem
+                GROUP BY report_id
+            ) t
+            WHERE t.report_id = r.id
+        """)
+        cursor.execute("""
+            UPDATE replenishment_replenishmentreport SET item_count = 0 WHERE item_count IS NULL
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replenishment', '0007_tasknotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='replenishmentreport',
+            name='item_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Кількість позицій'),
+        ),
+        migrations.AddField(
+            model_name='replenishmentreport',
+            name='total_budget',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True, verbose_name='Загальний бюджет закупки'),
+        ),
+        migrations.AddField(
+            model_name='replenishmentreport',
+            name='total_profit',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True, verbose_name='Загальний прибуток'),
+        ),
+        migrations.RunPython(backfill_report_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replenishment', '0008_replenishmentreport_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastdata',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', help_text='Хеш діапазону та історії продажів, на яких навчено останню модель.', max_length=64, verbose_name='Відбиток вхідних даних'),
+        ),
+    ]
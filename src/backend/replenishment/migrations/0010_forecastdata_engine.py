@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replenishment', '0009_forecastdata_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastdata',
+            name='engine',
+            field=models.CharField(blank=True, default='', max_length=32, verbose_name='Метод прогнозу'),
+        ),
+    ]
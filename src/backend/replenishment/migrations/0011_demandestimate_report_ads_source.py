@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0010_dailysales'),
+        ('replenishment', '0010_forecastdata_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='replenishmentreport',
+            name='ads_source',
+            field=models.CharField(choices=[('FORECAST', 'Прогноз (ForecastData)'), ('REALTIME', 'Оперативна оцінка попиту')], default='FORECAST', max_length=20, verbose_name='Джерело ADS'),
+        ),
+        migrations.CreateModel(
+            name='DemandEstimate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alpha', models.FloatField(verbose_name='Коефіцієнт згладжування')),
+                ('level', models.FloatField(default=0, verbose_name='Згладжений рівень')),
+                ('current_day', models.DateField(verbose_name='Поточний день')),
+                ('current_quantity', models.FloatField(default=0, verbose_name='Продажі поточного дня')),
+                ('first_day', models.DateField(verbose_name='Перший день історії')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_estimates', to='erp.product', verbose_name='Продукт')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='erp.warehouse', verbose_name='Склад')),
+            ],
+            options={
+                'verbose_name': 'Оперативна оцінка попиту',
+                'verbose_name_plural': 'Оперативні оцінки попиту',
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
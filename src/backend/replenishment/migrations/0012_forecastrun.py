@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0010_dailysales'),
+        ('replenishment', '0011_demandestimate_report_ads_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Початкова дата історії')),
+                ('end_date', models.DateField(verbose_name='Кінцева дата історії')),
+                ('engine', models.CharField(max_length=32, verbose_name='Метод прогнозу')),
+                ('mode', models.CharField(max_length=16, verbose_name='Режим')),
+                ('horizon', models.PositiveIntegerField(verbose_name='Горизонт прогнозу (днів)')),
+                ('full_refit', models.BooleanField(default=False, verbose_name='Повне перенавчання')),
+                ('status', models.CharField(choices=[('PENDING', 'Очікує'), ('RUNNING', 'Виконується'), ('COMPLETED', 'Завершено'), ('INTERRUPTED', 'Перервано')], default='PENDING', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Створено')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Користувач')),
+            ],
+            options={
+                'verbose_name': 'Запуск прогнозу',
+                'verbose_name_plural': 'Запуски прогнозу',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ForecastRunItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('engine', models.CharField(blank=True, default='', max_length=32, verbose_name='Метод прогнозу')),
+                ('status', models.CharField(choices=[('PENDING', 'Очікує'), ('DONE', 'Виконано'), ('FAILED', 'Помилка'), ('SKIPPED', 'Пропущено (замало даних)'), ('UNCHANGED', 'Без змін')], default='PENDING', max_length=20, verbose_name='Статус')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='erp.product', verbose_name='Продукт')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='replenishment.forecastrun')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='forecastrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'RUNNING'])), fields=('start_date', 'end_date'), name='one_active_forecast_run_per_range'),
+        ),
+        migrations.AddIndex(
+            model_name='forecastrunitem',
+            index=models.Index(fields=['run', 'status'], name='replenishme_run_id_8e73bc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='forecastrunitem',
+            unique_together={('run', 'product')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replenishment', '0012_forecastrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastrun',
+            name='reconcile_top',
+            field=models.PositiveIntegerField(default=0, help_text='Лише для ієрархічного прогнозу.', verbose_name='Топ-товарів з власними моделями'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replenishment', '0013_forecastrun_reconcile_top'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='forecastrun',
+            name='one_active_forecast_run_per_range',
+        ),
+        migrations.AddField(
+            model_name='forecastdata',
+            name='abc_class',
+            field=models.CharField(blank=True, default='', help_text='Клас за внеском у виручку; перераховується щоночі.', max_length=1, verbose_name='Клас ABC'),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text='Після цього моменту нові товари не рахуються; запуск стає перерваним.', null=True, verbose_name='Ліміт часу'),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='tier',
+            field=models.CharField(blank=True, default='', help_text='Якщо задано, прогнозуються лише товари цього класу.', max_length=1, verbose_name='Клас ABC'),
+        ),
+        migrations.AddConstraint(
+            model_name='forecastrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'RUNNING'])), fields=('start_date', 'end_date', 'tier'), name='one_active_forecast_run_per_range'),
+        ),
+    ]
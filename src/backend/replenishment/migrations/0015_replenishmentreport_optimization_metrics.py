@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replenishment', '0014_forecast_abc_tiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='replenishmentreport',
+            name='optimization_metrics',
+            field=models.JSONField(blank=True, default=dict, help_text='Тривалості етапів, лічильники і пік RSS останніх проходів алгоритму (initial / final).', verbose_name='Метрики оптимізації'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from decimal import Decimal
 
-from erp.models import Product, Warehouse
+from erp.models import DailySales, Product, Warehouse
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum
+from django.utils import timezone
 
 
 class TaskNotification(models.Model):
@@ -16,6 +18,70 @@ class TaskNotification(models.Model):
         return f"Notification for {self.user}: {self.message[:20]}"
 
 
+class ForecastDataManager(models.Manager):
+    def upsert_ads(self, ads_by_product, fingerprints=None, engine="prophet"):
+        """
+        Записує ADS для багатьох товарів одним INSERT ... ON CONFLICT (product_id) DO UPDATE.
+        ads_by_product: {product_id: Decimal}; fingerprints: {product_id: str} вхідних рядів;
+        engine — метод, яким отримано прогноз.
+        """
+        fingerprints = fingerprints or {}
+        rows = [
+            self.model(
+                product_id=product_id,
+                ads=ads,
+                fingerprint=fingerprints.get(product_id, ""),
+                engine=engine,
+            )
+            for product_id, ads in ads_by_product.items()
+        ]
+        return self.bulk_create(
+            rows,
+            batch_size=5000,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["ads", "fingerprint", "engine", "last_updated"],
+        )
+
+    @transaction.atomic
+    def set_abc_classes(self, classes):
+        """
+        Зберігає клас ABC товарів ({product_id: "A" | "B" | "C"}) одним upsert-запитом;
+        товари, яких немає в classes, отримують клас "C".
+        """
+        self.update(abc_class="C")
+        return self.bulk_create(
+            [self.model(product_id=product_id, abc_class=abc_class) for product_id, abc_class in classes.items()],
+            batch_size=5000,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["abc_class"],
+        )
+
+    def abc_class_map(self):
+        """{product_id: клас ABC} з останньої нічної класифікації."""
+        return dict(self.exclude(abc_class="").values_list("product_id", "abc_class"))
+
+    def fingerprints_for(self, product_ids):
+        """{product_id: fingerprint} останнього успішного навчання."""
+        return dict(
+            self.filter(product_id__in=product_ids)
+            .exclude(fingerprint="")
+            .values_list("product_id", "fingerprint")
+        )
+
+    def ensure_rows(self, product_ids):
+        """
+        Створює записи з ADS = 0 і класом "C" для товарів, у яких їх ще немає
+        (існуючі не змінюються).
+        """
+        return self.bulk_create(
+            [self.model(product_id=product_id, ads=Decimal(0), abc_class="C") for product_id in product_ids],
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+
+
 class ForecastData(models.Model):
     """
     Stores the result of the Prophet forecast (ADS).
@@ -34,12 +100,303 @@ class ForecastData(models.Model):
         decimal_places=2,
         default=Decimal(0),
     )
+    engine = models.CharField(
+        "Метод прогнозу",
+        max_length=32,
+        blank=True,
+        default="",
+    )
+    abc_class = models.CharField(
+        "Клас ABC",
+        max_length=1,
+        blank=True,
+        default="",
+        help_text="Клас за внеском у виручку; перераховується щоночі.",
+    )
+    fingerprint = models.CharField(
+        "Відбиток вхідних даних",
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Хеш діапазону та історії продажів, на яких навчено останню модель.",
+    )
     last_updated = models.DateTimeField("Останнє оновлення", auto_now=True)
 
+    objects = ForecastDataManager()
+
     def __str__(self):
         return f"ADS for {self.product.sku}: {self.ads}"
 
 
+class ForecastRun(models.Model):
+    """
+    Один запуск прогнозу за діапазон історії. Стан кожного товару зберігається
+    в ForecastRunItem і фіксується партіями, тож перерваний запуск можна відновити.
+    Для одного діапазону (і класу ABC) одночасно може виконуватися лише один запуск.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Очікує"
+        RUNNING = "RUNNING", "Виконується"
+        COMPLETED = "COMPLETED", "Завершено"
+        INTERRUPTED = "INTERRUPTED", "Перервано"
+
+    ACTIVE_STATUSES = (Status.PENDING, Status.RUNNING)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, verbose_name="Користувач"
+    )
+    start_date = models.DateField("Початкова дата історії")
+    end_date = models.DateField("Кінцева дата історії")
+    engine = models.CharField("Метод прогнозу", max_length=32)
+    mode = models.CharField("Режим", max_length=16)
+    horizon = models.PositiveIntegerField("Горизонт прогнозу (днів)")
+    full_refit = models.BooleanField("Повне перенавчання", default=False)
+    reconcile_top = models.PositiveIntegerField(
+        "Топ-товарів з власними моделями", default=0,
+        help_text="Лише для ієрархічного прогнозу.",
+    )
+    tier = models.CharField(
+        "Клас ABC", max_length=1, blank=True, default="",
+        help_text="Якщо задано, прогнозуються лише товари цього класу.",
+    )
+    deadline = models.DateTimeField(
+        "Ліміт часу", null=True, blank=True,
+        help_text="Після цього моменту нові товари не рахуються; запуск стає перерваним.",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Статус",
+    )
+    created_at = models.DateTimeField("Створено", auto_now_add=True)
+    finished_at = models.DateTimeField("Завершено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Запуск прогнозу"
+        verbose_name_plural = "Запуски прогнозу"
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["start_date", "end_date", "tier"],
+                condition=models.Q(status__in=["PENDING", "RUNNING"]),
+                name="one_active_forecast_run_per_range",
+            )
+        ]
+
+    def __str__(self):
+        return f"Прогноз #{self.pk} ({self.start_date} — {self.end_date})"
+
+    def checkpoint(self, **product_ids_by_status):
+        """
+        Фіксує стан товарів запуску: checkpoint(done=[...], failed=[...]).
+        Викликається в тій самій транзакції, що й запис ADS.
+        """
+        for status, product_ids in product_ids_by_status.items():
+            if product_ids:
+                self.items.filter(product_id__in=product_ids).update(status=status.upper())
+
+    def pending_product_ids(self):
+        return list(
+            self.items.filter(status=ForecastRunItem.Status.PENDING)
+            .order_by("product_id")
+            .values_list("product_id", flat=True)
+        )
+
+    def counts(self):
+        """{status: кількість товарів} плюс baseline — готові товари векторизованих рушіїв."""
+        counts = dict(
+            self.items.values("status").annotate(n=models.Count("id")).values_list("status", "n")
+        )
+        counts["baseline"] = (
+            self.items.filter(status=ForecastRunItem.Status.DONE).exclude(engine="prophet").count()
+        )
+        return counts
+
+
+class ForecastRunItem(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Очікує"
+        DONE = "DONE", "Виконано"
+        FAILED = "FAILED", "Помилка"
+        SKIPPED = "SKIPPED", "Пропущено (замало даних)"
+        UNCHANGED = "UNCHANGED", "Без змін"
+
+    run = models.ForeignKey(ForecastRun, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Продукт")
+    engine = models.CharField("Метод прогнозу", max_length=32, blank=True, default="")
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Статус",
+    )
+
+    class Meta:
+        unique_together = ("run", "product")
+        indexes = [models.Index(fields=["run", "status"])]
+
+
+def realtime_ads_alpha():
+    """Коефіцієнт згладжування для заданого в налаштуваннях періоду напіврозпаду (днів)."""
+    return 1 - 0.5 ** (1 / settings.REALTIME_ADS_HALFLIFE_DAYS)
+
+
+class DemandEstimateManager(models.Manager):
+    def apply_document(self, document, sign=1):
+        """
+        Додає (sign=1) або віднімає (sign=-1) продаж документа в оцінках попиту
+        складу-джерела. Для кожного товару — одне оновлення стану O(1).
+        """
+        quantities = dict(
+            document.items.values("product_id")
+            .annotate(total=Sum("quantity"))
+            .values_list("product_id", "total")
+        )
+        if not quantities:
+            return
+
+        day = timezone.localdate(document.doc_date)
+        warehouse_id = document.src_warehouse_id
+        alpha = realtime_ads_alpha()
+
+        self.bulk_create(
+            [
+                self.model(
+                    product_id=product_id,
+                    warehouse_id=warehouse_id,
+                    alpha=alpha,
+                    first_day=day,
+                    current_day=day,
+                )
+                for product_id in quantities
+            ],
+            ignore_conflicts=True,
+        )
+
+        estimates = list(
+            self.select_for_update().filter(
+                warehouse_id=warehouse_id, product_id__in=list(quantities)
+            )
+        )
+        # bulk_update не викликає pre_save, тож auto_now треба виставити вручну.
+        now = timezone.now()
+        for estimate in estimates:
+            estimate.add(day, sign * float(quantities[estimate.product_id]))
+            estimate.updated_at = now
+
+        self.bulk_update(
+            estimates, ["level", "current_day", "current_quantity", "first_day", "updated_at"]
+        )
+
+    def ads_map(self, warehouse, day=None):
+        """{product_id: Decimal ADS} для складу станом на початок дня day (за замовчуванням — сьогодні)."""
+        day = day or timezone.localdate()
+        return {
+            estimate.product_id: Decimal(max(estimate.ads_at(day), 0)).quantize(Decimal(".01"))
+            for estimate in self.filter(warehouse=warehouse)
+        }
+
+    @transaction.atomic
+    def rebuild(self):
+        """
+        Перераховує всі оцінки з денного агрегату продажів. Повертає кількість оцінок.
+        """
+        alpha = realtime_ads_alpha()
+        estimates = {}
+
+        rows = (
+            DailySales.objects.exclude(quantity=0)
+            .order_by("product_id", "warehouse_id", "day")
+            .values_list("product_id", "warehouse_id", "day", "quantity")
+        )
+        for product_id, warehouse_id, day, quantity in rows.iterator(chunk_size=10000):
+            key = (product_id, warehouse_id)
+            estimate = estimates.get(key)
+            if estimate is None:
+                estimate = estimates[key] = self.model(
+                    product_id=product_id,
+                    warehouse_id=warehouse_id,
+                    alpha=alpha,
+                    first_day=day,
+                    current_day=day,
+                )
+            estimate.add(day, float(quantity))
+
+        self.all().delete()
+        self.bulk_create(estimates.values(), batch_size=5000)
+        return len(estimates)
+
+
+class DemandEstimate(models.Model):
+    """
+    Оперативна оцінка денного попиту товару на складі: експоненційно зважене
+    середнє денних продажів, що оновлюється при кожному проведенні
+    (або скасуванні) продажу без перерахунку історії.
+
+    level — згладжене значення за всі завершені дні до current_day;
+    current_quantity — продажі за current_day, що ще не увійшли в level.
+    """
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="demand_estimates",
+        verbose_name="Продукт",
+    )
+    warehouse = models.ForeignKey(
+        Warehouse, on_delete=models.CASCADE, verbose_name="Склад"
+    )
+    alpha = models.FloatField("Коефіцієнт згладжування")
+    level = models.FloatField("Згладжений рівень", default=0)
+    current_day = models.DateField("Поточний день")
+    current_quantity = models.FloatField("Продажі поточного дня", default=0)
+    first_day = models.DateField("Перший день історії")
+    updated_at = models.DateTimeField("Оновлено", auto_now=True)
+
+    objects = DemandEstimateManager()
+
+    class Meta:
+        verbose_name = "Оперативна оцінка попиту"
+        verbose_name_plural = "Оперативні оцінки попиту"
+        unique_together = ("product", "warehouse")
+
+    def __str__(self):
+        return f"{self.product} @ {self.warehouse}"
+
+    def level_at(self, day):
+        """Згладжений рівень після закриття всіх днів до day (не включно)."""
+        if day <= self.current_day:
+            return self.level
+        closed = self.alpha * self.current_quantity + (1 - self.alpha) * self.level
+        return closed * (1 - self.alpha) ** ((day - self.current_day).days - 1)
+
+    def add(self, day, quantity):
+        """Враховує продаж quantity (від'ємний — скасування) за день day."""
+        if day > self.current_day:
+            self.level = self.level_at(day)
+            self.current_day = day
+            self.current_quantity = quantity
+        elif day == self.current_day:
+            self.current_quantity += quantity
+        else:
+            # Продаж заднім числом: внесок дня day у рівень, загаслий до current_day.
+            age = (self.current_day - day).days - 1
+            self.level += self.alpha * (1 - self.alpha) ** age * quantity
+            self.first_day = min(self.first_day, day)
+
+    def ads_at(self, day):
+        """
+        ADS станом на початок дня day: рівень з поправкою на коротку історію
+        (ділення на сумарну вагу днів від first_day).
+        """
+        closed_days = (max(day, self.current_day) - self.first_day).days
+        if closed_days <= 0:
+            return 0.0
+        return self.level_at(day) / (1 - (1 - self.alpha) ** closed_days)
+
+
 class ReplenishmentReport(models.Model):
     """
     Represents one run of the replenishment algorithm. Stores global parameters.
@@ -49,6 +406,10 @@ class ReplenishmentReport(models.Model):
         DRAFT = "DRAFT", "Чернетка (розрахунок)"
         ORDER_CREATED = "ORDER_CREATED", "Замовлення сформовано"
 
+    class AdsSource(models.TextChoices):
+        FORECAST = "FORECAST", "Прогноз (ForecastData)"
+        REALTIME = "REALTIME", "Оперативна оцінка попиту"
+
     created_at = models.DateTimeField("Створено", auto_now_add=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Користувач"
@@ -62,6 +423,12 @@ class ReplenishmentReport(models.Model):
         default=Status.DRAFT,
         verbose_name="Статус",
     )
+    ads_source = models.CharField(
+        max_length=20,
+        choices=AdsSource.choices,
+        default=AdsSource.FORECAST,
+        verbose_name="Джерело ADS",
+    )
 
     global_coverage_days = models.PositiveIntegerField(
         "Цільове покриття (днів)", default=14
@@ -79,6 +446,19 @@ class ReplenishmentReport(models.Model):
         null=True, blank=True
     )
 
+    total_budget = models.DecimalField(
+        "Загальний бюджет закупки", max_digits=15, decimal_places=2, null=True, blank=True
+    )
+    total_profit = models.DecimalField(
+        "Загальний прибуток", max_digits=15, decimal_places=2, null=True, blank=True
+    )
+    item_count = models.PositiveIntegerField("Кількість позицій", null=True, blank=True)
+
+    optimization_metrics = models.JSONField(
+        "Метрики оптимізації", default=dict, blank=True,
+        help_text="Тривалості етапів, лічильники і пік RSS останніх проходів алгоритму (initial / final).",
+    )
+
     def __str__(self):
         return f"Звіт №{self.id} від {self.user} ({self.created_at.date()})"  # type: ignore
 
@@ -0,0 +1,332 @@
+"""
+Бенчмарк конвеєра оптимізації закупівлі на синтетичних таблицях угод.
+
+Таблиця угод генерується відтворювано (seed) у форматі _get_data_for_algorithm:
+brands угод (брендів) × items_per_brand товарів × tiers_per_item рівнів цін.
+Для кожного етапу (prepare_file, beautify, GetAllDealVariants,
+optimize_efficiency, map_to_table, write_out_table, fill_formulas) фіксуються
+час, пік пам'яті Python (tracemalloc, без пам'яті C++ розв'язувача; трасування
+сповільнює етапи, тож його можна вимкнути) і кількості угод, товарів і варіантів. Результати пишуться в JSON і
+порівнюються з базовими (compare_results).
+
+differential_check порівнює рушій оптимізації (callable(order, budget)) з
+еталонним reference_engine: однакові розподіли кількостей і цільова функція.
+"""
+import datetime
+import math
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .beautify import beautify
+from .fill_formulas import main as fill_formulas
+from .from_matlab.GetAllDealVariants import GetAllDealVariants
+from .map_to_table import map_to_table
+from .prepare_file import main as prepare_file
+from .solver import optimize_efficiency, selected_deals
+from .write_out_table import write_out_table
+
+FORMAT_VERSION = 1
+
+# brands, items_per_brand, tiers_per_item
+PROFILES = {
+    "small": (20, 10, 3),
+    "medium": (200, 25, 4),
+    "large": (1000, 100, 4),
+}
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    brands: int
+    items_per_brand: int
+    tiers_per_item: int
+    seed: int = 0
+
+    @property
+    def skus(self):
+        return self.brands * self.items_per_brand
+
+
+def synthetic_deal_table(brands, items_per_brand, tiers_per_item, seed=0, coverage_days=30, credit_terms=30):
+    """
+    Рядки таблиці угод (по одному на рівень ціни товару), як їх формує звіт.
+    Рівні цін спільні для бренду: мінімальні кількості — частки сумарної
+    рекомендованої кількості бренду, знижка зростає з рівнем. Ціна продажу
+    завжди вища за закупівельну; ~5% товарів без продажів.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (brands, items_per_brand)
+
+    ads = np.round(rng.lognormal(0.0, 1.0, shape), 2)
+    ads[:, 1:][rng.random((brands, items_per_brand - 1)) < 0.05] = 0.0
+    inventory = np.floor(ads * rng.uniform(0, 20, shape))
+    suggested = np.maximum(np.ceil(ads * coverage_days - inventory), 0).astype(np.int64)
+    suggested[:, 0] = np.maximum(suggested[:, 0], 1)  # угода не може бути порожньою
+
+    cost = np.round(rng.uniform(1, 200, shape), 2)
+    sale_price = np.round(cost * rng.uniform(1.15, 1.6, shape), 2)
+
+    brand_total = suggested.sum(axis=1)
+    ladder = np.sort(rng.uniform(0.5, 2.5, (brands, tiers_per_item - 1)), axis=1)
+    moqs = np.concatenate(
+        [np.ones((brands, 1), dtype=np.int64), np.ceil(brand_total[:, None] * ladder).astype(np.int64)], axis=1
+    )
+    # Однакові пороги зливаються в один рівень, тож пороги мають строго зростати.
+    moqs += np.arange(tiers_per_item)
+    discounts = np.concatenate(
+        [np.zeros((brands, 1)), np.sort(rng.uniform(0.02, 0.2, (brands, tiers_per_item - 1)), axis=1)], axis=1
+    )
+
+    rows = []
+    for b in range(brands):
+        deal_id = f"Brand {b + 1:05d}"
+        for i in range(items_per_brand):
+            sku = f"SKU-{b + 1:05d}-{i + 1:04d}"
+            for t in range(tiers_per_item):
+                purchase_price = round(float(cost[b, i]) * (1 - float(discounts[b, t])), 2)
+                rows.append({
+                    "Deal ID": deal_id,
+                    "Item No": sku,
+                    "Item Name": f"Product {b + 1}-{i + 1}",
+                    "Minimum Purchase UoM Quantity": int(moqs[b, t]),
+                    "Purchase Price": purchase_price,
+                    "Sale Price": float(sale_price[b, i]),
+                    "Profit": round(float(sale_price[b, i]) - purchase_price, 2),
+                    "Average Daily Sales": float(ads[b, i]),
+                    "Inventory": float(inventory[b, i]),
+                    "System Suggested Quantity": int(suggested[b, i]),
+                    "System Coverage Days": coverage_days,
+                    "Credit Terms": credit_terms,
+                })
+    return rows
+
+
+def budget_bounds(deals_variants_all):
+    """Мінімальний і максимальний бюджет: перші й останні варіанти всіх угод."""
+    min_budget = sum(variants[0]['budget'] for variants in deals_variants_all.values())
+    max_budget = sum(variants[-1]['budget'] for variants in deals_variants_all.values())
+    return min_budget, max_budget
+
+
+def allocation(deals):
+    """{ItemNo: BestSuggestedQuantity} обраних варіантів угод."""
+    return {item['ItemNo']: int(item['BestSuggestedQuantity']) for deal in deals.values() for item in deal.values()}
+
+
+def reference_engine(order, budget):
+    """
+    Еталонний рушій: усі варіанти угод (GetAllDealVariants) і CP-SAT (optimize_efficiency).
+    Повертає {'objective', 'budget_used', 'allocation'} або None, якщо розв'язку немає.
+    """
+    deals_variants_all = {idx: GetAllDealVariants(deal) for idx, deal in order.items()}
+    solution = optimize_efficiency(deals_variants_all, budget)
+    if solution is None:
+        return None
+    return {
+        'objective': solution['total_efficiency'],
+        'budget_used': solution['total_budget_used'],
+        'allocation': allocation(selected_deals(deals_variants_all, solution)),
+    }
+
+
+class _Stage:
+    """Вимірює час і, якщо tracemalloc увімкнено, пік пам'яті блоку коду."""
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.memory = tracemalloc.get_traced_memory()[0]
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        peak = None
+        if tracemalloc.is_tracing():
+            peak = round((tracemalloc.get_traced_memory()[1] - self.memory) / 2 ** 20, 3)
+        self.stats[self.name] = {'seconds': round(seconds, 6), 'peak_mb': peak}
+        return False
+
+
+def run_case(case, max_investment_period=45, budget_fraction=0.5, trace_memory=True, func_to_show=None):
+    """Проганяє весь конвеєр на синтетичній таблиці case. Повертає результат кейсу (dict)."""
+    table = synthetic_deal_table(case.brands, case.items_per_brand, case.tiers_per_item, case.seed)
+    stages = {}
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    try:
+        with _Stage(stages, "prepare_file"):
+            sorted_data = prepare_file(table)
+        with _Stage(stages, "beautify"):
+            order, *_ = beautify(sorted_data, max_investment_period)
+        with _Stage(stages, "GetAllDealVariants"):
+            deals_variants_all = {idx: GetAllDealVariants(deal) for idx, deal in order.items()}
+
+        min_budget, max_budget = budget_bounds(deals_variants_all)
+        budget = math.ceil(min_budget + (max_budget - min_budget) * budget_fraction)
+
+        with _Stage(stages, "optimize_efficiency"):
+            solution = optimize_efficiency(deals_variants_all, budget)
+
+        if solution is not None:
+            correct_order = selected_deals(deals_variants_all, solution)
+            with _Stage(stages, "map_to_table"):
+                table_out, second_table, third_table = map_to_table(
+                    correct_order, solution['total_efficiency'], max_investment_period
+                )
+            with tempfile.TemporaryDirectory() as tmp:
+                path = str(Path(tmp) / "benchmark.xlsx")
+                with _Stage(stages, "write_out_table"):
+                    write_out_table(table_out, sorted_data, second_table, third_table, path)
+                with _Stage(stages, "fill_formulas"):
+                    fill_formulas(path, echo=False)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    variant_counts = [len(variants) for variants in deals_variants_all.values()]
+    result = {
+        'name': case.name,
+        'params': asdict(case),
+        'stages': stages,
+        'counts': {
+            'rows': len(table),
+            'deals': len(order),
+            'items': sum(len(deal) for deal in order.values()),
+            'variants': sum(variant_counts),
+            'max_variants_per_deal': max(variant_counts, default=0),
+        },
+        'budget': {'min': min_budget, 'max': max_budget, 'used': budget},
+        'objective': solution['total_efficiency'] if solution else None,
+        'solved': solution is not None,
+    }
+
+    if func_to_show:
+        total = sum(stage['seconds'] for stage in stages.values())
+        func_to_show(f"{case.name}: {case.skus} SKUs, {result['counts']['variants']} variants, {total:.2f}s")
+    return result
+
+
+def run_benchmark(cases, max_investment_period=45, budget_fraction=0.5, trace_memory=True, func_to_show=None):
+    """Результати всіх кейсів з метаданими середовища (для JSON)."""
+    import ortools
+
+    results = [
+        run_case(case, max_investment_period, budget_fraction, trace_memory, func_to_show) for case in cases
+    ]
+    return {
+        'format': FORMAT_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'ortools': ortools.__version__,
+        },
+        'max_investment_period': max_investment_period,
+        'budget_fraction': budget_fraction,
+        'trace_memory': trace_memory,
+        # ru_maxrss — у КБ на Linux: пік усього процесу, включно з розв'язувачем.
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'cases': results,
+    }
+
+
+def compare_results(current, baseline, threshold=0.25, min_seconds=0.05, min_mb=1.0):
+    """
+    Регресії поточних результатів відносно базових: етап повільніший або
+    займає більше пам'яті ніж у (1 + threshold) разів (і більше за шумовий
+    поріг min_seconds / min_mb), або змінились кількості варіантів на тих самих
+    даних. Кейси порівнюються за назвою і лише з однаковими параметрами; час —
+    лише якщо обидва запуски однаково трасували пам'ять.
+    Повертає список описів регресій.
+    """
+    regressions = []
+    baseline_cases = {case['name']: case for case in baseline.get('cases', [])}
+    same_tracing = current.get('trace_memory') == baseline.get('trace_memory')
+
+    for case in current['cases']:
+        base = baseline_cases.get(case['name'])
+        if base is None or base['params'] != case['params']:
+            continue
+
+        for stage, stats in case['stages'].items():
+            base_stats = base['stages'].get(stage)
+            if base_stats is None:
+                continue
+            for key, floor, unit in (('seconds', min_seconds, 's'), ('peak_mb', min_mb, ' MB')):
+                now, before = stats[key], base_stats[key]
+                if now is None or before is None or (key == 'seconds' and not same_tracing):
+                    continue
+                if now > before * (1 + threshold) and now - before > floor:
+                    regressions.append(
+                        f"{case['name']}/{stage}: {key} {before:.3f}{unit} -> {now:.3f}{unit} "
+                        f"(+{(now / before - 1) * 100 if before else math.inf:.0f}%)"
+                    )
+
+        for key in ('deals', 'items', 'variants'):
+            if case['counts'][key] != base['counts'][key]:
+                regressions.append(
+                    f"{case['name']}: {key} changed {base['counts'][key]} -> {case['counts'][key]}"
+                )
+
+    return regressions
+
+
+def differential_check(engine, cases, fractions=(0.25, 0.5, 0.75), max_investment_period=45,
+                       reference=reference_engine, rel_tol=1e-9):
+    """
+    Порівнює engine з еталоном на кожному кейсі і частці бюджету між мінімальним
+    і максимальним. Кожен рушій отримує власну свіжу копію угод.
+    Повертає список розбіжностей (порожній — рушії збігаються).
+    """
+    mismatches = []
+    for case in cases:
+        table = synthetic_deal_table(case.brands, case.items_per_brand, case.tiers_per_item, case.seed)
+        sorted_data = prepare_file(table)
+
+        def fresh_order():
+            order, *_ = beautify(sorted_data, max_investment_period)
+            return order
+
+        order = fresh_order()
+        min_budget, max_budget = budget_bounds({idx: GetAllDealVariants(deal) for idx, deal in order.items()})
+
+        for fraction in fractions:
+            budget = math.ceil(min_budget + (max_budget - min_budget) * fraction)
+            expected = reference(fresh_order(), budget)
+            actual = engine(fresh_order(), budget)
+            label = f"{case.name} @ budget {budget} ({fraction:.0%})"
+
+            if expected is None or actual is None:
+                if (expected is None) != (actual is None):
+                    mismatches.append(f"{label}: solved by {'engine' if expected is None else 'reference'} only")
+                continue
+
+            if not math.isclose(actual['objective'], expected['objective'], rel_tol=rel_tol, abs_tol=1e-6):
+                mismatches.append(f"{label}: objective {actual['objective']} != {expected['objective']}")
+
+            if actual['allocation'] != expected['allocation']:
+                differing = sorted(
+                    sku for sku in expected['allocation'].keys() | actual['allocation'].keys()
+                    if actual['allocation'].get(sku) != expected['allocation'].get(sku)
+                )
+                mismatches.append(f"{label}: {len(differing)} allocations differ (e.g. {', '.join(differing[:5])})")
+
+    return mismatches
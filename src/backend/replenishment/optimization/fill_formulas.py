@@ -111,10 +111,10 @@ def color_entire_column(sheet, col_letter, rgb_tuple):
 
 
 def main(filename=None, echo=True):
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--excelname", help="Excel file name")
-    args = parser.parse_args()
-    filename = filename or args.excelname
+    if not filename:
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--excelname", help="Excel file name")
+        filename = parser.parse_args().excelname
 
     if not filename:
         raise SystemExit("Excel filename is required (either argument or --excelname)")
@@ -1,42 +1,50 @@
+from contextlib import nullcontext
+
 from ortools.sat.python import cp_model
 
 
-def optimize_efficiency(deals_variants_all, max_budget) -> dict | None:
-    model = cp_model.CpModel()
+def _span(timer, name):
+    return timer.span(name) if timer else nullcontext()
+
 
-    list_of_deals = list(deals_variants_all.values())
+def optimize_efficiency(deals_variants_all, max_budget, timer=None) -> dict | None:
+    with _span(timer, "model_build"):
+        model = cp_model.CpModel()
+
+        list_of_deals = list(deals_variants_all.values())
     
-    M = len(list_of_deals)
-    SCALE = 1000
+        M = len(list_of_deals)
+        SCALE = 1000
 
-    y = []
-    for g, group in enumerate(list_of_deals):
-        row = []
-        for v, variant in enumerate(group):
-            row.append(model.NewBoolVar(f"y_{g}_{v}"))
-        y.append(row)
-
-    for g in range(M):
-        model.Add(sum(y[g][v] for v in range(len(list_of_deals[g]))) == 1)
-
-    total_budget = sum(
-        int(round(group[v]["budget"] * SCALE)) * y[g][v]
-        for g, group in enumerate(list_of_deals)
-        for v in range(len(group))
-    )
-    model.Add(total_budget <= int(round(max_budget * SCALE)))
-
-    total_eff = sum(
-        int(round(group[v]["efficiency"] * SCALE)) * y[g][v]
-        for g, group in enumerate(list_of_deals)
-        for v in range(len(group))
-    )
-    model.Maximize(total_eff)
-
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 10
-    solver.parameters.num_search_workers = 8
-    status = solver.Solve(model)
+        y = []
+        for g, group in enumerate(list_of_deals):
+            row = []
+            for v, variant in enumerate(group):
+                row.append(model.NewBoolVar(f"y_{g}_{v}"))
+            y.append(row)
+
+        for g in range(M):
+            model.Add(sum(y[g][v] for v in range(len(list_of_deals[g]))) == 1)
+
+        total_budget = sum(
+            int(round(group[v]["budget"] * SCALE)) * y[g][v]
+            for g, group in enumerate(list_of_deals)
+            for v in range(len(group))
+        )
+        model.Add(total_budget <= int(round(max_budget * SCALE)))
+
+        total_eff = sum(
+            int(round(group[v]["efficiency"] * SCALE)) * y[g][v]
+            for g, group in enumerate(list_of_deals)
+            for v in range(len(group))
+        )
+        model.Maximize(total_eff)
+
+    with _span(timer, "solve"):
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = 10
+        solver.parameters.num_search_workers = 8
+        status = solver.Solve(model)
 
     text_status: dict = {
         cp_model.OPTIMAL: "OPTIMAL",
@@ -74,3 +82,12 @@ def optimize_efficiency(deals_variants_all, max_budget) -> dict | None:
         "total_budget_used": total_budget_used,
         "selection": result
     }
+
+
+def selected_deals(deals_variants_all, solution):
+    """Обрані розв'язком варіанти угод: {ключ угоди: угода з BestSuggestedQuantity}."""
+    deal_keys = list(deals_variants_all.keys())
+    return {
+        deal_keys[choice['group']]: deals_variants_all[deal_keys[choice['group']]][choice['variant']]['deal']
+        for choice in solution['selection']
+    }
@@ -0,0 +1,167 @@
+"""
+Легкі спани етапів оптимізації закупівлі.
+
+StageTimer збирає тривалості етапів (span), лічильники (count) і пік RSS.
+Етапи, що повторюються для кожної угоди, агрегуються (observe):
+кількість, сума, середнє і максимум замість окремого запису на угоду.
+Результат (as_dict) зберігається в ReplenishmentReport.optimization_metrics.
+
+Пік RSS на Linux вимірюється для кожного запуску та етапу: лічильник VmHWM
+процесу скидається через /proc/self/clear_refs. Скидання діє на весь процес,
+тож паралельні запуски в потоках одного процесу занижують піки один одному.
+Де скинути не можна, записується пік процесу з моменту старту (ru_maxrss),
+а peak_rss_scope дорівнює "process" замість "run".
+"""
+import datetime
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+RUN_SCOPE = "run"
+PROCESS_SCOPE = "process"
+
+
+def peak_rss_mb():
+    """Пік RSS поточного процесу з моменту старту (МБ)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає КБ, macOS — байти.
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def reset_peak_rss():
+    """Скидає VmHWM процесу до поточного RSS. False — якщо система цього не підтримує."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _vm_hwm_kb():
+    """Пік RSS процесу з останнього скидання (КБ), за /proc/self/status."""
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    raise OSError("VmHWM not found")
+
+
+class StageTimer:
+    def __init__(self):
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.spans = []
+        self.aggregates = {}
+        self.counts = {}
+        self.rss_scope = RUN_SCOPE if reset_peak_rss() else PROCESS_SCOPE
+        self._peak_kb = 0
+        self._open_peaks_kb = []  # піки відкритих (вкладених) етапів
+
+    def _peak_mb(self, kb):
+        return round(kb / 2 ** 10, 1) if self.rss_scope == RUN_SCOPE else peak_rss_mb()
+
+    def _checkpoint(self):
+        """Додає пік з останнього скидання до запуску і всіх відкритих етапів, потім скидає його."""
+        if self.rss_scope != RUN_SCOPE:
+            return
+        peak = _vm_hwm_kb()
+        self._peak_kb = max(self._peak_kb, peak)
+        self._open_peaks_kb = [max(open_peak, peak) for open_peak in self._open_peaks_kb]
+        reset_peak_rss()
+
+    @contextmanager
+    def span(self, name):
+        """Вимірює блок коду як етап name (порядок етапів зберігається)."""
+        self._checkpoint()
+        self._open_peaks_kb.append(0)
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - started
+            self._checkpoint()
+            self.spans.append({
+                "name": name,
+                "seconds": round(seconds, 6),
+                "peak_rss_mb": self._peak_mb(self._open_peaks_kb.pop()),
+            })
+
+    def observe(self, name, seconds):
+        """Додає одне вимірювання до агрегованого етапу name."""
+        stats = self.aggregates.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def count(self, **counts):
+        self.counts.update({name: int(value) for name, value in counts.items()})
+
+    def as_dict(self):
+        self._checkpoint()
+        aggregates = {
+            name: {
+                "count": stats["count"],
+                "seconds": round(stats["seconds"], 6),
+                "mean_seconds": round(stats["seconds"] / stats["count"], 6),
+                "max_seconds": round(stats["max_seconds"], 6),
+            }
+            for name, stats in self.aggregates.items()
+        }
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_seconds": round(sum(span["seconds"] for span in self.spans), 6),
+            "spans": self.spans,
+            "aggregates": aggregates,
+            "counts": self.counts,
+            "peak_rss_mb": self._peak_mb(self._peak_kb),
+            "peak_rss_scope": self.rss_scope,
+        }
+
+
+PROMETHEUS_METRICS = {
+    "replenishment_report_id": "Звіт, з якого взято метрики проходу",
+    "replenishment_run_seconds": "Сумарна тривалість етапів проходу, с",
+    "replenishment_stage_seconds": "Тривалість етапу, с",
+    "replenishment_substage_count": "Кількість вимірювань агрегованого етапу",
+    "replenishment_substage_seconds": "Сумарна тривалість агрегованого етапу, с",
+    "replenishment_substage_max_seconds": "Найдовше вимірювання агрегованого етапу, с",
+    "replenishment_count": "Розмір вхідних даних проходу",
+    "replenishment_peak_rss_bytes": "Пік RSS проходу (scope=\"run\") або процесу (scope=\"process\"), байти",
+}
+
+
+def prometheus_text(latest):
+    """
+    Метрики останнього звіту кожного проходу ({прохід: (id звіту, as_dict())})
+    у текстовому форматі Prometheus. Усі метрики — gauge; id звіту — значення,
+    а не мітка, тож кількість рядів обмежена проходами та етапами.
+    """
+    samples = {name: [] for name in PROMETHEUS_METRICS}
+    for run, (report_id, data) in latest.items():
+        labels = f'run="{run}"'
+        samples["replenishment_report_id"].append((labels, report_id))
+        if "total_seconds" in data:
+            samples["replenishment_run_seconds"].append((labels, data["total_seconds"]))
+        for span in data.get("spans", []):
+            samples["replenishment_stage_seconds"].append((f'{labels},stage="{span["name"]}"', span["seconds"]))
+        for name, stats in data.get("aggregates", {}).items():
+            # Агреговані етапи вкладені у звичайні, тож мають окремі метрики.
+            stage = f'{labels},stage="{name}"'
+            samples["replenishment_substage_count"].append((stage, stats["count"]))
+            samples["replenishment_substage_seconds"].append((stage, stats["seconds"]))
+            samples["replenishment_substage_max_seconds"].append((stage, stats["max_seconds"]))
+        for name, value in data.get("counts", {}).items():
+            samples["replenishment_count"].append((f'{labels},kind="{name}"', value))
+        if "peak_rss_mb" in data:
+            scope = data.get("peak_rss_scope", PROCESS_SCOPE)
+            samples["replenishment_peak_rss_bytes"].append(
+                (f'{labels},scope="{scope}"', int(data["peak_rss_mb"] * 2 ** 20))
+            )
+
+    lines = []
+    for name, help_text in PROMETHEUS_METRICS.items():
+        if samples[name]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{{{labels}}} {value}" for labels, value in samples[name]]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def days_for_sale(ads, inventory, best_sq):
+    """Векторна версія DaysForSale: (BSQ + запас) / ADS, 0 якщо ADS = 0."""
+    ads = np.asarray(ads, dtype=float)
+    total = np.asarray(best_sq, dtype=float) + np.asarray(inventory, dtype=float)
+    return np.divide(total, ads, out=np.zeros_like(ads), where=ads != 0)
+
+
+def item_budget(best_sq, purchase_price):
+    """Векторна версія ItemBudget: BSQ * закупівельна ціна."""
+    return np.asarray(best_sq, dtype=float) * np.asarray(purchase_price, dtype=float)
+
+
+def thirty_days_profit(ads, inventory, best_sq, profit):
+    """
+    Векторна версія ThirtyDaysProfit: прибуток з тієї частини замовлення,
+    що буде продана за 30 днів; для збиткових позицій — штраф 100 / (profit * qty).
+    """
+    ads = np.asarray(ads, dtype=float)
+    inventory = np.asarray(inventory, dtype=float)
+    best_sq = np.asarray(best_sq, dtype=float)
+    profit = np.asarray(profit, dtype=float)
+
+    quantity = np.minimum(best_sq, np.maximum(30 * ads - inventory, 0))
+    result = profit * quantity
+
+    penalty = (profit < 0) & (quantity > 0)
+    result[penalty] = 100 / (profit[penalty] * quantity[penalty])
+    return result
+
+
+def group_stats(groups, values, mask=None):
+    """
+    Сума, середнє та вибіркове σ значень по групах (коди груп 0..n-1).
+    Рядки з mask=False не враховуються в середньому та σ.
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=float)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+
+    sums = np.bincount(groups, weights=values, minlength=n_groups)
+
+    if mask is None:
+        mask = np.ones(len(values), dtype=bool)
+    masked = np.where(mask, values, 0.0)
+
+    counts = np.bincount(groups, weights=mask.astype(float), minlength=n_groups)
+    means = np.divide(np.bincount(groups, weights=masked, minlength=n_groups), counts,
+                      out=np.zeros(n_groups), where=counts > 0)
+    sq_dev = np.where(mask, (values - means[groups]) ** 2, 0.0)
+    variance = np.divide(np.bincount(groups, weights=sq_dev, minlength=n_groups), counts - 1,
+                         out=np.full(n_groups, np.nan), where=counts > 1)
+
+    return sums, means, np.sqrt(variance), counts
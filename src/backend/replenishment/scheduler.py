@@ -0,0 +1,125 @@
+"""
+Нічний розклад прогнозування за класами ABC.
+
+Щоночі спершу дописуються матриці продажів складів (forecasting.matrix_store),
+далі товари перекласифікуються за внеском у виручку (ForecastData.abc_class),
+після чого запускаються прогнози за класами:
+    A — щодня, окремі моделі Prophet;
+    B — раз на тиждень (FORECAST_B_WEEKDAY), окремі моделі Prophet;
+    C — щодня, лише векторизовані рушії.
+Кожен запуск має ліміт часу з FORECAST_TIER_BUDGETS: після нього нові товари
+не беруться в роботу, і решта чекає наступного запуску.
+
+Розклад тримається на вбудованому планувальнику RQ: завдання після виконання
+ставить себе в чергу на наступну ніч (queue.enqueue_at), тому воркер має
+працювати з --with-scheduler. Початковий запуск — команда schedule_forecasts.
+"""
+import datetime
+
+import django_rq
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from erp.models import DailySales, Inventory
+
+from .forecasting.matrix_store import SalesMatrixStore
+from .forecasting.routing import BASELINE, PROPHET, abc_classes
+from .models import ForecastData
+from .utils import start_forecast_run
+
+SCHEDULE_JOB_ID = "forecast-schedule-{day}"
+
+
+def classify_products_abc(today=None):
+    """
+    Перераховує клас ABC усіх товарів за виручкою останніх FORECAST_ABC_WINDOW_DAYS днів.
+    Товари в наявності без продажів за вікно отримують клас "C", щоб їх прогнозував
+    запуск класу C. Повертає {клас: кількість товарів}.
+    """
+    today = today or timezone.localdate()
+    date_from = today - datetime.timedelta(days=settings.FORECAST_ABC_WINDOW_DAYS)
+
+    revenue = dict(
+        DailySales.objects.filter(day__gte=date_from, day__lt=today)
+        .values('product_id')
+        .annotate(total=Sum('revenue'))
+        .filter(total__gt=0)
+        .values_list('product_id', 'total')
+    )
+
+    classes = abc_classes(revenue)
+    stocked = Inventory.objects.filter(quantity__gt=0).values_list('product_id', flat=True).distinct()
+
+    counts = {"A": 0, "B": 0, "C": 0}
+    with transaction.atomic():
+        ForecastData.objects.ensure_rows(list(stocked))
+        ForecastData.objects.set_abc_classes(classes)
+        counts.update(
+            ForecastData.objects.exclude(abc_class="")
+            .values_list('abc_class')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+    return counts
+
+
+def tiers_for(day):
+    """Класи, що прогнозуються в день day, і їхні рушії."""
+    tiers = [("A", PROPHET)]
+    if day.weekday() == settings.FORECAST_B_WEEKDAY:
+        tiers.append(("B", PROPHET))
+    tiers.append(("C", BASELINE))
+    return tiers
+
+
+def next_schedule_time(after=None):
+    """Найближчий момент FORECAST_SCHEDULE_TIME (за місцевим часом) після after."""
+    after = after or timezone.localtime()
+    hour, minute = map(int, settings.FORECAST_SCHEDULE_TIME.split(":"))
+    candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= after:
+        candidate += datetime.timedelta(days=1)
+    return candidate
+
+
+def schedule_next_run(after=None):
+    """Ставить нічне завдання на найближчий час розкладу (ідемпотентно для дня)."""
+    when = next_schedule_time(after)
+    queue = django_rq.get_queue('default')
+    return queue.enqueue_at(
+        when,
+        run_nightly_forecast_schedule,
+        job_id=SCHEDULE_JOB_ID.format(day=when.date().isoformat()),
+    )
+
+
+@django_rq.job('default', timeout=1800)
+def run_nightly_forecast_schedule(reschedule=True):
+    """Нічна класифікація ABC і запуски прогнозу за класами з лімітами часу."""
+    today = timezone.localdate()
+    end_date = today - datetime.timedelta(days=1)
+    start_date = end_date - datetime.timedelta(days=settings.FORECAST_HISTORY_DAYS)
+
+    try:
+        synced = SalesMatrixStore().sync_all(end_date)
+        print(f"Sales matrices synced: {synced}")
+
+        counts = classify_products_abc(today)
+        print(f"ABC classes: {counts}")
+
+        for tier, engine in tiers_for(today):
+            budget = settings.FORECAST_TIER_BUDGETS[tier]
+            try:
+                start_forecast_run(
+                    start_date, end_date,
+                    engine=engine,
+                    tier=tier,
+                    deadline=timezone.now() + datetime.timedelta(seconds=budget),
+                )
+            except ValidationError as e:
+                print(f"Tier {tier}: {e.message}")
+    finally:
+        if reschedule:
+            schedule_next_run()
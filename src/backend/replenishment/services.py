@@ -2,21 +2,81 @@ import math
 from collections import defaultdict
 from decimal import Decimal
 
+import numpy as np
 from erp.models import Document, DocumentItem, Inventory, Product, ProductPriceLevel
 from django.db import transaction
-from django.db.models import F, Sum
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from .models import ForecastData, ReplenishmentItem, ReplenishmentReport
+from .models import DemandEstimate, ForecastData, ReplenishmentItem, ReplenishmentReport
+from .optimization.vectorized import days_for_sale, group_stats, item_budget, thirty_days_profit
 
 
-def recalculate_report_pricing(report: ReplenishmentReport):
+def report_totals_aggregates():
+    """Агрегати підсумків звіту по його рядках (бюджет, прибуток, кількість позицій)."""
+    return {
+        'total_budget': Sum(
+            Coalesce(F('best_quantity'), 0) * Coalesce(F('purchase_price'), 0),
+            output_field=DecimalField(max_digits=15, decimal_places=2)
+        ),
+        'total_profit': Sum(
+            (Coalesce(F('sale_price'), 0) - Coalesce(F('purchase_price'), 0)) * Coalesce(F('best_quantity'), 0),
+            output_field=DecimalField(max_digits=15, decimal_places=2)
+        ),
+        'item_count': Count('id'),
+    }
+
+
+def refresh_report_totals(report: ReplenishmentReport):
+    """
+    Перераховує збережені підсумки звіту одним агрегатним запитом.
+    Викликається кожним сервісом, що змінює рядки звіту.
+    """
+    totals = ReplenishmentItem.objects.filter(report=report).aggregate(**report_totals_aggregates())
+    
+    ReplenishmentReport.objects.filter(pk=report.pk).update(**totals)
+    for field, value in totals.items():
+        setattr(report, field, value)
+    
+    return totals
+
+
+def price_levels_by_product(product_ids):
+    """Рівні цін для набору товарів одним запитом (відсортовані за мін. кількістю)."""
+    levels = defaultdict(list)
+    for level in ProductPriceLevel.objects.filter(product_id__in=product_ids).order_by('product_id', 'minimal_quantity'):
+        levels[level.product_id].append(level)  # type: ignore
+    return levels
+
+
+def select_price_level(levels, total_qty):
+    """
+    Рівень з найбільшою мін. кількістю, що не перевищує total_qty,
+    або найменший рівень, якщо жоден не досягнуто.
     """
-    Перераховує ціну закупівлі та рівень знижки для всіх товарів у звіті, 
-    виходячи з їхнього нового загального обсягу (best_quantity) по бренду.
+    if not levels:
+        return Decimal(0), 1
+    
+    chosen = levels[0]
+    for level in levels:
+        if level.minimal_quantity <= total_qty:
+            chosen = level
+    return chosen.price, chosen.minimal_quantity
+
+
+def recalculate_report_pricing(report: ReplenishmentReport, brand_ids=None):
     """
+    Перераховує ціну закупівлі та рівень знижки для всіх товарів у звіті 
+    (або лише для брендів brand_ids), виходячи з їхнього нового загального
+    обсягу (best_quantity) по бренду.
+    """
+    
+    items_qs = report.items.all()  # type: ignore
+    if brand_ids is not None:
+        items_qs = items_qs.filter(product__brand_id__in=brand_ids)
 
-    brand_totals = report.items.values(  # type: ignore
+    brand_totals = items_qs.values(
         'product__brand__id'
     ).annotate(
         total_brand_qty=Sum(F('best_quantity'))
@@ -24,24 +84,18 @@ def recalculate_report_pricing(report: ReplenishmentReport):
     
     brand_qty_map = {item['product__brand__id']: item['total_brand_qty'] for item in brand_totals}
     
+    items = list(items_qs.select_related('product'))
+    levels_map = price_levels_by_product({item.product_id for item in items})
+    
     items_to_update = []
     
-    for item in report.items.all().select_related('product', 'product__brand'):  # type: ignore
+    for item in items:
         brand_id = item.product.brand_id
         total_qty_for_price = brand_qty_map.get(brand_id, 0)
         
-        best_price_level = ProductPriceLevel.objects.filter(
-            product=item.product,
-            minimal_quantity__lte=total_qty_for_price
-        ).order_by('-minimal_quantity').first()
-
-        if best_price_level:
-            new_purchase_price = best_price_level.price
-            new_min_qty_price = best_price_level.minimal_quantity
-        else:
-            min_level = ProductPriceLevel.objects.filter(product=item.product).order_by('minimal_quantity').first()
-            new_purchase_price = min_level.price if min_level else Decimal(0)
-            new_min_qty_price = min_level.minimal_quantity if min_level else 1
+        new_purchase_price, new_min_qty_price = select_price_level(
+            levels_map.get(item.product_id, []), total_qty_for_price
+        )
 
         if item.purchase_price != new_purchase_price:
             item.purchase_price = new_purchase_price
@@ -50,6 +104,112 @@ def recalculate_report_pricing(report: ReplenishmentReport):
     
     if items_to_update:
         ReplenishmentItem.objects.bulk_update(items_to_update, ['purchase_price', 'pricelevel_minimum_quantity'])
+    
+    refresh_report_totals(report)
+    return items_to_update
+
+
+def evaluate_report_brands(report: ReplenishmentReport, brand_ids):
+    """
+    Показники брендів звіту тими ж формулами, що й оптимізатор (векторно):
+    бюджет, прибуток за 30 днів, середнє та σ днів на продаж.
+    """
+    rows = list(
+        report.items.filter(product__brand_id__in=brand_ids).values_list(  # type: ignore
+            'id', 'product__brand_id', 'brand_name', 'average_daily_sales', 'inventory',
+            'best_quantity', 'sale_price', 'purchase_price', 'pricelevel_minimum_quantity',
+        )
+    )
+    if not rows:
+        return {'items': [], 'brands': {}}
+    
+    ids, brands, names, ads, inventory, best_sq, sale_price, purchase_price, min_qty = zip(*rows)
+    
+    ads = np.array(ads, dtype=float)
+    inventory = np.maximum(np.array(inventory, dtype=float), 0)
+    best_sq = np.array(best_sq, dtype=float)
+    purchase = np.array(purchase_price, dtype=float)
+    profit = np.array(sale_price, dtype=float) - purchase
+    
+    budget = item_budget(best_sq, purchase)
+    profit_30 = thirty_days_profit(ads, inventory, best_sq, profit)
+    dfs = days_for_sale(ads, inventory, best_sq)
+    
+    brand_keys, groups = np.unique(np.array(brands), return_inverse=True)
+    budget_sum, *_ = group_stats(groups, budget)
+    profit_sum, *_ = group_stats(groups, profit_30)
+    _, dfs_avg, dfs_stdev, dfs_count = group_stats(groups, dfs, mask=ads > 0)
+    
+    brand_names = dict(zip(brands, names))
+    
+    return {
+        'items': [
+            {
+                'id': item_id,
+                'best_quantity': int(best_sq[i]),
+                'purchase_price': float(purchase[i]),
+                'pricelevel_minimum_quantity': min_qty[i],
+                'days_for_sale': round(float(dfs[i]), 1) if ads[i] > 0 else None,
+                'budget': round(float(budget[i]), 2),
+                'profit': round(float(best_sq[i] * profit[i]), 2),
+            }
+            for i, item_id in enumerate(ids)
+        ],
+        'brands': {
+            brand_names[brand_id]: {
+                'budget': round(float(budget_sum[g]), 2),
+                'thirty_days_profit': round(float(profit_sum[g]), 2),
+                'days_for_sale_avg': round(float(dfs_avg[g]), 1) if dfs_count[g] else None,
+                'days_for_sale_stdev': round(float(dfs_stdev[g]), 1) if dfs_count[g] >= 2 else None,
+            }
+            for g, brand_id in enumerate(brand_keys.tolist())
+        },
+    }
+
+
+def apply_best_quantity_changes(report: ReplenishmentReport, changes: dict):
+    """
+    Записує лише змінені best_quantity (item_id -> кількість), перераховує ціни
+    тільки для зачеплених брендів і повертає їх нові показники та підсумки звіту.
+    """
+    items = list(report.items.filter(pk__in=changes.keys()).select_related('product'))  # type: ignore
+    
+    missing = set(changes) - {item.pk for item in items}
+    if missing:
+        raise ValueError(f"Рядки {sorted(missing)} не належать звіту №{report.pk}.")
+    
+    changed = []
+    for item in items:
+        if item.best_quantity != changes[item.pk]:
+            item.best_quantity = changes[item.pk]
+            changed.append(item)
+    
+    brand_ids = {item.product.brand_id for item in items}
+    
+    with transaction.atomic():
+        if changed:
+            ReplenishmentItem.objects.bulk_update(changed, ['best_quantity'])
+            recalculate_report_pricing(report, brand_ids=brand_ids)
+    
+    result = evaluate_report_brands(report, brand_ids)
+    result['updated'] = len(changed)
+    result['totals'] = {
+        'total_budget': float(report.total_budget or 0),
+        'total_profit': float(report.total_profit or 0),
+        'item_count': report.item_count,
+    }
+    return result
+
+
+def store_optimization_metrics(report: ReplenishmentReport, run, timer, reset=False):
+    """
+    Зберігає метрики проходу run ('initial' / 'final') у звіті.
+    reset=True відкидає метрики інших проходів.
+    """
+    metrics = {} if reset else dict(report.optimization_metrics or {})
+    metrics[run] = timer.as_dict()
+    report.optimization_metrics = metrics
+    report.save(update_fields=['optimization_metrics'])
 
 
 def update_replenishment_items_with_optimization(report, optimized_results: list):
@@ -83,9 +243,12 @@ def update_replenishment_items_with_optimization(report, optimized_results: list
     return len(updated_items)
 
 
-def create_replenishment_report(user, warehouse, coverage_days, credit_terms):
+def create_replenishment_report(user, warehouse, coverage_days, credit_terms,
+                                ads_source=ReplenishmentReport.AdsSource.FORECAST):
     """
     Створює звіт, розраховуючи ціни закупівлі на основі СУМАРНОГО обсягу бренду.
+    ads_source визначає джерело ADS: прогноз (ForecastData) або оперативна
+    оцінка попиту складу (DemandEstimate).
     """
     
     report = ReplenishmentReport.objects.create(
@@ -93,12 +256,16 @@ def create_replenishment_report(user, warehouse, coverage_days, credit_terms):
         warehouse=warehouse,
         global_coverage_days=coverage_days,
         global_credit_terms=credit_terms,
+        ads_source=ads_source,
         status=ReplenishmentReport.Status.DRAFT
     )
 
     products_qs = Product.objects.select_related('brand').all()
     inventory_map = dict(Inventory.objects.filter(warehouse=warehouse).values_list('product_id', 'quantity'))
-    ads_map = dict(ForecastData.objects.values_list('product_id', 'ads'))
+    if ads_source == ReplenishmentReport.AdsSource.REALTIME:
+        ads_map = DemandEstimate.objects.ads_map(warehouse)
+    else:
+        ads_map = dict(ForecastData.objects.values_list('product_id', 'ads'))
     
     final_item_data = {}
     
@@ -174,6 +341,7 @@ def create_replenishment_report(user, warehouse, coverage_days, credit_terms):
 
     with transaction.atomic():
         ReplenishmentItem.objects.bulk_create(items_to_create, batch_size=500)
+        refresh_report_totals(report)
 
     return report
 
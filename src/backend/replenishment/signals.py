@@ -0,0 +1,17 @@
+from django.dispatch import receiver
+from erp.models import Document
+from erp.signals import document_posted, document_unposted
+
+from .models import DemandEstimate
+
+
+@receiver(document_posted, sender=Document)
+def update_demand_on_post(sender, document, **kwargs):
+    if document.doc_type == Document.DocType.SALE:
+        DemandEstimate.objects.apply_document(document)
+
+
+@receiver(document_unposted, sender=Document)
+def update_demand_on_unpost(sender, document, **kwargs):
+    if document.doc_type == Document.DocType.SALE:
+        DemandEstimate.objects.apply_document(document, sign=-1)
@@ -0,0 +1,114 @@
+import datetime
+import tempfile
+from decimal import Decimal
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from erp.models import Brand, DailySales, Document, DocumentItem, Inventory, Product, ProductPriceLevel, Warehouse
+
+from .forecasting.history import load_history_from_db
+from .forecasting.matrix_store import SalesMatrixStore, load_history_from_store
+
+
+class SalesHistorySourcesTest(TestCase):
+    """Історія зі сховища матриць і з DailySales однакова, зокрема після скасування продажу."""
+
+    start = datetime.date(2024, 3, 1)
+    end = datetime.date(2024, 3, 31)
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store_dir.cleanup)
+        settings_override = override_settings(SALES_MATRIX_DIR=self.store_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        brand = Brand.objects.create(name="Brand", country="UA")
+        self.warehouses = [
+            Warehouse.objects.create(name=f"Склад {i}", location=f"Адреса {i}") for i in range(2)
+        ]
+        self.products = [
+            Product.objects.create(name=f"Товар {i}", sku=f"SKU{i}", brand=brand, sale_price=10 + i)
+            for i in range(4)
+        ]
+        for product in self.products:
+            ProductPriceLevel.objects.create(product=product, minimal_quantity=1, price=5)
+            for warehouse in self.warehouses:
+                Inventory.objects.create(product=product, warehouse=warehouse, quantity=1000)
+
+    def sell(self, warehouse, day, quantities):
+        document = Document.objects.create(
+            doc_type=Document.DocType.SALE,
+            src_warehouse=warehouse,
+            doc_date=timezone.make_aware(datetime.datetime.combine(day, datetime.time(12))),
+        )
+        for product, quantity in quantities.items():
+            DocumentItem.objects.create(document=document, product=product, quantity=quantity)
+        document.post()
+        return document
+
+    def assert_same_history(self, product_ids=None):
+        store = SalesMatrixStore()
+        for warehouse in self.warehouses:
+            store.rebuild(warehouse.id, self.end)
+
+        from_store = load_history_from_store(self.start, self.end, product_ids, store=store)
+        from_db = load_history_from_db(self.start, self.end, product_ids)
+        self.assertIsNotNone(from_store)
+
+        np.testing.assert_array_equal(from_store.product_ids, from_db.product_ids)
+        np.testing.assert_array_equal(from_store.days, from_db.days)
+        np.testing.assert_array_equal(from_store.matrix, from_db.matrix)
+        np.testing.assert_array_equal(from_store.first_day, from_db.first_day)
+        np.testing.assert_array_equal(from_store.last_day, from_db.last_day)
+        np.testing.assert_allclose(from_store.revenue, from_db.revenue)
+        self.assertEqual(
+            [from_store.fingerprint(i, "salt") for i in range(len(from_store))],
+            [from_db.fingerprint(i, "salt") for i in range(len(from_db))],
+        )
+        return from_db
+
+    def test_store_and_db_match_with_unposted_sale(self):
+        first, second = self.warehouses
+        p0, p1, p2, p3 = self.products
+
+        self.sell(first, datetime.date(2024, 3, 3), {p0: 2, p1: 1})
+        self.sell(second, datetime.date(2024, 3, 3), {p0: 1})
+        self.sell(first, datetime.date(2024, 3, 10), {p1: 4})
+        self.sell(second, datetime.date(2024, 3, 20), {p0: 3, p2: 2})
+
+        # Скасований продаж лишає нульові рядки: на початку діапазону (p0, p1),
+        # у його кінці (p2) і для товару без інших продажів (p3).
+        self.sell(first, datetime.date(2024, 3, 1), {p0: 5, p1: 1}).unpost()
+        self.sell(first, datetime.date(2024, 3, 28), {p2: 1, p3: 7}).unpost()
+        self.assertTrue(DailySales.objects.filter(quantity=0).exists())
+
+        history = self.assert_same_history()
+        self.assertEqual(history.product_ids.tolist(), [p0.id, p1.id, p2.id])
+        self.assertEqual(history.days[0].date(), datetime.date(2024, 3, 3))
+        self.assertEqual(history.days[-1].date(), datetime.date(2024, 3, 20))
+
+        self.assert_same_history([p1.id, p3.id])
+
+    def test_fingerprint_same_for_fractional_quantities(self):
+        """Сховище тримає float32, БД — Decimal: дробові кількості дають той самий відбиток."""
+        first, second = self.warehouses
+        p0, p1 = self.products[:2]
+
+        self.sell(first, datetime.date(2024, 3, 5), {p0: Decimal("0.3"), p1: Decimal("2.35")})
+        self.sell(second, datetime.date(2024, 3, 5), {p0: Decimal("1.1")})
+        self.sell(first, datetime.date(2024, 3, 9), {p1: Decimal("0.7")})
+
+        store = SalesMatrixStore()
+        for warehouse in self.warehouses:
+            store.rebuild(warehouse.id, self.end)
+        from_store = load_history_from_store(self.start, self.end, store=store)
+        from_db = load_history_from_db(self.start, self.end)
+
+        np.testing.assert_allclose(from_store.matrix, from_db.matrix, rtol=1e-6)
+        np.testing.assert_allclose(from_store.revenue, from_db.revenue, rtol=1e-6)
+        self.assertEqual(
+            [from_store.fingerprint(i, "salt") for i in range(len(from_store))],
+            [from_db.fingerprint(i, "salt") for i in range(len(from_db))],
+        )
@@ -1,33 +1,66 @@
+import multiprocessing
 import pickle
-from collections import defaultdict
-from datetime import date
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from decimal import Decimal
 
 import django_rq
-import pandas as pd
+import numpy as np
 import redis
 from config.settings import REDIS_HOST, REDIS_PORT
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.db.models.functions import TruncDate
-from erp.models import Document, DocumentItem
-from prophet import Prophet
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from erp.models import Product
+from rq.job import Dependency, Job
 
-from .models import ForecastData, TaskNotification
+from .forecasting import hierarchy
+from .forecasting.engines import get_engine
+from .forecasting.history import load_sales_history
+from .forecasting.model_store import ModelStore
+from .forecasting.prophet_model import (
+    FORECAST_HORIZON_DAYS,
+    MODE_FIT,
+    MODE_PREDICT,
+    MODEL_VERSION,
+    fit_ads_safe
+)
+from .forecasting.routing import AUTO, BASELINE, HIERARCHICAL, PROPHET, RoutingPolicy, abc_classes
+from .models import ForecastData, ForecastRun, ForecastRunItem, TaskNotification
 from .notifications.sender import send_notification_to_user
 from .optimization.beautify import beautify
 from .optimization.from_matlab.GetAllDealVariants import GetAllDealVariants
 from .optimization.map_to_table import map_to_table
 from .optimization.prepare_file import main as prepare_file
-from .optimization.solver import optimize_efficiency
+from .optimization.solver import optimize_efficiency, selected_deals
+from .optimization.tracing import StageTimer
 
 
-def execute_initial_optimization_pass(json_table, max_investment_period):
-    sorted_data = prepare_file(json_table)
+def execute_initial_optimization_pass(json_table, max_investment_period, timer=None):
+    timer = timer or StageTimer()
 
-    order, *_ = beautify(sorted_data, max_investment_period)
+    with timer.span('prepare'):
+        sorted_data = prepare_file(json_table)
 
-    deals_variants_all = {idx: GetAllDealVariants(deal) for idx, deal in order.items()}
+    with timer.span('beautify'):
+        order, *_ = beautify(sorted_data, max_investment_period)
+
+    deals_variants_all = {}
+    with timer.span('variants'):
+        for idx, deal in order.items():
+            started = time.perf_counter()
+            deals_variants_all[idx] = GetAllDealVariants(deal)
+            timer.observe('deal_variants', time.perf_counter() - started)
+
+    timer.count(
+        rows=len(sorted_data),
+        deals=len(order),
+        items=sum(len(deal) for deal in order.values()),
+        variants=sum(len(variants) for variants in deals_variants_all.values()),
+    )
 
     min_budget = 0
     max_budget = 0
@@ -37,130 +70,242 @@ def execute_initial_optimization_pass(json_table, max_investment_period):
         last_deal = deal_variants[-1]
         max_budget += last_deal['budget']
     
-    deals_variants_json = pickle.dumps(deals_variants_all)
+    with timer.span('serialize'):
+        deals_variants_json = pickle.dumps(deals_variants_all)
         
     return Decimal(min_budget), Decimal(max_budget), deals_variants_json
 
 
-def execute_final_optimization_pass(deals_variants_all, budget, max_investment_period):
-    optimal_solution = optimize_efficiency(deals_variants_all, budget)
+def execute_final_optimization_pass(deals_variants_all, budget, max_investment_period, timer=None):
+    timer = timer or StageTimer()
+    timer.count(
+        deals=len(deals_variants_all),
+        variants=sum(len(variants) for variants in deals_variants_all.values()),
+    )
+
+    optimal_solution = optimize_efficiency(deals_variants_all, budget, timer=timer)
     
     if optimal_solution is None:
         return None
     
-    correct_variant = optimal_solution['selection']
     efficiency = optimal_solution['total_efficiency']
-    
-    order_keys = list(deals_variants_all.keys())
-    correct_order = {}
-    for gp_variant in correct_variant:
-        group_idx = gp_variant['group']
-        variant_idx = gp_variant['variant']
-        deal_key = order_keys[group_idx]
-        correct_order[deal_key] = deals_variants_all[deal_key][variant_idx]['deal']
+    correct_order = selected_deals(deals_variants_all, optimal_solution)
 
-    table_out, *_ = map_to_table(correct_order, efficiency, max_investment_period)
+    with timer.span('map_to_table'):
+        table_out, *_ = map_to_table(correct_order, efficiency, max_investment_period)
+    timer.count(items=len(table_out))
     
     return table_out[['Item No', 'Best suggested quantity']].to_dict(orient='records')
 
 
-def run_prophet_forecast_logic(start_date, end_date):
+@contextmanager
+def fit_in_pool(tasks, workers=1):
     """
-    Запускає Prophet для всіх товарів і оновлює таблицю ForecastData.
+    Ітератор результатів fit_ads_safe для tasks: у пулі з workers процесів
+    (spawn — дочірні процеси не успадковують з'єднання з БД) або в поточному процесі.
+    """
+    if workers > 1 and len(tasks) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            yield pool.map(fit_ads_safe, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+        finally:
+            pool.shutdown(cancel_futures=True)
+    else:
+        yield map(fit_ads_safe, tasks)
+
+
+def run_prophet_forecast_logic(start_date, end_date, product_ids=None, workers=1, full_refit=False,
+                               mode=MODE_FIT, horizon=FORECAST_HORIZON_DAYS, checkpoint=None, batch_size=None,
+                               deadline=None):
     """
+    Запускає Prophet для товарів (усіх або product_ids) і оновлює таблицю ForecastData.
+    При workers > 1 моделі навчаються паралельно в локальному пулі процесів.
+    Товари, вхідний ряд яких не змінився з останнього успішного навчання, пропускаються,
+    якщо не задано full_refit. Режими mode (fit / warm / predict) описані в
+    forecasting.prophet_model.forecast_product; навчені моделі зберігаються у сховищі моделей.
+
+    Результати записуються партіями по batch_size товарів (усі одразу, якщо не задано);
+    checkpoint(done=[...], failed=[...], ...) викликається в транзакції кожного запису.
+    Після deadline нові результати не приймаються: незаписані товари лишаються
+    невиконаними (для запуску — до відновлення).
+    """
+    
+    history = load_sales_history(start_date, end_date, product_ids)
+
+    eligible = np.flatnonzero((history.lengths() >= 15) & (history.totals() != 0))
+    
+    skipped_ids = set(product_ids or history.product_ids.tolist()) - set(history.product_ids[eligible].tolist())
+    
+    fingerprints = {
+        int(history.product_ids[i]): history.fingerprint(i, salt=f"{MODEL_VERSION}|h{horizon}")
+        for i in eligible
+    }
+    
+    # Прогноз збереженою моделлю не бачить нової історії, тому відбиток не зберігається
+    # і наступний інкрементальний запуск перенавчить такі товари.
+    if mode == MODE_PREDICT:
+        fingerprints = {}
     
-    qs = DocumentItem.objects.filter(
-        document__doc_type=Document.DocType.SALE,
-        document__status=Document.Status.POSTED,
-        document__doc_date__date__range=(start_date, end_date)
-    ).annotate(
-        date=TruncDate('document__doc_date')
-    ).values(
-        'product_id', 
-        'product__name', 
-        'date'
-    ).annotate(
-        y=Sum('quantity')
-    ).order_by('product_id', 'date')
+    unchanged_ids = []
+    if not full_refit and mode != MODE_PREDICT:
+        previous = ForecastData.objects.fingerprints_for(list(fingerprints))
+        changed = []
+        for i in eligible:
+            product_id = int(history.product_ids[i])
+            if previous.get(product_id) == fingerprints[product_id]:
+                unchanged_ids.append(product_id)
+            else:
+                changed.append(i)
+        eligible = changed
+    
+    if checkpoint:
+        with transaction.atomic():
+            checkpoint(skipped=list(skipped_ids), unchanged=unchanged_ids)
 
-    if not qs.exists():
+    if not len(history):
         return 0, "Не знайдено проведених продажів у заданому діапазоні."
 
-    data_by_product: defaultdict[int, dict] = defaultdict(lambda: {'name': '', 'data': []})
-    for entry in qs:
-        pid = entry['product_id']
-        data_by_product[pid]['name'] = entry['product__name']
-        data_by_product[pid]['data'].append({'ds': entry['date'], 'y': float(entry['y'])})
+    options = {
+        'mode': mode,
+        'horizon': horizon,
+        'store_dir': str(settings.FORECAST_MODEL_STORE_DIR),
+        'keep_versions': settings.FORECAST_MODEL_KEEP_VERSIONS,
+    }
+    tasks = [(int(history.product_ids[i]), history.frame(i), options) for i in eligible]
 
+    batch_size = batch_size or max(1, len(eligible))
+    ads_by_product = {}
+    failed_ids = []
     updated_count = 0
     
-    for product_id, data in data_by_product.items():
-        df = pd.DataFrame(data['data'])
-        df['ds'] = pd.to_datetime(df['ds'])
+    def flush():
+        with transaction.atomic():
+            ForecastData.objects.upsert_ads(ads_by_product, fingerprints)
+            ForecastData.objects.ensure_rows(failed_ids)
+            if checkpoint:
+                checkpoint(done=list(ads_by_product), failed=failed_ids)
+    
+    with fit_in_pool(tasks, workers) as results:
+        for product_id, ads_value, error in results:
+            if error is not None:
+                print(f"Error forecasting product {product_id}: {error}")
+                failed_ids.append(product_id)
+            else:
+                ads_by_product[product_id] = Decimal(ads_value).quantize(Decimal('.01'))
 
-        df = df.sort_values('ds')
+            if len(ads_by_product) + len(failed_ids) >= batch_size:
+                flush()
+                updated_count += len(ads_by_product)
+                ads_by_product, failed_ids = {}, []
+            
+            if deadline and timezone.now() >= deadline:
+                break
+        
+        flush()
+        updated_count += len(ads_by_product)
 
-        actual_start_date = df['ds'].min()
-        actual_end_date = df['ds'].max()
+    ModelStore(settings.FORECAST_MODEL_STORE_DIR).evict(settings.FORECAST_MODEL_STORE_MAX_MB * 1024 * 1024)
 
-        full_range = pd.date_range(start=actual_start_date, end=actual_end_date, freq='D')
+    message = "Прогноз успішно завершено."
+    if unchanged_ids:
+        message += f" Без змін (пропущено): {len(unchanged_ids)}."
+    
+    return updated_count, message
 
-        df = df.set_index('ds').reindex(full_range, fill_value=0).rename_axis('ds').reset_index()
 
-        df['y'] = pd.to_numeric(df['y'])
+def run_baseline_forecast_logic(history, rows, engine_name, horizon=FORECAST_HORIZON_DAYS):
+    """
+    Векторизований прогноз ADS рушієм engine_name одразу для рядків rows історії
+    з записом результатів одним bulk upsert. Повертає кількість оновлених товарів.
+    """
+    engine = get_engine(engine_name)
+    ads = np.clip(engine.forecast(history, rows, horizon), 0, None)
+    
+    product_ids = history.product_ids[rows].tolist()
+    salt = f"{engine.name}-{engine.version}|h{horizon}"
+    
+    ForecastData.objects.upsert_ads(
+        {pid: Decimal(value).quantize(Decimal('.01')) for pid, value in zip(product_ids, ads.tolist())},
+        {pid: history.fingerprint(i, salt=salt) for pid, i in zip(product_ids, rows)},
+        engine=engine.name,
+    )
+    return len(product_ids)
 
-        if len(df) < 15 or df['y'].sum() == 0:
-            continue
-            
-        m = Prophet(weekly_seasonality='auto', daily_seasonality=False)  # type: ignore
-        m.add_seasonality(name='payday_monthly', period=30.5, fourier_order=10, prior_scale=15.0)
 
-        try:
-            m.fit(df)
-            
-            future = m.make_future_dataframe(periods=30)
-            forecast = m.predict(future)
-            
-            forecast_period = forecast[forecast['ds'] > df['ds'].max()].copy()
-            
-            if len(forecast_period) == 0:
-                 ads_value = 0
-            else:
-                 forecast_period['yhat'] = forecast_period['yhat'].clip(lower=0)
-                 total_predicted = forecast_period['yhat'].sum()
-                 ads_value = total_predicted / len(forecast_period)
-
-            ads_decimal = Decimal(ads_value).quantize(Decimal('.01'))
-            
-            ForecastData.objects.update_or_create(
-                product_id=product_id,
-                defaults={'ads': ads_decimal}
+def run_hierarchical_forecast_logic(history, horizon=FORECAST_HORIZON_DAYS, mode=MODE_FIT, workers=1,
+                                    reconcile_top=0):
+    """
+    Ієрархічний прогноз: одна модель Prophet на бренд (сумарний ряд бренду),
+    ADS бренду розподіляється на товари за їхніми частками в недавніх продажах.
+    Якщо reconcile_top > 0, reconcile_top товарів з найбільшою виручкою отримують
+    власні моделі, а решта ділить залишок прогнозу бренду.
+    Повертає {product_id: engine} для оновлених товарів.
+    """
+    product_ids = history.product_ids.tolist()
+    brand_of = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'brand_id'))
+    brand_keys, group_index = np.unique([brand_of[pid] for pid in product_ids], return_inverse=True)
+    
+    brands = hierarchy.aggregate_by_group(history, brand_keys, group_index)
+    shares = hierarchy.recent_shares(history, group_index, len(brand_keys), settings.FORECAST_SHARE_WINDOW_DAYS)
+    
+    top_rows = np.empty(0, dtype=np.int64)
+    if reconcile_top:
+        top_rows = np.argsort(-history.revenue, kind='stable')[:reconcile_top]
+        top_rows = top_rows[(history.lengths()[top_rows] >= 15) & (history.totals()[top_rows] != 0)]
+    
+    options = {
+        'mode': mode,
+        'horizon': horizon,
+        'store_dir': str(settings.FORECAST_MODEL_STORE_DIR),
+        'keep_versions': settings.FORECAST_MODEL_KEEP_VERSIONS,
+    }
+    tasks = [(f"brand-{brand_keys[i]}", brands.frame(i), options) for i in range(len(brand_keys))]
+    tasks += [(int(history.product_ids[i]), history.frame(i), options) for i in top_rows]
+    
+    brand_ads = np.zeros(len(brand_keys))
+    top_ads = {}
+    with fit_in_pool(tasks, workers) as results:
+        for key, ads_value, error in results:
+            if error is not None:
+                print(f"Error forecasting {key}: {error}")
+                ads_value = None
+            if isinstance(key, str):
+                # Бренд без моделі: середнє денних продажів за історію бренду.
+                i = int(np.searchsorted(brand_keys, int(key.split('-', 1)[1])))
+                brand_ads[i] = ads_value if ads_value is not None else brands.series(i).mean()
+            elif ads_value is not None:
+                top_ads[key] = ads_value
+    
+    top_rows = np.array([i for i in top_rows if int(history.product_ids[i]) in top_ads], dtype=np.int64)
+    if len(top_rows):
+        ads = hierarchy.reconcile_top(
+            brand_ads, group_index, shares, top_rows,
+            np.array([top_ads[int(history.product_ids[i])] for i in top_rows]),
+        )
+    else:
+        ads = hierarchy.disaggregate(brand_ads, group_index, shares)
+    ads = np.clip(ads, 0, None)
+    
+    engines = np.full(len(product_ids), HIERARCHICAL, dtype=object)
+    engines[top_rows] = PROPHET
+    
+    with transaction.atomic():
+        for engine_name in (HIERARCHICAL, PROPHET):
+            rows = np.flatnonzero(engines == engine_name)
+            ForecastData.objects.upsert_ads(
+                {product_ids[i]: Decimal(float(ads[i])).quantize(Decimal('.01')) for i in rows},
+                engine=engine_name,
             )
-            updated_count += 1
-            
-        except Exception as e:
-            print(f"Error forecasting product {product_id}: {e}")
-            
-            if not ForecastData.objects.filter(product_id=product_id).exists():
-                ForecastData.objects.create(
-                    product_id=product_id,
-                    ads=Decimal('0.00')
-                )
-            
-            continue
-
-    return updated_count, "Прогноз успішно завершено."
+    
+    ModelStore(settings.FORECAST_MODEL_STORE_DIR).evict(settings.FORECAST_MODEL_STORE_MAX_MB * 1024 * 1024)
+    
+    return dict(zip(product_ids, engines.tolist()))
 
 
 redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
 
-@django_rq.job('default', timeout=3600) 
-def run_prophet_forecast_task(start_date_str, end_date_str, user_id):
-    start_date = date.fromisoformat(start_date_str)
-    end_date = date.fromisoformat(end_date_str)
-    
-    updated_count, message = run_prophet_forecast_logic(start_date, end_date) 
-    
+
+def _notify_forecast_finished(user_id, updated_count, message):
     try:
         User = get_user_model()
         user = User.objects.get(pk=user_id)
@@ -179,11 +324,253 @@ def run_prophet_forecast_task(start_date_str, end_date_str, user_id):
         )
     except Exception as e:
         print(f"❌ Failed to create TaskNotification for user {user_id}: {e}")
+
+
+@django_rq.job('default', timeout=settings.FORECAST_CHUNK_TIMEOUT)
+def run_forecast_chunk_task(run_id, product_ids):
+    """
+    Дочірнє завдання: прогноз для частини товарів запуску в локальному пулі процесів.
+    Товари, вже зафіксовані в попередніх спробах, повторно не рахуються.
+    """
+    run = ForecastRun.objects.get(pk=run_id)
+    
+    if run.deadline and timezone.now() >= run.deadline:
+        return 0, "Ліміт часу запуску вичерпано."
+    
+    pending = list(
+        run.items.filter(product_id__in=product_ids, status=ForecastRunItem.Status.PENDING)
+        .values_list('product_id', flat=True)
+    )
+    if not pending:
+        return 0, "Частину вже виконано."
+    
+    return run_prophet_forecast_logic(
+        run.start_date, run.end_date,
+        product_ids=pending,
+        workers=settings.FORECAST_POOL_WORKERS,
+        full_refit=run.full_refit,
+        mode=run.mode,
+        horizon=run.horizon,
+        checkpoint=run.checkpoint,
+        batch_size=settings.FORECAST_CHECKPOINT_BATCH,
+        deadline=run.deadline,
+    )
+
+
+@django_rq.job('default', timeout=600)
+def finalize_forecast_run_task(run_id):
+    """Завершальне завдання: підсумовує стан товарів запуску і надсилає одне сповіщення."""
+    run = ForecastRun.objects.get(pk=run_id)
+    counts = run.counts()
+    
+    pending = counts.get(ForecastRunItem.Status.PENDING, 0)
+    run.status = ForecastRun.Status.INTERRUPTED if pending else ForecastRun.Status.COMPLETED
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'finished_at'])
+    
+    updated_count = counts.get(ForecastRunItem.Status.DONE, 0)
     
+    if run.items.exists():
+        message = "Прогноз успішно завершено." if not pending else "Прогноз перервано."
+    else:
+        message = "Не знайдено проведених продажів у заданому діапазоні."
+    if counts['baseline']:
+        message += f" Базовими методами: {counts['baseline']}."
+    if counts.get(ForecastRunItem.Status.UNCHANGED):
+        message += f" Без змін (пропущено): {counts[ForecastRunItem.Status.UNCHANGED]}."
+    if counts.get(ForecastRunItem.Status.FAILED):
+        message += f" Помилки для {counts[ForecastRunItem.Status.FAILED]} товарів."
+    if pending:
+        message += f" Не оброблено: {pending}. Запуск можна відновити."
+    
+    if run.user_id:  # type: ignore
+        _notify_forecast_finished(run.user_id, updated_count, message)  # type: ignore
     return updated_count, message
 
 
-def run_prophet_forecast_service(start_date, end_date, user_id):
-    """Обгортка, що запускає завдання в черзі."""
-    job = run_prophet_forecast_task.delay(start_date.isoformat(), end_date.isoformat(), user_id)
-    return job
+def _plan_forecast_run(run):
+    """
+    Розподіляє товари запуску між рушіями (engine=AUTO — за RoutingPolicy: Prophet
+    лише для класу "A"), створює стан товарів і одразу рахує векторизовані рушії.
+    """
+    product_ids = None
+    if run.tier:
+        product_ids = list(
+            ForecastData.objects.filter(abc_class=run.tier).values_list('product_id', flat=True)
+        )
+    
+    history = load_sales_history(run.start_date, run.end_date, product_ids)
+    
+    if run.engine == HIERARCHICAL:
+        with transaction.atomic():
+            engines = run_hierarchical_forecast_logic(
+                history, run.horizon, run.mode, settings.FORECAST_POOL_WORKERS, run.reconcile_top
+            )
+            ForecastRunItem.objects.bulk_create(
+                [
+                    ForecastRunItem(run=run, product_id=product_id, engine=engine_name,
+                                    status=ForecastRunItem.Status.DONE)
+                    for product_id, engine_name in engines.items()
+                ],
+                batch_size=5000,
+            )
+        return
+    
+    if run.engine == PROPHET:
+        routes = {PROPHET: np.arange(len(history))}
+    elif run.engine == AUTO:
+        classes = ForecastData.objects.abc_class_map() or abc_classes(history.revenue_by_product())
+        routes = RoutingPolicy().route(history, classes)
+    elif run.engine == BASELINE:
+        routes = RoutingPolicy(prophet_classes=()).route(history, {})
+    else:
+        routes = {run.engine: np.flatnonzero(history.totals() != 0)}
+    
+    engine_by_row = np.full(len(history), '', dtype=object)
+    for engine_name, rows in routes.items():
+        engine_by_row[rows] = engine_name
+    
+    with transaction.atomic():
+        ForecastRunItem.objects.bulk_create(
+            [
+                ForecastRunItem(
+                    run=run,
+                    product_id=product_id,
+                    engine=engine_name,
+                    status=ForecastRunItem.Status.PENDING if engine_name else ForecastRunItem.Status.SKIPPED,
+                )
+                for product_id, engine_name in zip(history.product_ids.tolist(), engine_by_row)
+            ],
+            batch_size=5000,
+        )
+        
+        for engine_name, rows in routes.items():
+            if engine_name != PROPHET:
+                run_baseline_forecast_logic(history, rows, engine_name, run.horizon)
+                run.checkpoint(done=history.product_ids[rows].tolist())
+
+
+@django_rq.job('default', timeout=settings.FORECAST_CHUNK_TIMEOUT) 
+def run_prophet_forecast_task(run_id):
+    """
+    Батьківське завдання запуску. При першому виконанні планує запуск (див.
+    _plan_forecast_run); при відновленні лише ставить у чергу незавершені товари.
+    Товари для Prophet діляться на частини — дочірні завдання, які виконують усі
+    доступні RQ-воркери, а завершальне завдання чекає на всі частини.
+    """
+    run = ForecastRun.objects.get(pk=run_id)
+    run.status = ForecastRun.Status.RUNNING
+    run.finished_at = None
+    run.save(update_fields=['status', 'finished_at'])
+    
+    if not run.items.exists():
+        _plan_forecast_run(run)
+    
+    product_ids = run.pending_product_ids()
+    
+    if not product_ids:
+        return finalize_forecast_run_task(run_id)
+    
+    chunk_size = settings.FORECAST_CHUNK_SIZE
+    chunks = [product_ids[i:i + chunk_size] for i in range(0, len(product_ids), chunk_size)]
+    
+    chunk_jobs = [run_forecast_chunk_task.delay(run_id, chunk) for chunk in chunks]
+    
+    finalize_forecast_run_task.delay(
+        run_id,
+        depends_on=Dependency(jobs=chunk_jobs, allow_failure=True),  # type: ignore
+    )
+    
+    return run_id, f"Заплановано {len(chunks)} частин для {len(product_ids)} товарів."
+
+
+def start_forecast_run(start_date, end_date, user_id=None, full_refit=False, mode=MODE_FIT,
+                       horizon=FORECAST_HORIZON_DAYS, engine=AUTO, reconcile_top=0, tier="", deadline=None):
+    """
+    Створює запуск прогнозу і ставить його батьківське завдання в чергу.
+    ValidationError — якщо для діапазону (і класу) вже виконується інший запуск.
+    """
+    try:
+        with transaction.atomic():
+            run = ForecastRun.objects.create(
+                user_id=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                engine=engine,
+                mode=mode,
+                horizon=horizon,
+                full_refit=full_refit,
+                reconcile_top=reconcile_top,
+                tier=tier,
+                deadline=deadline,
+            )
+    except IntegrityError:
+        raise ValidationError("Прогноз для цього діапазону вже виконується.")
+    
+    return run_prophet_forecast_task.delay(run.pk)
+
+
+def run_prophet_forecast_service(start_date, end_date, user_id, full_refit=False,
+                                 mode=MODE_FIT, horizon=FORECAST_HORIZON_DAYS, engine=AUTO, reconcile_top=0):
+    """Обгортка, що запускає прогноз з адмін-панелі."""
+    return start_forecast_run(
+        start_date, end_date, user_id,
+        full_refit=full_refit, mode=mode, horizon=horizon, engine=engine, reconcile_top=reconcile_top,
+    )
+
+
+def _forecast_run_has_live_jobs(run_id):
+    """
+    Чи є в RQ живі завдання запуску: у черзі, відкладені, заплановані або такі,
+    що виконуються. Завдання мертвого воркера RQ прибирає з реєстру виконуваних.
+    """
+    queue = django_rq.get_queue('default')
+    job_ids = set(queue.job_ids)
+    for registry in (queue.started_job_registry, queue.deferred_job_registry, queue.scheduled_job_registry):
+        job_ids.update(registry.get_job_ids())
+    
+    run_funcs = {
+        f"{__name__}.{func.__name__}"
+        for func in (run_prophet_forecast_task, run_forecast_chunk_task, finalize_forecast_run_task)
+    }
+    return any(
+        job is not None and job.func_name in run_funcs and job.args and job.args[0] == run_id
+        for job in Job.fetch_many(list(job_ids), connection=queue.connection)
+    )
+
+
+def resume_forecast_run_service(run):
+    """
+    Відновлює перерваний запуск з останньої зафіксованої партії. Активний запуск
+    (PENDING / RUNNING) відновлюється, лише якщо жодне його завдання вже не живе в RQ.
+    """
+    with transaction.atomic():
+        run = ForecastRun.objects.select_for_update().get(pk=run.pk)
+        
+        if run.status == ForecastRun.Status.COMPLETED:
+            raise ValidationError(f"Запуск #{run.pk} вже завершено.")
+        
+        if run.status in ForecastRun.ACTIVE_STATUSES and _forecast_run_has_live_jobs(run.pk):
+            raise ValidationError(f"Запуск #{run.pk} ще виконується.")
+        
+        conflict = ForecastRun.objects.filter(
+            start_date=run.start_date,
+            end_date=run.end_date,
+            tier=run.tier,
+            status__in=ForecastRun.ACTIVE_STATUSES,
+        ).exclude(pk=run.pk)
+        if conflict.exists():
+            raise ValidationError("Прогноз для цього діапазону вже виконується.")
+        
+        # Ручне відновлення не обмежене лімітом часу нічного розкладу.
+        run.status = ForecastRun.Status.PENDING
+        run.deadline = None
+        try:
+            with transaction.atomic():
+                run.save(update_fields=['status', 'deadline'])
+        except IntegrityError:
+            raise ValidationError("Прогноз для цього діапазону вже виконується.")
+        
+        # Завдання ставиться в чергу під блокуванням: паралельне відновлення,
+        # дочекавшись його, вже побачить живе завдання.
+        return run_prophet_forecast_task.delay(run.pk)